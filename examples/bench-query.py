@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""bench-query.py -- compare path query evaluators
+
+Queries are evaluated against the demo content tree (see "demo") and
+against a large synthetic tree held in memory.  Each query is run with
+the default evaluator (nested Step objects) and the generated one
+(see mdb.query.codegen).
+
+Example: bench-query.py -d 4 -w 10 -n 20
+
+Pass -s to measure only the synthetic tree.
+"""
+
+import os, timeit, optparse
+from mdb.query import tree, compiler
+from mdb import db
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+QUERIES = (
+    '//.',
+    '//Page',
+    "//*[@name = 'n-1']",
+    '/*/*[1]',
+    '//*/@name',
+)
+
+
+### Synthetic Tree
+
+class Node(tree.InnerNode):
+
+    __slots__ = ('name', 'parent', 'children')
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        return '<Node %s>' % self.name
+
+    def __hash__(self):
+        return id(self)
+
+    def __nonzero__(self):
+        return True
+
+    def __len__(self):
+        return len(self.children)
+
+    def __iter__(self):
+        return iter(self.children)
+
+    def __leaf__(self):
+        return not self.children
+
+    def child(self, name):
+        for c in self.children:
+            if c.name == name:
+                return c
+
+    def before(self, child):
+        return iter(self.children[:self.children.index(child)])
+
+    def after(self, child):
+        return iter(self.children[self.children.index(child) + 1:])
+
+class Page(Node):
+    __slots__ = ()
+
+def synthetic(depth, width):
+    root = Node('root')
+    level = [root]
+    for d in xrange(depth):
+        following = []
+        for parent in level:
+            for n in xrange(width):
+                cls = Page if d == depth - 1 else Node
+                child = cls('n-%d' % n, parent)
+                parent.children.append(child)
+                following.append(child)
+        level = following
+    return root
+
+def synthetic_evaluators():
+    BUILTIN = compiler.builtin()
+    BUILTIN['Page'] = Page
+    read = compiler.read
+    return (
+        compiler.Evaluator(read, BUILTIN),
+        compiler.Evaluator(read, BUILTIN, backend=compiler.codegen)
+    )
+
+
+### Benchmark
+
+def measure(name, default, generated, root, count):
+    print name
+    for expr in QUERIES:
+        (a, b) = (default(expr), generated(expr))
+        if list(a(root)) != list(b(root)):
+            print '  %-24s results differ' % expr
+            continue
+        ta = min(timeit.repeat(lambda: list(a(root)), number=count, repeat=3))
+        tb = min(timeit.repeat(lambda: list(b(root)), number=count, repeat=3))
+        print '  %-24s default %8.2f ms   generated %8.2f ms   x%.1f' % (
+            expr, ta * 1000 / count, tb * 1000 / count, ta / tb
+        )
+
+def main():
+    opt = optparse.OptionParser(usage='%prog [-s] [-d depth] [-w width] [-n count]')
+    opt.add_option('-s', dest='synthetic', action='store_true', default=False,
+                   help='skip the demo tree')
+    opt.add_option('-d', dest='depth', type='int', default=4)
+    opt.add_option('-w', dest='width', type='int', default=8)
+    opt.add_option('-n', dest='count', type='int', default=10)
+    (options, args) = opt.parse_args()
+
+    if not options.synthetic:
+        demo = os.path.join(HERE, 'demo')
+        db.init('demo', 'memory:', load='yaml:%s' % demo)
+        measure(
+            'demo',
+            lambda e: db.compile(e),
+            lambda e: db.compile(e, generated=True),
+            db.root(),
+            options.count
+        )
+
+    root = synthetic(options.depth, options.width)
+    (default, generated) = synthetic_evaluators()
+    measure(
+        'synthetic (%d nodes)' % sum(1 for _ in tree.descend(root)),
+        default, generated, root, options.count
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""bench-startup.py -- measure the cost of making path parsers
+
+Each run is a fresh interpreter that imports mdb.query.parse, makes
+a parser for each AST flavor and parses one expression.  Runs are
+made against this tree, which has pre-generated PLY tables, and
+against a copy whose tables are removed before each run, so they're
+generated every time (the way a worker starts when they aren't
+shipped or can't be written).
+
+Example: bench-startup.py -n 10
+"""
+
+import os, sys, shutil, glob, tempfile, subprocess, optparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TOP = os.path.dirname(HERE)
+
+PROGRAM = r'''
+import time
+start = time.time()
+from mdb.query import parse, ast
+from mdb.db import query_ast
+imported = time.time()
+parse.PathParser(ast)('//Page[@title = "x"]')
+parse.PathParser(query_ast)('//Page[@title = "x"]')
+done = time.time()
+print imported - start, done - imported
+'''
+
+def run(top, count, clean=False):
+    env = dict(os.environ, PYTHONPATH=top)
+    result = []
+    for _ in xrange(count):
+        if clean:
+            remove_tables(top)
+        out = subprocess.check_output(
+            [sys.executable, '-c', PROGRAM],
+            env=env, stderr=open(os.devnull, 'w')
+        )
+        result.append(tuple(float(x) for x in out.split()))
+    return result
+
+def copy_tree():
+    top = tempfile.mkdtemp(prefix='bench-startup-')
+    shutil.copytree(os.path.join(TOP, 'mdb'), os.path.join(top, 'mdb'))
+    return top
+
+def remove_tables(top):
+    query = os.path.join(top, 'mdb', 'query')
+    for path in glob.glob(os.path.join(query, '_*tab*.py*')):
+        os.remove(path)
+
+def report(name, times):
+    (imports, parsers) = zip(*times)
+    print '%-16s import %7.1f ms   first parse %7.1f ms   (best of %d)' % (
+        name, min(imports) * 1000, min(parsers) * 1000, len(times)
+    )
+
+def main():
+    opt = optparse.OptionParser(usage='%prog [-n runs]')
+    opt.add_option('-n', dest='count', type='int', default=5)
+    (options, args) = opt.parse_args()
+
+    copy = copy_tree()
+    try:
+        report('generated', run(copy, options.count, clean=True))
+        report('pre-generated', run(TOP, options.count))
+    finally:
+        shutil.rmtree(copy)
+
+if __name__ == '__main__':
+    main()
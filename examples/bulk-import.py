@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+"""bulk-import.py -- import a directory of YAML files
+
+Files are named and laid out like the ones in "demo" (see
+db.load.load_yaml).  They're parsed in a pool of processes and
+written in batches; progress and throughput are printed as the
+import runs.
+
+Example: bulk-import.py -j 4 -b 1000 fsdir:/tmp/imported content/
+"""
+
+import sys, optparse
+from mdb import db
+
+def usage():
+    print __doc__
+    print 'usage: %s [-j processes] [-b batch] backing directory' % sys.argv[0]
+    sys.exit(1)
+
+def report(stats):
+    print >> sys.stderr, stats
+
+def main():
+    opt = optparse.OptionParser()
+    opt.add_option('-j', dest='processes', type='int', default=None)
+    opt.add_option('-b', dest='batch', type='int', default=None)
+    (options, args) = opt.parse_args()
+    if len(args) != 2:
+        usage()
+
+    (backing, folder) = args
+    db.init('import', backing)
+    db.load_bulk(folder, progress=report, **options.__dict__)
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ from . import types
 __all__ = (
     'json', 'dumps', 'loads',
     'dump_binary', 'load_binary', 'dumps_binary', 'loads_binary',
+    'project_binary', 'projects_binary',
     'box_type', 'unbox_type', 'getstate'
 )
 
@@ -125,11 +126,35 @@ def load_null(port, cls=None, unbox=unbox_type, header=True):
     dr = DatumReader(types.to_schema(cls))
     return dr.read(bd)
 
+def project_null(port, names, cls=None, unbox=unbox_type, header=True):
+    """Unserialize some fields of a record from a binary stream.
+
+    Return a (type, state) pair; state maps each of the names that is
+    a field of the record to its value.  Other fields are skipped
+    without being decoded; fields after the last one named aren't
+    read at all."""
+
+    bd = BinaryDecoder(port)
+
+    if header:
+        (version, codec) = _read_header(bd)
+        assert version == BINARY_VERSION
+        assert codec == BINARY_CODEC['null']
+
+    if unbox:
+        cls = unbox(bd.read_utf8())
+    elif cls is None:
+        raise TypeError('Missing required argument: cls or unbox.')
+
+    dr = DatumReader(types.to_schema(cls))
+    return (cls, dr.read_fields(types.to_schema(cls), names, bd))
+
 ## When more than one codec is implemented, these will accept an
 ## optional parameter to choose a codec.
 
 dump_binary = dump_null
 load_binary = load_null
+project_binary = project_null
 
 def dumps_binary(obj, **kw):
     with closing(cStringIO.StringIO()) as port:
@@ -139,6 +164,10 @@ def loads_binary(data, **kw):
     with closing(cStringIO.StringIO(data)) as port:
         return load_binary(port, **kw)
 
+def projects_binary(data, names, **kw):
+    with closing(cStringIO.StringIO(data)) as port:
+        return project_binary(port, names, **kw)
+
 ## BINARY_VERSION 1 just writes its version number and the codec used.
 
 def _write_header(be, codec):
@@ -211,6 +240,9 @@ class BinaryDecoder(io.BinaryDecoder):
     def read_string(self):
         return self.read_utf8()
 
+    def skip_string(self):
+        return self.skip_utf8()
+
 class DatumReader(io.DatumReader):
     """Use generalized dispatch and add a types.cast() for complex
     types."""
@@ -249,6 +281,45 @@ class DatumReader(io.DatumReader):
     def read_request(self, *args):
         return self.read_record(*args)
 
+    def read_fields(self, ws, names, decoder):
+        """Read the named fields of a record into a dictionary;
+        skip the others.  Stop after the last named field."""
+
+        wanted = set(names).intersection(f.name for f in ws.fields)
+        state = {}
+        for field in ws.fields:
+            if not wanted:
+                break
+            elif field.name in wanted:
+                state[field.name] = self.read_data(field.type, field.type, decoder)
+                wanted.remove(field.name)
+            else:
+                self.skip_data(field.type, decoder)
+        return state
+
+    ## Skipping uses the same generalized dispatch as reading.
+
+    def skip_data(self, writers_schema, decoder):
+        method = 'skip_%s' % writers_schema.type
+        if hasattr(decoder, method):
+            return getattr(decoder, method)()
+        elif hasattr(self, method):
+            return getattr(self, method)(writers_schema, decoder)
+        else:
+            raise _s.AvroException('Unknown type: %r.' % writers_schema.type)
+
+    def skip_omap(self, *args):
+        return self.skip_map(*args)
+
+    def skip_set(self, *args):
+        return self.skip_array(*args)
+
+    def skip_error(self, *args):
+        return self.skip_record(*args)
+
+    def skip_request(self, *args):
+        return self.skip_record(*args)
+
     def _map(self, ws, rs, decoder):
         count = decoder.read_long()
         while count != 0:
@@ -129,6 +129,13 @@ class TestStructure(unittest.TestCase):
         thing = self.Link("a", self.Pointer(""))
         self.assertEqual(thing, loads_binary('\x02\x00\x12Test.Link\x02a\x00'))
 
+    def test_project_binary(self):
+        data = dumps_binary(self.Link("a", self.Pointer("b")))
+        self.assertEqual(projects_binary(data, ['next']),
+                         (self.Link, { 'next': self.Pointer("b") }))
+        self.assertEqual(projects_binary(data, ['value', 'missing']),
+                         (self.Link, { 'value': 'a' }))
+
     def test_weak(self):
         obj = self.Pointer("example")
         self.assertEqual(weakref.ref(obj)(), obj)
@@ -3,3 +3,8 @@ from .. import avro
 from .store import *
 from .value import *
 from .repo import *
+from .export import *
+from .gc import *
+from .maintenance import *
+from .watch import *
+from .replicate import *
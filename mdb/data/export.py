@@ -0,0 +1,357 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""export -- stream zippers to a tar archive and back
+
+An export is a tar stream.  Each static object that's reachable from
+the exported heads is written once, as it's stored, in an entry
+named objects/<address>.  After a zipper's objects comes an entry
+that records its head: <prefix>HEAD when history is exported, or
+<prefix>MANIFEST (the address of a manifest of the head's logical
+keyspace) when it isn't.  The prefix is the zipper's state prefix;
+it's empty for a repository and refs/<name>/ for a branch.
+
+    >>> r = repository(store.back.memory()).create().open()
+    >>> b = r.make('live').open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> b.transactionally(b.checkpoint, { k('a'): 1, k('b'): 2 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2)])
+    >>> port = StringIO()
+    >>> full = export_stream(r, port, history=True)
+    >>> sorted(full.heads)
+    ['', 'refs/live/']
+
+An export can be imported into a repository with any backing store.
+
+    >>> copy = repository(store.back.memory())
+    >>> port.seek(0)
+    >>> import_stream(copy, port).objects == full.objects
+    True
+    >>> copy.branch('live').open().items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2)])
+
+Pass the heads of an earlier export as since to write only the
+objects made after it.
+
+    >>> b.transactionally(b.checkpoint, { k('c'): 3 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2), (key('AlQCAmM'), 3)])
+    >>> port = StringIO()
+    >>> export_stream(r, port, history=True, since=full.heads).objects
+    3
+    >>> port.seek(0)
+    >>> import_stream(copy, port).objects
+    3
+    >>> copy.branch('live').open().items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2), (key('AlQCAmM'), 3)])
+"""
+
+from __future__ import absolute_import
+import time, tarfile, itertools
+from cStringIO import StringIO
+from md.prelude import *
+from . import store
+from .value import *
+from .repo import *
+from .repo import (
+    commit, checkpoint, changeset, manifest, working, checkpoint_index, sref,
+    resolved, is_conflict, conflict_sides, is_ancestor
+)
+
+__all__ = ('export_stream', 'import_stream', 'StreamStats')
+
+OBJECTS = 'objects/'
+
+EXPORT_BATCH = 256
+
+IMPORT_BATCH = 256
+
+class StreamStats(object):
+    """The result of export_stream() or import_stream().  The heads
+    are a mapping of state prefixes to head references; pass them to
+    export_stream() as since to make an incremental export."""
+
+    __slots__ = ('objects', 'bytes', 'heads', 'elapsed')
+
+    def __init__(self):
+        self.objects = self.bytes = 0
+        self.heads = {}
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return '<%s objects=%d bytes=%d elapsed=%.3fs>' % (
+            type(self).__name__,
+            self.objects,
+            self.bytes,
+            self.elapsed
+        )
+
+
+### Export
+
+def export_stream(zs, port, history=False, since=None, compression=''):
+    """Write zs to port as a tar stream.  If zs is a repository, its
+    branches are written too.  When history is True, every ancestor
+    of each head is written; otherwise only a manifest of each
+    logical keyspace and the values in it are.
+
+    Objects reachable from since (a reference, or the heads of an
+    earlier export) are skipped.  The compression may be 'gz' or
+    'bz2'.  A StreamStats is returned."""
+
+    started = time.time()
+    stats = StreamStats()
+    sources = list(zippers(zs))
+    since = _since(since, sources[0][0])
+    seen = set()
+
+    with closing(tarfile.open(fileobj=port, mode='w|' + compression)) as tar:
+        for (prefix, source) in sources:
+            if history and since.get(prefix) == source.head:
+                ## Nothing was added since; only the head is written.
+                _add(tar, stats, prefix + 'HEAD', source.head.address)
+                stats.heads[prefix] = source.head
+                continue
+            known = None
+            if prefix in since:
+                seen.update(_known(source, since[prefix]))
+                known = _exported(source, since[prefix])
+            if history:
+                _copy(tar, stats, source, reachable(source, [source.head], seen, known))
+                _add(tar, stats, prefix + 'HEAD', source.head.address)
+            else:
+                _snapshot(tar, stats, prefix, source, seen)
+            stats.heads[prefix] = source.head
+
+    stats.elapsed = time.time() - started
+    return stats
+
+def _since(since, prefix):
+    if since is None:
+        return {}
+    elif isinstance(since, sref):
+        return { prefix: since }
+    return dict(since)
+
+def zippers(zs):
+    """Produce a (state prefix, zipper) pair for zs and, if it's a
+    repository, each of its branches, at their current heads.  Branch
+    handles come from the pool (see repository.handle); they may be in
+    use elsewhere, so they're never moved here."""
+
+    if isinstance(zs, branch):
+        yield (zs.repo._qualify(zs.name), zs.repo.handle(zs.name))
+        return
+    zs.refresh()
+    yield ('', zs)
+    if isinstance(zs, repository):
+        for config in zs.branches():
+            yield (zs._qualify(config.name), zs.handle(config.name))
+
+def _snapshot(tar, stats, prefix, zs, seen):
+    index = manifest(
+        (k, r) for (k, r) in ((k, resolved(r)) for (k, r) in zs.index().iteritems())
+        if r is not None
+    )
+    _copy(tar, stats, zs, (sref(a) for a in _addresses(index.itervalues(), seen)))
+    (address, data) = zs._objects.encode(index)
+    if address not in seen:
+        seen.add(address)
+        _add(tar, stats, OBJECTS + address, data)
+    _add(tar, stats, prefix + 'MANIFEST', address)
+
+def _copy(tar, stats, zs, refs):
+    for batch in _batches(refs, EXPORT_BATCH):
+        for (address, data) in zs._objects.mread(r.address for r in batch):
+            if data is Undefined:
+                raise RepoError('Missing object %r in %r.' % (address, zs))
+            _add(tar, stats, OBJECTS + address, data)
+
+def _add(tar, stats, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = time.time()
+    tar.addfile(info, StringIO(data))
+    if name.startswith(OBJECTS):
+        stats.objects += 1
+        stats.bytes += len(data)
+
+## Objects are found by walking the history from the heads.  Each
+## commit or checkpoint refers to a changeset or manifest, which
+## refers to values.  The seen set is shared by all of the zippers in
+## an export, so an object is only visited once.  An incremental
+## export stops at the records an earlier one wrote.
+
+def reachable(zs, heads, seen, known=None):
+    """Produce a reference to each object reachable from heads that
+    isn't in seen: records, their changes and the values in them.
+    The addresses are added to seen.  If known is given, it's called
+    with a reference to a record and its type (commit or checkpoint);
+    the record and its history are skipped if it returns True."""
+
+    for batch in _batches(_records(zs, heads, seen, known), EXPORT_BATCH):
+        changes = _unseen((r.changes for (_, r) in batch), seen)
+        for (ref, _) in batch:
+            yield ref
+        for (ref, refs) in zs.mderef(changes):
+            yield ref
+            for address in _addresses(refs.itervalues(), seen):
+                yield sref(address)
+
+def _records(zs, heads, seen, known=None):
+    ## A head is always a checkpoint.  A checkpoint refers to the
+    ## commits it was made against and earlier checkpoints; a commit
+    ## only to earlier commits.
+    pending = _unknown(_unseen(heads, seen), checkpoint, known)
+    while pending:
+        (batch, pending) = (pending[:EXPORT_BATCH], pending[EXPORT_BATCH:])
+        for (ref, record) in zs.mderef(batch):
+            yield (ref, record)
+            if isinstance(record, checkpoint):
+                pending.extend(_unknown(_unseen(record.commits, seen), commit, known))
+            pending.extend(_unknown(_unseen(record.prev, seen), type(record), known))
+
+def _unknown(refs, kind, known):
+    if known is None:
+        return refs
+    return [r for r in refs if not known(r, kind)]
+
+def _exported(zs, head):
+    ## An earlier export of head wrote head, its ancestors, and the
+    ## commits in the history of the ones head was made against.  The
+    ## commit graph answers this without walking that history.  The
+    ## checkpoints and commits of a zipper have separate histories,
+    ## so each kind of record is only compared with its own.
+    record = zs.deref(head)
+    if isinstance(record, checkpoint):
+        bases = { checkpoint: [head], commit: list(record.commits) }
+    else:
+        bases = { checkpoint: [], commit: [head] }
+    return lambda ref, kind: any(is_ancestor(zs, ref, b) for b in bases[kind])
+
+def _known(zs, head):
+    ## The values an earlier export of head wrote: the ones in its
+    ## keyspace.  Later changesets and manifests refer to them too.
+    record = zs.deref(head)
+    if isinstance(record, checkpoint):
+        index = checkpoint_index(zs, record)
+    else:
+        index = working(changeset(), zs.deref(record.changes))
+    return set(_addresses(index.itervalues(), set()))
+
+def _addresses(refs, seen):
+    for ref in refs:
+        sides = conflict_sides(ref) if is_conflict(ref) else (ref, )
+        for side in sides:
+            if side is not Deleted and side.address not in seen:
+                seen.add(side.address)
+                yield side.address
+
+def _unseen(refs, seen):
+    result = []
+    for ref in refs:
+        if ref.address not in seen:
+            seen.add(ref.address)
+            result.append(ref)
+    return result
+
+def _batches(seq, size):
+    seq = iter(seq)
+    while True:
+        batch = list(itertools.islice(seq, size))
+        if not batch:
+            return
+        yield batch
+
+
+### Import
+
+def import_stream(zs, port, force=False):
+    """Read a tar stream written by export_stream() into zs, which
+    may be a new zipper.  A branch export can be read into a
+    repository or a zipper.  Objects are added to the static space in
+    batches.  Heads are moved forward; if a head has diverged from
+    the exported one, RepoError is raised unless force is True, in
+    which case the exported head replaces it.  A StreamStats is
+    returned."""
+
+    started = time.time()
+    stats = StreamStats()
+    pending = []
+    zs._open()
+
+    with closing(tarfile.open(fileobj=port, mode='r|*')) as tar:
+        for info in tar:
+            data = tar.extractfile(info).read()
+            if info.name.startswith(OBJECTS):
+                pending.append((info.name[len(OBJECTS):], data))
+                stats.objects += 1
+                stats.bytes += len(data)
+                if len(pending) >= IMPORT_BATCH:
+                    pending = _flush(zs, pending)
+                continue
+
+            pending = _flush(zs, pending)
+            if info.name.endswith('HEAD'):
+                prefix = info.name[:-len('HEAD')]
+                _restore_head(_target(zs, prefix), sref(data), force)
+            elif info.name.endswith('MANIFEST'):
+                prefix = info.name[:-len('MANIFEST')]
+                _restore_manifest(_target(zs, prefix), sref(data))
+            else:
+                raise RepoError('Unexpected entry %r in export.' % info.name)
+            stats.heads[prefix] = sref(data)
+
+    _flush(zs, pending)
+    stats.elapsed = time.time() - started
+    return stats
+
+def _flush(zs, pending):
+    if pending:
+        zs._objects.mwrite(pending)
+    return []
+
+def _target(zs, prefix):
+    ## A branch is imported into the branch of a repository with the
+    ## same name, which is added if it's missing.  Any other zipper
+    ## takes the head as it is.
+    if not (prefix and isinstance(zs, repository)):
+        return zs
+    if zs._state.get(zs.HEAD) is Undefined:
+        zs.create()
+    zs.open()
+    zs.refresh()
+    target = zs.branch(prefix[len('refs/'):].strip('/'))
+    if zs.get(target.key) is Undefined:
+        zs.transactionally(zs._add, target)
+    return target
+
+def _restore_head(zs, head, force=False):
+    zs._open()
+    (current, token) = zs.begin_transaction()
+    if current is Undefined:
+        zs._state.add(zs.HEAD, head)
+    elif current != head:
+        zs.open()
+        if not (force or is_ancestor(zs, current, head)):
+            raise RepoError('%r has diverged from the export.' % zs)
+        try:
+            zs._state.cas(zs.HEAD, head, token)
+        except store.NotStored:
+            raise TransactionFailed('Try again.')
+    zs.open()
+    zs.refresh()
+
+def _restore_manifest(zs, ref):
+    ## Commit the differences between the current keyspace and the
+    ## exported one.
+    zs._open()
+    if zs._state.get(zs.HEAD) is Undefined:
+        zs.create()
+    zs.open()
+    zs.refresh()
+    (index, exported) = (zs.index(), zs.deref(ref))
+    updates = dict((k, Deleted) for k in index if k not in exported)
+    updates.update((k, r) for (k, r) in exported.iteritems() if index.get(k) != r)
+    if updates:
+        with message('Import %s.' % ref.address):
+            retrying(zs, zs.commit, updates)
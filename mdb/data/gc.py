@@ -0,0 +1,310 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""gc -- delete unreachable objects from the static space
+
+Objects are never deleted by the zippers that write them.  A
+checkpoint that's amended or lost the race for HEAD, the checkpoints
+before a commit, and values that are no longer in any manifest stay
+in the static space.  The collector marks every object that's
+reachable from the heads of a repository and its branches, then
+sweeps the locations of the backing store.
+
+Writers aren't stopped.  An unreachable object may belong to a
+transaction that hasn't moved HEAD yet, so it's only noted the first
+time it's seen.  It's deleted by a later collection if it's still
+unreachable and the grace period has passed since it was noted.  The
+grace period should be longer than any transaction (or bulk import,
+see db.bulk()) takes.  Storing an object again touches it, so it's
+kept; just before deleting, the heads are marked again.
+
+A collection can be limited to some number of locations; the next
+one continues where it stopped, and only marks the history that was
+added since.
+
+    >>> r = repository(store.back.memory()).create().open()
+    >>> b = r.make('live').open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> amended = b.transactionally(b.checkpoint, { k('a'): 1 }).head
+    >>> b.transactionally(b.amend, { k('a'): 2 }).items()
+    tree([(key('AlQCAmE'), 2)])
+    >>> collect(r, grace=0).swept
+    0
+    >>> collect(r, grace=0).swept > 0
+    True
+    >>> r.deref(amended)
+    <undefined>
+    >>> b.items()
+    tree([(key('AlQCAmE'), 2)])
+
+An unreachable object that's stored again may be about to be used;
+it's kept for another grace period.
+
+    >>> b.transactionally(b.amend, { k('a'): 3 }).items()
+    tree([(key('AlQCAmE'), 3)])
+    >>> collect(r, grace=0).pending > 0
+    True
+    >>> (address, _) = r._objects.put(2)
+    >>> collect(r, grace=0).swept > 0
+    True
+    >>> r._objects.identify(r._objects.location(address)) == address
+    True
+
+A limited collection stops early and the next one continues.
+
+    >>> collect(r, limit=1).done
+    False
+    >>> collect(r).done
+    True
+"""
+
+from __future__ import absolute_import
+import time
+from md.prelude import *
+from . import avro, store
+from .repo import *
+from .export import zippers, reachable
+
+__all__ = ('collect', 'GCStats', 'GRACE', 'COLLECT_LIMIT')
+
+## Seconds an unreachable object is kept after it's first seen.
+
+GRACE = 3600.0
+
+## Locations scanned by each collection of a Maintenance task.
+
+COLLECT_LIMIT = 10000
+
+class GCStats(object):
+    """The result of collect()."""
+
+    __slots__ = ('live', 'scanned', 'pending', 'swept', 'bytes', 'elapsed', 'done')
+
+    def __init__(self):
+        self.live = self.scanned = self.pending = self.swept = self.bytes = 0
+        self.elapsed = 0.0
+        self.done = False
+
+    def __repr__(self):
+        return '<%s live=%d scanned=%d pending=%d swept=%d bytes=%d elapsed=%.3fs>' % (
+            type(self).__name__,
+            self.live,
+            self.scanned,
+            self.pending,
+            self.swept,
+            self.bytes,
+            self.elapsed
+        )
+
+## The state of a collection is kept in the repository's state: the
+## location where the last collection stopped, the objects marked
+## reachable in the current pass, and unreachable objects that
+## haven't been deleted yet.  Marked and noted locations are paged by
+## their directory (one of the 256 shards of a directory store), so a
+## limited collection only reads and writes the pages it uses.
+##
+## The mark is kept for the whole pass.  Walking from a head stops at
+## objects that are already marked, so after the first collection of
+## a pass only the history added since is walked.  Objects that
+## became unreachable during the pass stay marked until the next one.
+
+class sweep(avro.structure('M.sweep')):
+    """The state of an incremental collection."""
+
+noted = avro.map(avro.double)
+
+counts = avro.map(avro.long)
+
+SWEEP = 'SWEEP'
+
+def collect(zs, grace=GRACE, limit=None):
+    """Delete the objects in the static space of zs that aren't
+    reachable from any head and were noted as unreachable more than
+    grace seconds ago.  If zs is a branch, its repository is
+    collected.  At most limit locations are scanned.  A GCStats is
+    returned; its bytes are the size of the deleted objects in the
+    backing store."""
+
+    started = time.time()
+    stats = GCStats()
+    if isinstance(zs, branch):
+        zs = zs.repo
+    zs.open()
+
+    objects = zs._objects
+    state = zs._state.get(SWEEP)
+    if state is Undefined:
+        (cursor, pending, marked) = ('', {}, {})
+    else:
+        (cursor, pending, marked) = (state.cursor, dict(state.pending), dict(state.marked))
+    (pending, marked) = (_Pages(zs._state, 'SWEEP/', pending), _Pages(zs._state, 'MARK/', marked))
+    if not cursor:
+        ## A new pass starts with a new mark.
+        marked.clear()
+
+    now = time.time()
+    mark = _Mark(objects, marked, now)
+    _mark(zs, mark)
+
+    (start, visited, doomed) = (cursor, set(), [])
+    for (location, size) in objects.locations(start or None):
+        if limit is not None and stats.scanned >= limit:
+            break
+        stats.scanned += 1
+        cursor = location
+        if location in marked:
+            pending.pop(location)
+            continue
+        first = pending.get(location)
+        if first is None:
+            if objects.identify(location) is not None:
+                pending.set(location, now)
+                visited.add(location)
+        elif now - first >= grace:
+            doomed.append((location, size, first))
+        else:
+            visited.add(location)
+    else:
+        (cursor, stats.done) = ('', True)
+
+    ## Noted locations in the scanned range that weren't seen have
+    ## been deleted some other way.
+    pending.prune(start, None if stats.done else cursor, visited)
+
+    ## A writer may have moved a head to a doomed object or stored it
+    ## again since the mark.  Mark again from the current heads, and
+    ## keep anything that's reachable now or was touched after it was
+    ## noted.
+    if doomed:
+        _mark(zs, mark)
+        (kept, doomed) = _partition(
+            lambda (l, _, first): l in marked or (objects.touched(l) or 0) > first,
+            doomed
+        )
+        for (location, _, _) in kept:
+            if location not in marked:
+                pending.set(location, now)
+
+    swept = [(l, objects.identify(l)) for (l, _, _) in doomed]
+    objects.forget(swept)
+    for (location, size, _) in doomed:
+        pending.pop(location)
+        stats.swept += 1
+        stats.bytes += size
+
+    ## The vertices of swept records aren't needed any more.
+    addresses = [a for (_, a) in swept if a is not None]
+    if addresses:
+        for (_, source) in zippers(zs):
+            source._graph.forget(addresses)
+
+    pending.save()
+    marked.save()
+    zs._state.set(SWEEP, sweep(cursor, counts(pending.counts.iteritems()),
+                               counts(marked.counts.iteritems())))
+    stats.live = len(marked)
+    stats.pending = len(pending)
+    stats.elapsed = time.time() - started
+    return stats
+
+def _mark(zs, mark):
+    for (_, source) in zippers(zs):
+        for _ in reachable(source, [source.head], mark):
+            pass
+
+def _partition(pred, seq):
+    (yes, no) = ([], [])
+    for item in seq:
+        (yes if pred(item) else no).append(item)
+    return (yes, no)
+
+class _Mark(object):
+    ## The seen set given to reachable(): addresses are marked by
+    ## their locations.
+
+    def __init__(self, objects, pages, when):
+        self._objects = objects
+        self._pages = pages
+        self._when = when
+
+    def __contains__(self, address):
+        return self._objects.location(address) in self._pages
+
+    def add(self, address):
+        self._pages.set(self._objects.location(address), self._when)
+
+class _Pages(object):
+    ## A map of locations to times, stored in pages under prefix.  A
+    ## page is read the first time it's used and written by save() if
+    ## it changed.  Counts has the size of each stored page.
+
+    def __init__(self, state, prefix, counts):
+        self._state = state
+        self._prefix = prefix
+        self.counts = counts
+        self._pages = {}
+        self._dirty = set()
+
+    def __len__(self):
+        return sum(self.counts.itervalues())
+
+    def __contains__(self, location):
+        return location in self._page(_page(location))
+
+    def get(self, location):
+        return self._page(_page(location)).get(location)
+
+    def set(self, location, when):
+        name = _page(location)
+        self._page(name)[location] = when
+        self._dirty.add(name)
+
+    def pop(self, location):
+        name = _page(location)
+        page = self._page(name)
+        if location in page:
+            del page[location]
+            self._dirty.add(name)
+
+    def clear(self):
+        for name in self.counts:
+            self._pages[name] = {}
+            self._dirty.add(name)
+
+    def prune(self, start, end, keep):
+        ## Drop the locations after start, up to end, that aren't in
+        ## keep.  Only the pages that may hold them are read.
+        for name in set(self.counts) | set(self._pages):
+            if start and name < start and not start.startswith(name):
+                continue
+            elif end is not None and name > end:
+                continue
+            page = self._page(name)
+            gone = [
+                l for l in page
+                if l > start and (end is None or l <= end) and l not in keep
+            ]
+            for location in gone:
+                del page[location]
+            if gone:
+                self._dirty.add(name)
+
+    def save(self):
+        for name in self._dirty:
+            page = self._pages[name]
+            if page:
+                self._state.set(self._prefix + name, noted(page.iteritems()))
+                self.counts[name] = len(page)
+            elif self.counts.pop(name, None) is not None:
+                self._state.delete(self._prefix + name)
+        self._dirty.clear()
+
+    def _page(self, name):
+        probe = self._pages.get(name)
+        if probe is None:
+            stored = self._state.get(self._prefix + name) if name in self.counts else Undefined
+            probe = self._pages[name] = {} if stored is Undefined else dict(stored)
+        return probe
+
+def _page(location):
+    return location[:location.rfind('/') + 1]
@@ -0,0 +1,79 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""maintenance -- compact and collect a repository in the background"""
+
+from __future__ import absolute_import
+import threading
+from md.prelude import *
+from . import store
+from .repo import *
+from .repo import COMPACT_KEEP
+from .gc import collect, GRACE, COLLECT_LIMIT
+from .export import zippers
+
+__all__ = ('Maintenance', )
+
+MAINTENANCE_INTERVAL = 600.0
+
+class Maintenance(threading.Thread):
+    """A daemon thread that compacts the checkpoints of a repository
+    and its branches (see compact()) every interval seconds, then
+    collects garbage (see collect()) unless grace is None.  Each
+    collection scans at most limit locations and continues where the
+    last one stopped.  It uses its own repository over the same
+    backing store.
+
+    >>> r = repository(store.back.memory()).create().open()
+    >>> task = Maintenance(r, interval=3600)
+    >>> task.step().compacted
+    0
+    >>> task.collected
+    <GCStats ...>
+    """
+
+    def __init__(self, zs, interval=MAINTENANCE_INTERVAL, keep=COMPACT_KEEP,
+                 age=None, grace=GRACE, limit=COLLECT_LIMIT):
+        super(Maintenance, self).__init__(name='mdb-maintenance')
+        self.daemon = True
+        if isinstance(zs, branch):
+            zs = zs.repo
+        self._zs = type(zs)(zs._state, marshall=zs._objects._marshall, author=zs.author)
+        self._stopped = threading.Event()
+        self.interval = interval
+        self.keep = keep
+        self.age = age
+        self.grace = grace
+        self.limit = limit
+        self.compacted = 0
+        self.collected = None
+        self.error = None
+
+    def __repr__(self):
+        return '<%s %r every %.0fs>' % (type(self).__name__, self._zs, self.interval)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.step()
+            except Exception as exc:
+                ## Keep going; the next step may succeed.
+                self.error = exc
+
+    def stop(self):
+        self._stopped.set()
+        return self
+
+    def step(self):
+        """Compact, then collect, once."""
+
+        zs = self._zs.open()
+        for (_, source) in zippers(zs):
+            try:
+                self.compacted += compact(source, self.keep, self.age)
+            except TransactionFailed:
+                ## A writer moved HEAD; try again next time.
+                pass
+        if self.grace is not None:
+            self.collected = collect(zs, self.grace, self.limit)
+        return self
@@ -9,7 +9,7 @@ import os, errno, contextlib as ctx, tempfile
 __all__ = (
     'errno',
     'exists', 'join', 'dirname', 'basename',
-    'mkstemp', 'mkdtemp', 'unlink',
+    'mkstemp', 'mkdtemp', 'unlink', 'listdir', 'getsize', 'getmtime', 'utime',
     'makedirs', 'mkdir',
     'contents', 'load', 'atomic', 'put', 'dump', 'delete'
 )
@@ -24,6 +24,10 @@ basename = os.path.basename
 mkstemp = tempfile.mkstemp
 mkdtemp = tempfile.mkdtemp
 unlink = os.unlink
+listdir = os.listdir
+getsize = os.path.getsize
+getmtime = os.path.getmtime
+utime = os.utime
 
 
 ### Folders
@@ -0,0 +1,268 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""replicate -- copy a repository to read-only followers
+
+A follower pulls from a leader.  It sends the heads it has; the
+leader walks back from its own heads, stopping at records that are
+ancestors of the follower's (see is_ancestor()), and sends the new
+objects followed by its heads as an export stream (see
+export_stream()).  A head that hasn't moved costs nothing more than
+its name.  The follower adds the objects to its static space, then
+moves each HEAD forward.  Objects are content-addressed, so an
+interrupted pull can simply be repeated.
+
+    >>> leader = repository(store.back.memory()).create().open()
+    >>> b = leader.make('live').open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> b.transactionally(b.checkpoint, { k('a'): 1, k('b'): 2 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2)])
+    >>> follower = Follower(repository(store.back.memory()), Leader(leader))
+    >>> follower.step().behind
+    2
+    >>> follower.zs.branch('live').open().items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2)])
+
+Only the objects the follower is missing are sent.
+
+    >>> b.transactionally(b.checkpoint, { k('c'): 3 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2), (key('AlQCAmM'), 3)])
+    >>> follower.step().objects
+    3
+    >>> follower.stats.behind
+    1
+    >>> follower.step().objects
+    0
+    >>> follower.zs.branch('live').open().items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2), (key('AlQCAmM'), 3)])
+
+The leader may rewrite history (see compact()).  A follower whose
+head isn't an ancestor of the leader's any more takes the leader's
+heads as they are; followers are only read, so nothing is lost.
+
+    >>> b.transactionally(b.checkpoint, { k('d'): 4 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2), (key('AlQCAmM'), 3), (key('AlQCAmQ'), 4)])
+    >>> compact(b, keep=1)
+    2
+    >>> follower.step().forced
+    True
+    >>> follower.zs.branch('live').open().head == b.head
+    True
+"""
+
+from __future__ import absolute_import
+import time, threading, socket
+from cStringIO import StringIO
+from md.prelude import *
+from . import store
+from .repo import *
+from .repo import sref
+from .export import export_stream, import_stream, zippers
+
+__all__ = ('Leader', 'Follower', 'ReplicaStats')
+
+REPLICATE_INTERVAL = 5.0
+
+REPLICATE_TIMEOUT = 60.0
+
+class ReplicaStats(object):
+    """The result of a pull.  Behind is the number of heads that
+    moved; lag is the most seconds between a follower's head and the
+    leader's head that replaced it.  Forced is True if the leader had
+    rewritten history and its heads replaced the follower's."""
+
+    __slots__ = ('objects', 'bytes', 'behind', 'lag', 'elapsed', 'when', 'forced')
+
+    def __init__(self):
+        self.objects = self.bytes = self.behind = 0
+        self.lag = self.elapsed = 0.0
+        self.when = time.time()
+        self.forced = False
+
+    def __repr__(self):
+        return '<%s objects=%d bytes=%d behind=%d lag=%.3fs elapsed=%.3fs%s>' % (
+            type(self).__name__,
+            self.objects,
+            self.bytes,
+            self.behind,
+            self.lag,
+            self.elapsed,
+            ' forced' if self.forced else ''
+        )
+
+
+### Leader
+
+class Leader(object):
+    """Send the changes in a repository to followers, in this process
+    or through a socket (see serve())."""
+
+    def __init__(self, zs, timeout=REPLICATE_TIMEOUT):
+        if isinstance(zs, branch):
+            zs = zs.repo
+        self.zs = zs
+        self.timeout = timeout
+
+    def __repr__(self):
+        return '<%s %r>' % (type(self).__name__, self.zs)
+
+    def ship(self, port, since=None):
+        """Write the objects that aren't reachable from since (a
+        mapping of state prefixes to heads) and the current heads to
+        port.  A StreamStats is returned."""
+
+        zs = self.zs.open()
+        if since:
+            ## A head that's been compacted away and collected can't
+            ## be used to skip objects.
+            since = dict((p, h) for (p, h) in since.iteritems() if zs.deref(h) is not Undefined)
+        return export_stream(zs, port, history=True, since=since)
+
+    def pull(self, since):
+        port = StringIO()
+        self.ship(port, since)
+        port.seek(0)
+        return port
+
+    def serve(self, conn):
+        """Answer one follower connected to the socket conn, then
+        close it."""
+
+        try:
+            conn.settimeout(self.timeout)
+            with closing(conn.makefile('rwb')) as port:
+                self.ship(port, _read_heads(port))
+                port.flush()
+        finally:
+            conn.close()
+
+    def listen(self, address, backlog=5):
+        """Serve followers that connect to address from a daemon
+        thread; return the listening socket."""
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(address)
+        sock.listen(backlog)
+        thread = threading.Thread(target=self._accept, args=(sock, ), name='mdb-leader')
+        thread.daemon = True
+        thread.start()
+        return sock
+
+    def _accept(self, sock):
+        while True:
+            try:
+                (conn, _) = sock.accept()
+            except socket.error:
+                ## The listening socket was closed.
+                return
+            self.serve(conn)
+
+## A follower sends its heads as "<prefix> <address>" lines ended by
+## an empty line.  The repository's prefix is empty, so it's sent as
+## "/".
+
+def _write_heads(port, heads):
+    for (prefix, head) in sorted(heads.iteritems()):
+        port.write('%s %s\n' % (prefix or '/', head.address))
+    port.write('\n')
+
+def _read_heads(port):
+    heads = {}
+    for line in iter(port.readline, ''):
+        line = line.strip()
+        if not line:
+            break
+        (prefix, address) = line.split(' ', 1)
+        heads['' if prefix == '/' else prefix] = sref(address)
+    return heads
+
+
+### Follower
+
+class Follower(threading.Thread):
+    """Copy a repository from a leader every interval seconds once
+    the thread is started, or each time step() is called.  The
+    leader is a Leader in this process or the (host, port) address of
+    one that's listening.  The follower's repository should only be
+    read."""
+
+    def __init__(self, zs, leader, interval=REPLICATE_INTERVAL, timeout=REPLICATE_TIMEOUT):
+        super(Follower, self).__init__(name='mdb-follower')
+        self.daemon = True
+        if isinstance(zs, branch):
+            zs = zs.repo
+        self.zs = zs
+        self.leader = leader
+        self.interval = interval
+        self.timeout = timeout
+        self.stats = None
+        self.error = None
+        self._stopped = threading.Event()
+
+    def __repr__(self):
+        return '<%s %r from %r>' % (type(self).__name__, self.zs, self.leader)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.step()
+            except Exception as exc:
+                ## Keep going; the leader may come back.
+                self.error = exc
+
+    def stop(self):
+        self._stopped.set()
+        return self
+
+    def heads(self):
+        """The current heads of the follower by state prefix."""
+
+        zs = self.zs
+        zs._open()
+        if zs._state.get(zs.HEAD) is Undefined:
+            return {}
+        zs.open()
+        return dict((p, s.head) for (p, s) in zippers(zs))
+
+    def step(self):
+        """Pull once and return a ReplicaStats."""
+
+        started = time.time()
+        before = self.heads()
+        stats = ReplicaStats()
+        try:
+            applied = self._pull(before)
+        except RepoError:
+            ## The leader rewrote history.  The objects the follower
+            ## has are still skipped; only the heads are forced.
+            applied = self._pull(before, force=True)
+            stats.forced = True
+
+        (stats.objects, stats.bytes) = (applied.objects, applied.bytes)
+        sources = dict(zippers(self.zs))
+        for (prefix, head) in applied.heads.iteritems():
+            old = before.get(prefix)
+            if old == head:
+                continue
+            stats.behind += 1
+            if old is not None and prefix in sources:
+                zs = sources[prefix]
+                stats.lag = max(stats.lag, zs.deref(head).when - zs.deref(old).when)
+
+        stats.elapsed = time.time() - started
+        self.stats = stats
+        return stats
+
+    def _pull(self, since, force=False):
+        if isinstance(self.leader, Leader):
+            return import_stream(self.zs, self.leader.pull(since), force)
+
+        sock = socket.create_connection(self.leader, self.timeout)
+        try:
+            with closing(sock.makefile('rwb')) as port:
+                _write_heads(port, since)
+                port.flush()
+                return import_stream(self.zs, port, force)
+        finally:
+            sock.close()
@@ -4,7 +4,8 @@
 """repo -- versioned key/value datastore"""
 
 from __future__ import absolute_import
-import os, copy, datetime, weakref, time
+import os, copy, datetime, weakref, time, random, heapq, itertools
+import threading, collections, logging
 from md.prelude import *
 from md import abc, fluid
 from . import store, avro
@@ -12,7 +13,11 @@ from .value import *
 
 __all__ = (
     'RepoError', 'TransactionError', 'TransactionFailed', 'zipper',
-    'repository', 'branch', 'message', 'Deleted'
+    'repository', 'branch', 'snapshot', 'message', 'Deleted',
+    'Conflict', 'conflicts', 'merge_checkpoint', 'publish', 'PublishStats',
+    'diff', 'history', 'is_ancestor', 'merge_base',
+    'TransactionStats', 'TRANSACTIONS', 'retrying', 'compact',
+    'HeadMoved', 'subscribe', 'unsubscribe', 'announce'
 )
 
 class RepoError(store.StoreError):
@@ -92,9 +97,16 @@ class zipper(object):
 
     def __init__(self, state, objects=None, marshall=avro, author=None):
         self._state = store.back.prefixed(state, '', marshall)
-        self._objects = store.back.static(state, marshall, 'objects/')
+        ## Branches share the static space (and its cache) of their
+        ## repository; it's closed by its owner.
+        self._shared = objects is not None
+        self._objects = objects or store.back.static(state, marshall, 'objects/')
         self.author = author or anonymous
         self.head = None
+        self._pinned = None
+        self._committed = None
+        self._lock = threading.RLock()
+        self._graph = CommitGraph(self)
 
     def __repr__(self):
         return '%s(%r, %r)' % (type(self).__name__, self._state, self._objects)
@@ -123,9 +135,11 @@ class zipper(object):
 
     def close(self):
         if self.is_open():
+            self._graph.save()
             self.head = None
             self._state.close()
-            self._objects.close()
+            if not self._shared:
+                self._objects.close()
         return self
 
     def create(self, force=False):
@@ -173,6 +187,22 @@ class zipper(object):
                 for key in keys:
                     yield update(copy.copy(value), _key=key)
 
+    def mproject(self, keys, names):
+        """Produce a (key, (type, state)) pair for each key, where
+        state holds only the named fields of its value (see
+        static.mproject()), or (key, Undefined)."""
+
+        amap = ddict(list)
+        for key in keys:
+            addr = self._address(key)
+            if addr is Undefined:
+                yield (key, Undefined)
+                continue
+            amap[addr].append(key)
+        for (addr, state) in self._objects.mproject(amap, names):
+            for key in amap[addr]:
+                yield (key, state)
+
     def find(self, cls):
         return self.mget(self._scan(cls))
 
@@ -195,13 +225,27 @@ class zipper(object):
     def mput(self, values):
         return ((sref(a), v) for (a, v) in self._objects.mput(values))
 
+    def snapshot(self):
+        """A read-only view of the current head; see snapshot."""
+
+        return snapshot(self)
+
     def transactionally(self, proc, *args, **kw):
-        self.end_transaction(self.begin_transaction(), proc(*args, **kw))
+        self.end_transaction(self.refresh(), proc(*args, **kw))
         return self
 
     def begin_transaction(self):
         return self._state.gets(self.HEAD)
 
+    def refresh(self):
+        """Move to the current HEAD.  Return a transaction mark for
+        it (see begin_transaction())."""
+
+        mark = self.begin_transaction()
+        if mark[0] is not Undefined:
+            self._move_head(mark[0])
+        return mark
+
     def end_transaction(self, (head, token), check):
         if not isinstance(check, checkpoint):
             raise TransactionError('Got %r, expected checkpoint.' % check)
@@ -211,12 +255,18 @@ class zipper(object):
             return False
 
         try:
-            self._state.cas(self.HEAD, new_head, token)
-            ## FIXME: pass check in to prvent unnecessary lookups.
-            self._move_head(new_head)
-            return True
+            with self._lock:
+                self._state.cas(self.HEAD, new_head, token)
+                ## A Watcher doesn't announce a move that this zipper
+                ## announces itself.
+                self._committed = new_head
+                ## FIXME: pass check in to prvent unnecessary lookups.
+                self._move_head(new_head)
+            self._graph.note(new_head, check)
         except store.NotStored:
             raise TransactionFailed('Try again.')
+        announce(self, head, new_head)
+        return True
 
     def amend(self, delta):
         refs = mref(self, delta)
@@ -233,35 +283,57 @@ class zipper(object):
         manifest = make_manifest(self._manifest, self._changes, refs)
         return empty_checkpoint(self, next_commit(self, manifest))
 
+    def index(self):
+        """The working manifest of the current head.  It's never
+        mutated, so it can be kept as a snapshot of the keyspace."""
+
+        return self._refs
+
     def items(self):
         return tree(self.iteritems())
 
     def iteritems(self):
-        amap = dict((r.address, k) for (k, r) in self._refs.iteritems())
+        amap = dict(
+            (r.address, k) for (k, r) in
+            ((k, resolved(r)) for (k, r) in self._refs.iteritems())
+            if r
+        )
         return ((amap[a], v) for (a, v) in self._mget(amap))
 
     def _move_head(self, head):
         assert isinstance(head, sref), 'Expected sref, got %r.' % head
-        if head != self.head:
-            self.head = head
-            self._refs = self._rebuild_index()
+        with self._lock:
+            if head == self.head:
+                return False
+            ## Load the new version before anything is replaced, then
+            ## replace it all at once.  Snapshots are made from
+            ## _pinned in one step, so they see a head and index that
+            ## go together.
+            (manifest, changes) = self._rebuild_index(head)
+            pinned = (head, working(changes, manifest), manifest, changes)
+            (self.head, self._refs, self._manifest, self._changes) = pinned
+            self._pinned = pinned
             return True
-        return False
 
     def _create(self):
         return empty_commit(self)
 
-    def _rebuild_index(self):
-        self._manifest = last_manifest(self)
-        self._changes = last_changeset(self)
-        return working(self._changes, self._manifest)
+    def _rebuild_index(self, head):
+        check = self.deref(head)
+        if not check:
+            return (manifest(), changeset())
+        commit = self.deref(check.commits[0]) if check.commits else Undefined
+        return (
+            self.deref(commit.changes) if commit else manifest(),
+            self.deref(check.changes)
+        )
 
     def _ref(self, key):
         return self._refs.get(key)
 
     def _address(self, key):
-        probe = self._refs.get(key)
-        return probe and probe.address
+        probe = resolved(self._refs.get(key))
+        return probe.address if probe else Undefined
 
     def _get(self, address):
         return self._objects.get(address)
@@ -289,13 +361,63 @@ class repository(zipper):
     <M.branch foo>
     >>> b.transactionally(b.checkpoint, { Key.make('T', 'a'): u'a-value' }).items()
     tree([(key('AlQCAmE'), u'a-value')])
+
+    Servers should use handle() to get a branch.  Open branches are
+    pooled; a handle is reused until its branch moves.
+
+    >>> r.handle('foo') is r.handle('foo')
+    True
     """
 
+    HANDLES = 64
+
+    def __init__(self, *args, **kw):
+        super(repository, self).__init__(*args, **kw)
+        self._handles = collections.OrderedDict()
+        self._handles_lock = threading.Lock()
+
     def branch(self, name):
         key = Key.make(Branch, name)
         state = store.back.prefixed(self._state, self._qualify(name))
         return branch(key, self, state, self._objects)
 
+    def handle(self, name):
+        """Return an open branch at its current head from a pool of
+        recently used ones.  A handle that's been returned may be in
+        use, so handle() never moves it; if the branch has moved, a
+        new handle replaces it in the pool.  Transactions through a
+        handle do move it; read from a snapshot() of it to see one
+        version."""
+
+        with self._handles_lock:
+            zs = self._handles.pop(name, None)
+            if zs is not None:
+                self._handles[name] = zs
+        if zs is not None:
+            if zs._state.get(zs.HEAD) == zs.head:
+                return zs
+            ## The commit graph and the record of this process's last
+            ## transaction carry over to the new handle.
+            fresh = self.branch(name).open()
+            (fresh._graph, fresh._committed) = (zs._graph, zs._committed)
+            with self._handles_lock:
+                if self._handles.get(name) is zs:
+                    self._handles[name] = fresh
+                return self._handles.get(name, fresh)
+
+        zs = self.branch(name).open()
+        with self._handles_lock:
+            zs = self._handles.setdefault(name, zs)
+            evicted = [
+                self._handles.popitem(last=False)[1]
+                for _ in xrange(len(self._handles) - self.HANDLES)
+            ]
+        ## An evicted handle may still be in use, and closing it would
+        ## close the shared backing store; just save its vertices.
+        for old in evicted:
+            old._graph.save()
+        return zs
+
     def branches(self):
         return self.find(Branch)
 
@@ -309,6 +431,8 @@ class repository(zipper):
         return self.new(Branch, kw)
 
     def remove(self, branch):
+        with self._handles_lock:
+            self._handles.pop(branch.name, None)
         return self.transactionally(self._remove, branch)
 
     def _create(self):
@@ -355,6 +479,65 @@ class branch(zipper):
     def publish(self):
         return self.config.publish
 
+class snapshot(zipper):
+    """A read-only view of a zipper pinned to the head it had when
+    the snapshot was made.  Nothing is copied: the working manifest of
+    a head is never mutated, and the static space (with its cache) is
+    shared.  Any number of threads can read from snapshots while
+    another commits to the zipper.  Other attributes, like the name of
+    a branch, are the zipper's.
+
+    >>> zs = zipper(store.back.memory()).create().open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> view = zs.transactionally(zs.checkpoint, { k('a'): 1 }).snapshot()
+    >>> zs.transactionally(zs.checkpoint, { k('a'): 2 }).items()
+    tree([(key('AlQCAmE'), 2)])
+    >>> view.items()
+    tree([(key('AlQCAmE'), 1)])
+    >>> view.checkpoint({ k('a'): 3 })
+    Traceback (most recent call last):
+      ...
+    RepoError: snapshot(...) is read-only.
+    """
+
+    def __init__(self, zs):
+        if not zs.is_open():
+            raise RepoError('Open %r first.' % zs)
+        self.origin = zs
+        self._state = zs._state
+        self._objects = zs._objects
+        self._graph = zs._graph
+        self.author = zs.author
+        (self.head, self._refs, self._manifest, self._changes) = zs._pinned
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (type(self).__name__, self.origin, self.head)
+
+    def __getattr__(self, name):
+        if name == 'origin':
+            raise AttributeError(name)
+        return getattr(self.origin, name)
+
+    def open(self):
+        return self
+
+    def close(self):
+        ## The static space belongs to the zipper.
+        return self
+
+    def snapshot(self):
+        return self
+
+    def refresh(self):
+        return (self.head, None)
+
+    def _read_only(self, *args, **kw):
+        raise RepoError('%r is read-only.' % self)
+
+    create = destroy = put = mput = transactionally = _read_only
+    begin_transaction = end_transaction = _read_only
+    amend = checkpoint = commit = _read_only
+
 
 ### Marshalling
 
@@ -467,6 +650,266 @@ class checkpoint(avro.structure('M.checkpoint')):
     def date(self):
         return datetime.fromtimestamp(self.when)
 
+## The commit graph is an index of the history.  It keeps a vertex
+## for each commit or checkpoint: the addresses of its parents, their
+## generation numbers, and its own generation number (one more than
+## the greatest generation of its parents).  This allows the history
+## to be traversed in order without loading records.
+##
+## Each vertex is stored under GRAPH/<address>.  It's also merged
+## into the segment under GRAPH@<n>, which holds the vertices with
+## generations from n * GRAPH_SEGMENT up to the next segment.  A walk
+## reads the vertex it starts from, then one segment for each
+## GRAPH_SEGMENT generations it visits.  Segments are shared by every
+## writer of the zipper and merged with CAS; a vertex that isn't in
+## its segment is read on its own.
+
+GRAPH_SEGMENT = 256
+
+GRAPH_CACHE = 4096
+
+GRAPH_RETRIES = 4
+
+class vertex(avro.structure('M.vertex')):
+    """A commit graph entry."""
+
+parents = avro.array(avro.string)
+
+generations = avro.array(avro.long)
+
+segment = avro.map(vertex)
+
+class CommitGraph(object):
+    """A lazily built commit graph for a zipper.  Vertices are
+    computed from records the first time they're needed and saved in
+    the zipper's state.  At most cache vertices are kept in memory.
+
+    >>> zs = zipper(store.back.memory()).create().open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> a = zs.transactionally(zs.checkpoint, { k('a'): 1 }).head
+    >>> zs._graph.generation(a.address)
+    2
+    >>> zs._graph.forget([a.address])
+    1
+    >>> zs._state.get(CommitGraph.PREFIX + a.address) is Undefined
+    True
+    """
+
+    PREFIX = 'GRAPH/'
+    SEGMENT = 'GRAPH@'
+
+    def __init__(self, zs, cache=GRAPH_CACHE):
+        self._zs = zs
+        self._cache = cache
+        self._vertices = collections.OrderedDict()
+        self._segments = collections.OrderedDict()
+        self._added = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, address):
+        return self._lookup(address) is not None
+
+    def generation(self, address):
+        return self.vertex(address).generation
+
+    def parents(self, address):
+        return self.vertex(address).prev
+
+    def edges(self, address, generation=None):
+        """The (address, generation) of each parent of address.  If
+        the generation of address is known, its segment is read."""
+
+        probe = self.vertex(address, generation)
+        if len(probe.generations) == len(probe.prev):
+            return zip(probe.prev, probe.generations)
+        return [(p, self.generation(p)) for p in probe.prev]
+
+    def vertex(self, address, generation=None):
+        probe = self._lookup(address, generation)
+        if probe is None:
+            self._fill(address)
+            self.save()
+            probe = self._lookup(address)
+        return probe
+
+    def note(self, ref, record):
+        """Add a vertex for a new record if its parents are already
+        in the graph.  Otherwise it's computed when needed."""
+
+        prev = [r.address for r in record.prev]
+        known = self._mlookup(prev)
+        if all(p in known for p in prev):
+            self._add(ref.address, prev, [known[p].generation for p in prev])
+            self.save()
+
+    def save(self):
+        with self._lock:
+            (added, self._added) = (self._added, {})
+        if not added:
+            return
+
+        try:
+            self._zs._state.madd((self.PREFIX + a, v) for (a, v) in added.iteritems())
+        except store.NotStored:
+            ## Another process saved some of them first.  Vertices
+            ## never change, so theirs are the same.
+            pass
+
+        for (n, group) in _segmented(added.iteritems()).iteritems():
+            self._update(n, lambda seg: seg.update(group))
+
+    def forget(self, addresses):
+        """Drop the vertices of records that were deleted; return how
+        many there were."""
+
+        keys = [self.PREFIX + a for a in addresses]
+        found = dict(
+            (k[len(self.PREFIX):], v)
+            for (k, v) in self._zs._state.mget(keys)
+            if v is not Undefined
+        )
+        with self._lock:
+            for address in addresses:
+                self._vertices.pop(address, None)
+        if not found:
+            return 0
+
+        for (n, group) in _segmented(found.iteritems()).iteritems():
+            self._update(n, lambda seg: _drop(seg, group))
+        try:
+            self._zs._state.mdelete(self.PREFIX + a for a in found)
+        except store.NotFound:
+            pass
+        return len(found)
+
+    def _lookup(self, address, generation=None):
+        probe = self._cached(address)
+        if probe is None and generation is not None:
+            self._load(generation // GRAPH_SEGMENT)
+            probe = self._cached(address)
+        if probe is None:
+            probe = self._zs._state.get(self.PREFIX + address)
+            if probe is Undefined:
+                return None
+            self._remember([(address, probe)])
+        return probe
+
+    def _mlookup(self, addresses):
+        found = {}
+        for address in addresses:
+            probe = self._cached(address)
+            if probe is not None:
+                found[address] = probe
+        missing = [self.PREFIX + a for a in addresses if a not in found]
+        if missing:
+            loaded = [
+                (k[len(self.PREFIX):], v)
+                for (k, v) in self._zs._state.mget(missing)
+                if v is not Undefined
+            ]
+            self._remember(loaded)
+            found.update(loaded)
+        return found
+
+    def _cached(self, address):
+        with self._lock:
+            probe = self._added.get(address)
+            if probe is None:
+                probe = self._vertices.pop(address, None)
+                if probe is not None:
+                    self._vertices[address] = probe
+            return probe
+
+    def _remember(self, pairs):
+        with self._lock:
+            for (address, probe) in pairs:
+                self._vertices.pop(address, None)
+                self._vertices[address] = probe
+            while len(self._vertices) > self._cache:
+                self._vertices.popitem(last=False)
+
+    def _load(self, n):
+        ## A segment that was read recently isn't read again; a vertex
+        ## missing from it is read on its own.
+        with self._lock:
+            if self._segments.pop(n, None) is not None:
+                self._segments[n] = True
+                return
+            self._segments[n] = True
+            while len(self._segments) > max(1, self._cache // GRAPH_SEGMENT // 2):
+                self._segments.popitem(last=False)
+        stored = self._zs._state.get('%s%d' % (self.SEGMENT, n))
+        if stored is not Undefined:
+            self._remember(stored.iteritems())
+
+    def _update(self, n, proc):
+        key = '%s%d' % (self.SEGMENT, n)
+        state = self._zs._state
+        for _ in xrange(GRAPH_RETRIES):
+            (stored, token) = state.gets(key)
+            current = {} if stored is Undefined else dict(stored)
+            proc(current)
+            try:
+                if token is None:
+                    state.add(key, segment(current.iteritems()))
+                elif current:
+                    state.cas(key, segment(current.iteritems()), token)
+                else:
+                    state.delete(key)
+                break
+            except (store.NotStored, store.NotFound):
+                continue
+        with self._lock:
+            self._segments.pop(n, None)
+
+    def _add(self, address, prev, gens):
+        gen = 1 + max(gens or [0])
+        probe = vertex(gen, parents(prev), generations(gens))
+        with self._lock:
+            self._added[address] = probe
+        self._remember([(address, probe)])
+        return probe
+
+    def _fill(self, address):
+        ## Records are loaded a step of the walk at a time, and the
+        ## vertices of their parents are looked up together.
+        (prevs, gens, frontier) = ({}, {}, [address])
+        while frontier:
+            following = set()
+            for (addr, record) in self._zs._mget(frontier):
+                prev = prevs[addr] = [r.address for r in record.prev]
+                following.update(p for p in prev if p not in prevs and p not in gens)
+            known = self._mlookup(following)
+            gens.update((a, v.generation) for (a, v) in known.iteritems())
+            frontier = [p for p in following if p not in known]
+
+        ## Depth-first: a vertex is added once all of its parents
+        ## have been.
+        stack = [address]
+        while stack:
+            addr = stack[-1]
+            if addr in gens:
+                stack.pop()
+                continue
+            missing = [p for p in prevs[addr] if p not in gens]
+            if missing:
+                stack.extend(missing)
+                continue
+            gens[addr] = self._add(addr, prevs[addr], [gens[p] for p in prevs[addr]]).generation
+            stack.pop()
+            if len(self._added) >= self._cache:
+                self.save()
+
+def _segmented(pairs):
+    groups = {}
+    for (address, probe) in pairs:
+        groups.setdefault(probe.generation // GRAPH_SEGMENT, {})[address] = probe
+    return groups
+
+def _drop(seg, addresses):
+    for address in addresses:
+        seg.pop(address, None)
+
 ## Commits and checkpoints track who made a change, when it happened,
 ## and why it happened.
 
@@ -523,6 +966,42 @@ previous = avro.array(sref)
 
 Deleted = sref('deleted')
 
+## When a merge finds a key that was changed differently on both
+## sides, a Conflict marker is put in the changeset.  It records both
+## references in its address.  Until the conflict is resolved by
+## changing the key again, reads see the "mine" side.  Conflicts can't
+## be committed.
+
+CONFLICT = 'conflict:'
+
+def Conflict(mine, yours):
+    return sref('%s%s:%s' % (CONFLICT, _side(mine), _side(yours)))
+
+def is_conflict(ref):
+    return isinstance(ref, sref) and ref.address.startswith(CONFLICT)
+
+def conflict_sides(ref):
+    (mine, yours) = ref.address[len(CONFLICT):].split(':')
+    return (sref(mine), sref(yours))
+
+def resolved(ref):
+    """Return the static reference that should be read for ref, or
+    None if there isn't one."""
+
+    if is_conflict(ref):
+        ref = conflict_sides(ref)[0]
+    return None if (not ref or ref is Deleted) else ref
+
+def _absent(ref):
+    ## A key is absent when it's deleted or its conflict marker reads
+    ## as deleted.
+    return ref is Deleted or (is_conflict(ref) and resolved(ref) is None)
+
+def _side(ref):
+    if is_conflict(ref):
+        ref = conflict_sides(ref)[0]
+    return (ref or Deleted).address
+
 
 ### Working Manifest
 
@@ -577,12 +1056,12 @@ class working(object):
             value = self._changes[key]
         except KeyError:
             value = self._manifest.get(key, default)
-        return default if value is Deleted else value
+        return default if _absent(value) else value
 
     def iteritems(self):
         return (
             i for i in tree_merge(self._changes, self._manifest)
-            if i[1] is not Deleted
+            if not _absent(i[1])
         )
 
     def items(self):
@@ -639,6 +1118,80 @@ def tree_merge(mine, yours):
     for item in rest:
         yield item
 
+def tree_diff(mine, yours):
+    """Walk two trees in key-order.  Yield a (key, mine, yours) item
+    for each key that has different values; a tree that doesn't have
+    the key contributes Undefined.
+
+    >>> list(tree_diff(tree(a=1, b=2, c=3), tree(a=1, b=4, d=5)))
+    [('b', 2, 4), ('c', 3, <undefined>), ('d', <undefined>, 5)]
+    """
+
+    mine = items(mine); me = next(mine, Done)
+    yours = items(yours); you = next(yours, Done)
+
+    while me is not Done or you is not Done:
+        mk = me[0] if me is not Done else None
+        yk = you[0] if you is not Done else None
+
+        if you is Done or (me is not Done and mk < yk):
+            yield (mk, me[1], Undefined)
+            me = next(mine, Done)
+        elif me is Done or yk < mk:
+            yield (yk, Undefined, you[1])
+            you = next(yours, Done)
+        else:
+            if me[1] != you[1]:
+                yield (mk, me[1], you[1])
+            me = next(mine, Done); you = next(yours, Done)
+
+def tree_merge3(base, mine, yours):
+    """Walk three trees in key-order at once.  Yield a (key, base,
+    mine, yours) item for each key; a tree that doesn't have the key
+    contributes Undefined.
+
+    >>> [i[0] for i in tree_merge3(tree(b=1), tree(a=2, b=3), tree(c=4))]
+    ['a', 'b', 'c']
+    """
+
+    seqs = [items(base), items(mine), items(yours)]
+    heads = [next(s, Done) for s in seqs]
+
+    while True:
+        live = [h[0] for h in heads if h is not Done]
+        if not live:
+            return
+        key = min(live)
+        row = [key]
+        for (pos, head) in enumerate(heads):
+            if head is not Done and head[0] == key:
+                row.append(head[1])
+                heads[pos] = next(seqs[pos], Done)
+            else:
+                row.append(Undefined)
+        yield tuple(row)
+
+def merge_changes(base, mine, yours):
+    """Three-way merge of the logical keyspaces mine and yours,
+    which both changed base.  Yield (key, ref) updates that bring
+    yours up to date with mine.  A key changed in different ways on
+    both sides is a Conflict.
+
+    >>> base = tree(a=sref('1'), b=sref('2'))
+    >>> mine = tree(a=sref('3'), b=sref('2'), c=sref('4'))
+    >>> yours = tree(a=sref('5'))
+    >>> list(merge_changes(base, mine, yours))
+    [('a', sref(address='conflict:3:5')), ('c', sref(address='4'))]
+    """
+
+    for (key, b, m, y) in tree_merge3(base, mine, yours):
+        if m == b or m == y:
+            continue
+        elif y == b:
+            yield (key, Deleted if m is Undefined else m)
+        else:
+            yield (key, Conflict(m, y))
+
 
 ### Operations
 
@@ -697,21 +1250,164 @@ def commits(zs):
         return ()
     return (c for (r, c) in ancestors(zs, check.commits))
 
+HISTORY_BATCH = 64
+
 @zop
 def ancestors(zs, refs):
-    """Breadth-first traversal over unique ancestors."""
+    """Traversal over unique ancestors, most recent generation
+    first.  The commit graph orders the traversal; records are loaded
+    in batches."""
+
+    seq = history(zs, refs)
+    while True:
+        batch = list(itertools.islice(seq, HISTORY_BATCH))
+        if not batch:
+            return
+        loaded = dict(zs.mderef(batch))
+        for ref in batch:
+            yield (ref, loaded[ref])
+
+## The commit graph answers these questions without loading records.
+## A priority queue keyed on generation visits every vertex after all
+## of its descendants, so duplicate entries come out together and no
+## visited set is needed.
 
-    queue = deque(zs.mderef(refs))
-    visited = set()
+@zop
+def history(zs, refs):
+    """Iterate over references to refs and their unique ancestors,
+    most recent generation first.
+
+    >>> zs = zipper(store.back.memory()).create().open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> a = zs.transactionally(zs.checkpoint, { k('a'): 1 }).head
+    >>> b = zs.transactionally(zs.checkpoint, { k('b'): 2 }).head
+    >>> [r.address for r in history(zs, [b])][0:2] == [b.address, a.address]
+    True
+    >>> (is_ancestor(zs, a, b), is_ancestor(zs, b, a), merge_base(zs, a, b) is a)
+    (True, False, True)
+    """
+
+    graph = zs._graph
+    queue = [(-graph.generation(r.address), r.address) for r in refs]
+    heapq.heapify(queue)
+    last = None
 
     while queue:
-        (ref, commit) = queue.popleft()
-        if ref.address in visited:
+        (gen, addr) = heapq.heappop(queue)
+        if addr == last:
             continue
+        last = addr
+        yield sref(addr)
+        for (p, pgen) in graph.edges(addr, -gen):
+            heapq.heappush(queue, (-pgen, p))
+
+@zop
+def is_ancestor(zs, a, b):
+    """Is the commit or checkpoint a the same as b or one of its
+    ancestors?"""
+
+    graph = zs._graph
+    (target, floor) = (a.address, graph.generation(a.address))
+    queue = [(-graph.generation(b.address), b.address)]
+    last = None
+
+    while queue:
+        (gen, addr) = heapq.heappop(queue)
+        if addr == last:
+            continue
+        elif addr == target:
+            return True
+        last = addr
+        for (p, pgen) in graph.edges(addr, -gen):
+            if pgen >= floor:
+                heapq.heappush(queue, (-pgen, p))
+
+    return False
+
+@zop
+def merge_base(zs, a, b):
+    """Find the most recent common ancestor of the commits or
+    checkpoints a and b.  Return None if they aren't related."""
+
+    graph = zs._graph
+    colors = { a.address: 1 }
+    colors[b.address] = colors.get(b.address, 0) | 2
+    queue = [(-graph.generation(addr), addr) for addr in colors]
+    heapq.heapify(queue)
+
+    while queue:
+        (gen, addr) = heapq.heappop(queue)
+        color = colors.pop(addr)
+        if color == 3:
+            return sref(addr)
+        for (p, pgen) in graph.edges(addr, -gen):
+            if p not in colors:
+                heapq.heappush(queue, (-pgen, p))
+            colors[p] = colors.get(p, 0) | color
+
+    return None
+
+## The logical keyspaces of any two commits or checkpoints can be
+## compared by walking their working manifests in key-order.  When
+## both are made against the same manifest, which is the common case
+## for checkpoints, the shared manifest is skipped and only the
+## changesets are walked.
+
+@zop
+def diff(zs, a, b):
+    """Compare the logical keyspaces at references a and b to
+    commits or checkpoints.  Yield an (op, key, old, new) item in
+    key-order for each key that differs; op is 'added', 'removed', or
+    'changed'.
+
+    >>> zs = zipper(store.back.memory()).create().open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> a = zs.transactionally(zs.checkpoint, { k('a'): 1, k('b'): 2 }).head
+    >>> b = zs.transactionally(zs.checkpoint, { k('a'): Deleted, k('b'): 3, k('c'): 4 }).head
+    >>> [(op, key) for (op, key, _, _) in diff(zs, a, b)]
+    [('removed', key('AlQCAmE')), ('changed', key('AlQCAmI')), ('added', key('AlQCAmM'))]
+    """
+
+    (ca, ma) = _diff_parts(zs, a)
+    (cb, mb) = _diff_parts(zs, b)
+
+    if ma == mb:
+        if ca == cb:
+            return
+        (ca, cb) = (_diff_load(zs, ca, changeset), _diff_load(zs, cb, changeset))
+        shared = _diff_load(zs, ma, manifest)
+        (wa, wb) = (working(ca, shared), working(cb, shared))
+        seq = (
+            (k, wa.get(k), wb.get(k))
+            for k in keys(tree_merge(ca, cb))
+        )
+        seq = (i for i in seq if i[1] != i[2])
+    else:
+        seq = tree_diff(
+            working(_diff_load(zs, ca, changeset), _diff_load(zs, ma, manifest)),
+            working(_diff_load(zs, cb, changeset), _diff_load(zs, mb, manifest))
+        )
+
+    for (key, old, new) in seq:
+        if old is Undefined:
+            yield ('added', key, old, new)
+        elif new is Undefined:
+            yield ('removed', key, old, new)
         else:
-            queue.extend(zs.mderef(commit.prev))
-            yield (ref, commit)
-            visited.add(ref.address)
+            yield ('changed', key, old, new)
+
+def _diff_parts(zs, ref):
+    ## Return (changeset, manifest) references for a checkpoint or
+    ## commit.  Either may be None.
+    obj = zs.deref(ref)
+    if isinstance(obj, commit):
+        return (None, obj.changes)
+    elif not obj.commits:
+        return (obj.changes, None)
+    return (obj.changes, zs.deref(obj.commits[0]).changes)
+
+def _diff_load(zs, ref, empty):
+    return zs.deref(ref) if ref else empty()
 
 ## When the logical keyspace is changed, objects are put() into the
 ## static space.  When this happens, the serialized object is hashed
@@ -785,6 +1481,8 @@ def make_manifest(manifest, changes, updates):
     for (key, ref) in changes.iteritems():
         if ref is Deleted:
             del manifest[key]
+        elif is_conflict(ref):
+            raise TransactionError('Unresolved conflict: %r.' % key)
         else:
             assert isinstance(ref, Static), 'Not static: <%r, %r>.' % (key, ref)
             manifest[key] = ref
@@ -809,3 +1507,363 @@ def next_commit(zs, changes):
     check = last_checkpoint(zs)
     return make_commit(zs, changes, *check.commits)
 
+
+### Transactions
+
+## Transactions are optimistic.  If another writer moves HEAD between
+## begin_transaction() and end_transaction(), the CAS fails and
+## TransactionFailed is raised.  The retrying() runner moves to the
+## new HEAD and replays the changes on top of it as long as the other
+## writer didn't touch the same keys.  Checkpoints may be merged into
+## the new HEAD instead.
+
+RETRY_ATTEMPTS = 8
+
+RETRY_BACKOFF = 0.005
+
+class TransactionStats(object):
+    """Counters maintained by retrying()."""
+
+    __slots__ = ('attempts', 'conflicts', 'rebased', 'merged')
+
+    def __init__(self):
+        self.attempts = self.conflicts = self.rebased = self.merged = 0
+
+    def __repr__(self):
+        return '<%s attempts=%d conflicts=%d rebased=%d merged=%d>' % (
+            type(self).__name__,
+            self.attempts,
+            self.conflicts,
+            self.rebased,
+            self.merged
+        )
+
+TRANSACTIONS = TransactionStats()
+
+def retrying(zs, proc, delta, mark=None, base=None, merge=False,
+             attempts=RETRY_ATTEMPTS, backoff=RETRY_BACKOFF,
+             stats=TRANSACTIONS):
+    """Write proc(delta) to zs in a transaction.  The delta is a
+    mapping of keys to values; proc is a method like zs.checkpoint.
+
+    The mark and base are the transaction mark and the index the delta
+    was made against; they default to the current HEAD.  When another
+    writer wins the CAS, zs is refreshed.  If none of the keys in
+    delta changed, the delta is rebased onto the new HEAD and retried
+    after a jittered, exponential backoff.  Otherwise, if merge is
+    True, the checkpoint made by proc is merged into the new HEAD (see
+    merge_checkpoint()) and retried; if not, TransactionFailed is
+    raised.
+
+    >>> back = store.back.memory()
+    >>> (z1, z2) = (zipper(back).create().open(), zipper(back).open())
+    >>> k = lambda name: Key.make('T', name)
+    >>> mark = z1.begin_transaction()
+    >>> z2.transactionally(z2.checkpoint, { k('a'): 1 }).items()
+    tree([(key('AlQCAmE'), 1)])
+    >>> stats = TransactionStats()
+    >>> retrying(z1, z1.checkpoint, { k('b'): 2 }, mark, stats=stats).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2)])
+    >>> stats
+    <TransactionStats attempts=2 conflicts=1 rebased=1 merged=0>
+
+    >>> mark = z1.begin_transaction()
+    >>> z2.transactionally(z2.checkpoint, { k('b'): 3 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 3)])
+    >>> retrying(z1, z1.checkpoint, { k('b'): 4 }, mark, stats=stats)
+    Traceback (most recent call last):
+      ...
+    TransactionFailed: Conflicting changes to [key('AlQCAmI')].
+
+    With merge, a key changed on both sides becomes a Conflict.  Reads
+    see this side; here, the key was deleted.
+
+    >>> mark = z1.begin_transaction()
+    >>> z2.transactionally(z2.checkpoint, { k('a'): 5 }).items()
+    tree([(key('AlQCAmE'), 5), (key('AlQCAmI'), 3)])
+    >>> retrying(z1, z1.checkpoint, { k('a'): Deleted }, mark, merge=True, stats=stats).items()
+    tree([(key('AlQCAmI'), 3)])
+    >>> [key for (key, _, _) in conflicts(z1)]
+    [key('AlQCAmE')]
+    >>> z1.index().keys()
+    [key('AlQCAmI')]
+    """
+
+    if mark is None:
+        mark = zs.refresh()
+    if base is None:
+        base = zs.index()
+
+    check = proc(delta)
+    merged = False
+    for attempt in xrange(attempts):
+        stats.attempts += 1
+        try:
+            zs.end_transaction(mark, check)
+            if attempt:
+                stats.rebased += 1
+            return zs
+        except TransactionFailed:
+            stats.conflicts += 1
+            if attempt == attempts - 1:
+                break
+
+        mark = zs.refresh()
+        index = zs.index()
+        changed = [k for k in delta if base.get(k) != index.get(k)]
+        if merged or changed:
+            if not merge:
+                raise TransactionFailed('Conflicting changes to %r.' % changed)
+            ## Once merged, the checkpoint may contain conflict
+            ## markers that a replay would lose; keep merging.
+            check = merge_checkpoint(zs, base, check)
+            stats.merged += 1
+            merged = True
+        else:
+            check = proc(delta)
+        base = index
+        time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+
+    raise TransactionFailed('Gave up after %d attempts.' % attempts)
+
+## A checkpoint that lost the race for HEAD can be merged into the
+## winner.  The logical keyspace of the checkpoint is compared against
+## the new HEAD and the index the checkpoint was made against in one
+## pass over the three (key-ordered) manifests.
+
+@zop
+def merge_checkpoint(zs, base, check):
+    """Merge the checkpoint check, which was made against the index
+    base, into the head of zs.  Keys changed on only one side are
+    merged automatically; keys changed on both sides become
+    Conflicts.  The new checkpoint links to both histories."""
+
+    updates = merge_changes(base, checkpoint_index(zs, check), zs.index())
+    changes = make_changeset(zs._manifest, zs._changes, updates)
+    head = last_checkpoint(zs)
+    return make_checkpoint(zs, changes, head.commits, zs.head, check)
+
+def checkpoint_index(zs, check):
+    """The working manifest of a checkpoint."""
+
+    commit = zs.deref(check.commits[0]) if check.commits else None
+    return working(
+        zs.deref(check.changes),
+        zs.deref(commit.changes) if commit else manifest()
+    )
+
+def conflicts(zs):
+    """Iterate over (key, mine, yours) for each unresolved conflict in
+    the current changeset."""
+
+    for (key, ref) in items(zs._changes):
+        if is_conflict(ref):
+            (mine, yours) = conflict_sides(ref)
+            yield (key, mine, yours)
+
+
+### Change Feed
+
+## Subscribers are called with a HeadMoved event each time a zipper
+## in this process moves HEAD in a transaction.  A Watcher (see
+## watch.py) announces changes made by other processes.  Readers use
+## them to refresh indexes and views; see db.on_change().
+
+SUBSCRIBERS = []
+
+def subscribe(proc):
+    SUBSCRIBERS.append(proc)
+    return proc
+
+def unsubscribe(proc):
+    if proc in SUBSCRIBERS:
+        SUBSCRIBERS.remove(proc)
+    return proc
+
+def announce(zs, old, new, local=True):
+    ## The transaction has already been made; a subscriber that fails
+    ## is logged and doesn't stop the others.
+    if SUBSCRIBERS:
+        event = HeadMoved(zs, old, new, local)
+        for proc in list(SUBSCRIBERS):
+            try:
+                proc(event)
+            except Exception:
+                logging.getLogger(__name__).exception('Subscriber %r failed.', proc)
+
+class HeadMoved(object):
+    """The head of a zipper moved from old to new.  The name is the
+    name of the branch, or '' for a repository or standalone zipper.
+    Events from other processes aren't local; old is None the first
+    time a branch is seen.
+
+    >>> zs = zipper(store.back.memory()).create().open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> events = []
+    >>> proc = subscribe(events.append)
+    >>> zs.transactionally(zs.checkpoint, { k('a'): 1, k('b'): 2 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 2)])
+    >>> zs.transactionally(zs.checkpoint, { k('b'): 3 }).items()
+    tree([(key('AlQCAmE'), 1), (key('AlQCAmI'), 3)])
+    >>> unsubscribe(proc) and events[-1].changed
+    [key('AlQCAmI')]
+    """
+
+    __slots__ = ('zipper', 'name', 'old', 'new', 'local', '_changed')
+
+    def __init__(self, zs, old, new, local=True):
+        self.zipper = zs
+        self.name = zs.name if isinstance(zs, branch) else ''
+        self.old = old
+        self.new = new
+        self.local = local
+        self._changed = None
+
+    def __repr__(self):
+        return '<%s %r %s -> %s>' % (
+            type(self).__name__,
+            self.name,
+            self.old and self.old.address,
+            self.new.address
+        )
+
+    @property
+    def changed(self):
+        """The keys that differ between the old and new heads, or
+        None if the old head isn't known."""
+
+        if self.old is None:
+            return None
+        elif self._changed is None:
+            self._changed = [k for (_, k, _, _) in diff(self.zipper, self.old, self.new)]
+        return self._changed
+
+
+### Publishing
+
+## Branches share a static space, so publishing one branch to another
+## doesn't need to copy any objects.  The logical keyspaces of the two
+## branch heads are compared with diff() and the references that
+## differ are committed to the target.
+
+class PublishStats(object):
+    """The result of publish()."""
+
+    __slots__ = ('changed', 'elapsed')
+
+    def __init__(self, changed=0, elapsed=0.0):
+        self.changed = changed
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return '<%s changed=%d elapsed=%.3fs rate=%.1f/s>' % (
+            type(self).__name__,
+            self.changed,
+            self.elapsed,
+            self.rate
+        )
+
+    @property
+    def rate(self):
+        """References published per second."""
+
+        return self.changed / self.elapsed if self.elapsed else 0.0
+
+@zop
+def publish(zs, target):
+    """Commit the references in zs that differ from target to target.
+    No objects are loaded or stored.  A PublishStats is returned.
+
+    >>> r = repository(store.back.memory()).create().open()
+    >>> (live, staging) = (r.make('live').open(), r.make('staging').open())
+    >>> staging.transactionally(staging.checkpoint, { Key.make('T', 'a'): 1 }).items()
+    tree([(key('AlQCAmE'), 1)])
+    >>> publish(staging, live)
+    <PublishStats changed=1 ...>
+    >>> live.items()
+    tree([(key('AlQCAmE'), 1)])
+    """
+
+    started = time.time()
+    zs.refresh()
+    ## The updates are made against this version of target; if it
+    ## moves before they're committed, changes to the same keys are
+    ## conflicts.
+    mark = target.refresh()
+    base = target.index()
+    updates = dict(
+        (k, Deleted if new is Undefined else new)
+        for (_, k, _, new) in diff(zs, target.head, zs.head)
+    )
+    if updates:
+        retrying(target, target.commit, updates, mark, base)
+    return PublishStats(len(updates), time.time() - started)
+
+
+### Compaction
+
+## Each checkpoint links to the one before it, so a branch that's
+## checkpointed often but rarely committed builds a long chain.  The
+## changeset of a checkpoint holds every change since the last
+## commit, so the chain can be cut anywhere: an old checkpoint is
+## replaced by a copy without parents and the checkpoints after it
+## are copied to link to the replacement.  The other parents of a
+## merge checkpoint share history with the chain below it, so the
+## chain isn't cut below a merge that's kept; a merge can be the
+## checkpoint that's cut.
+##
+## Compaction rewrites history that others may have seen.  The
+## keyspace doesn't change, so a writer that loses the race for HEAD
+## to it rebases its delta (see retrying()).  A writer that had
+## already merged links its merge to the old chain, which stays
+## reachable until the merge is compacted in turn.  A replica whose
+## head was in the old chain can't move forward; see replicate.py.
+
+COMPACT_KEEP = 32
+
+@zop
+def compact(zs, keep=COMPACT_KEEP, age=None):
+    """Fold the checkpoints of zs after the keep most recent ones, or
+    after the first one older than age seconds, into one.  The
+    logical keyspace doesn't change.  Return the number of
+    checkpoints that are no longer in the history of HEAD.  If
+    another writer moves HEAD first, TransactionFailed is raised.
+
+    >>> zs = zipper(store.back.memory()).create().open()
+    >>> k = lambda name: Key.make('T', name)
+    >>> for n in range(5):
+    ...     zs = zs.transactionally(zs.checkpoint, { k('a'): n })
+    >>> len(list(checkpoints(zs)))
+    6
+    >>> compact(zs, keep=2)
+    3
+    >>> len(list(checkpoints(zs)))
+    3
+    >>> zs.items()
+    tree([(key('AlQCAmE'), 4)])
+    """
+
+    mark = zs.refresh()
+    (started, chain, ref, head) = (now(), [], zs.head, zs.head)
+    while True:
+        record = zs.deref(ref)
+        chain.append(record)
+        if not record.prev:
+            return 0
+        elif len(chain) > keep or (age is not None and started - record.when > age):
+            break
+        elif len(record.prev) > 1:
+            ## A cut below this merge would leave the dropped
+            ## checkpoints reachable through its other parents.
+            return 0
+        ref = record.prev[0]
+
+    check = None
+    for record in reversed(chain):
+        prev = [refput(zs, check)] if check else []
+        check = record.replace(prev=prev)
+    zs.end_transaction(mark, check)
+
+    ## The kept checkpoints are copies; count the ones that are gone.
+    before = sum(1 for _ in history(zs, [head]))
+    return before - sum(1 for _ in history(zs, [zs.head]))
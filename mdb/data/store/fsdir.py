@@ -117,6 +117,57 @@ class fsdir(object):
         if errors:
             raise NotFound(errors)
 
+    ## Maintenance tasks (see data.gc) scan a store by location
+    ## because keys can't be recovered from file names.  A location
+    ## is the path of a file relative to the store.
+
+    def location(self, key):
+        digest = self._address(key)
+        return '%s/%s' % (digest[0:2], digest[2:])
+
+    def locations(self, start=None):
+        """Produce (location, size) pairs in location-order, starting
+        after start."""
+
+        if not self.exists():
+            return
+        for shard in sorted(os.listdir(self._path)):
+            if len(shard) != 2 or (start and shard < start[0:2]):
+                continue
+            for name in sorted(os.listdir(os.join(self._path, shard))):
+                location = '%s/%s' % (shard, name)
+                if name.endswith('.new') or (start and location <= start):
+                    continue
+                try:
+                    yield (location, os.getsize(self._location_path(location)))
+                except OSError:
+                    ## Deleted by another process.
+                    pass
+
+    def read(self, location):
+        return self._read(self._location_path(location))
+
+    def mforget(self, locations):
+        with self._lock:
+            for location in locations:
+                os.delete(self._location_path(location))
+
+    def touch(self, keys):
+        for key in keys:
+            try:
+                os.utime(self._key_path(key), None)
+            except OSError:
+                pass
+
+    def mtime(self, location):
+        try:
+            return os.getmtime(self._location_path(location))
+        except OSError:
+            return None
+
+    def _location_path(self, location):
+        return os.join(self._path, *location.split('/'))
+
     def _exists(self, key):
         return os.exists(self._key_path(key))
 
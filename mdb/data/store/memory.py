@@ -4,6 +4,7 @@
 """memory -- in-memory backing store"""
 
 from __future__ import absolute_import
+import time
 from md.prelude import *
 from .interface import *
 
@@ -18,6 +19,7 @@ class memory(object):
     def __init__(self):
         self._data = None
         self._cas = None
+        self._mtimes = None
 
     def __repr__(self):
         return '%s()' % type(self).__name__
@@ -31,12 +33,14 @@ class memory(object):
         if not self.exists():
             self._data = self.DataType()
             self._cas = self.CasType()
+            self._mtimes = {}
         return self
 
     def close(self):
         if self.exists():
             self._data = None
             self._cas = None
+            self._mtimes = None
         return self
 
     def destroy(self):
@@ -55,6 +59,7 @@ class memory(object):
 
     def set(self, key, value):
         self._data[key] = value
+        self._mtimes[key] = time.time()
         if key in self._cas:
             self._cas[key] += 1
 
@@ -101,6 +106,7 @@ class memory(object):
         if key not in self._data:
             raise NotFound(key)
         del self._data[key]
+        self._mtimes.pop(key, None)
 
     def mdelete(self, keys):
         errors = set()
@@ -109,9 +115,34 @@ class memory(object):
                 errors.add(key)
                 continue
             del self._data[key]
+            self._mtimes.pop(key, None)
         if errors:
             raise NotFound(errors)
 
+    ## Maintenance tasks (see data.gc) scan a store by location
+    ## instead of by key.  In memory, they're the same.
 
+    def location(self, key):
+        return key
 
+    def locations(self, start=None):
+        for key in sorted(self._data):
+            if start is None or key > start:
+                yield (key, len(self._data.get(key, '')))
 
+    def read(self, location):
+        return self._data.get(location, Undefined)
+
+    def mforget(self, locations):
+        for location in locations:
+            self._data.pop(location, None)
+            self._mtimes.pop(location, None)
+
+    def touch(self, keys):
+        now = time.time()
+        for key in keys:
+            if key in self._data:
+                self._mtimes[key] = now
+
+    def mtime(self, location):
+        return self._mtimes.get(location)
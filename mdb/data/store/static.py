@@ -4,6 +4,7 @@
 """static -- write-once, statically addressed backing store"""
 
 from __future__ import absolute_import
+import threading
 from hashlib import sha1
 from md.prelude import *
 from md import abc
@@ -12,6 +13,7 @@ from .interface import *
 __all__ = ('static', )
 
 DEFAULT_CACHE_SIZE = 1000
+MGET_BATCH = 256
 
 @abc.implements(Logical)
 class static(object):
@@ -30,6 +32,9 @@ class static(object):
         self._cache = None
         self._cache_size = cache
         self._prefix = prefix
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.coalesced = 0
 
     def __repr__(self):
         name = getattr(self._marshall, '__name__', None) or repr(self._marshall)
@@ -58,18 +63,181 @@ class static(object):
         try:
             return self._cache[address]
         except KeyError:
-            return self._load(address, self._back.get(self._key(address)))
+            pass
+        (lead, follow) = self._board([address])
+        if follow:
+            return self._wait(*follow[0])
+        try:
+            return self._land_one(lead[address], self._fetch(address))
+        finally:
+            self._land(lead)
 
     def mget(self, addresses):
-        need = {}
+        ## Misses are loaded in batches, so a long sequence streams
+        ## and only one batch of decoded values is held at a time.
+        need = []
         for address in addresses:
             try:
                 yield (address, self._cache[address])
+            except KeyError:
+                need.append(address)
+                if len(need) >= MGET_BATCH:
+                    for item in self._mload(need):
+                        yield item
+                    need = []
+        for item in self._mload(need):
+            yield item
+
+    ## Loads are single-flight.  When many threads miss the cache for
+    ## the same address at once (after HEAD moves, for example), the
+    ## first one reads, verifies and decodes the object; the others
+    ## wait for it.  If the first one fails, each of them loads the
+    ## object itself.
+
+    def _board(self, addresses):
+        (lead, follow) = ({}, [])
+        with self._flights_lock:
+            for address in addresses:
+                flight = self._flights.get(address)
+                if flight is None:
+                    lead[address] = self._flights[address] = _Flight()
+                else:
+                    if address not in lead:
+                        self.coalesced += 1
+                    follow.append((address, flight))
+        return (lead, follow)
+
+    def _land_one(self, flight, value):
+        flight.value = value
+        return value
+
+    def _land(self, lead):
+        with self._flights_lock:
+            for address in lead:
+                self._flights.pop(address, None)
+        for flight in lead.itervalues():
+            flight.done.set()
+
+    def _wait(self, address, flight):
+        flight.done.wait()
+        if flight.value is _FAILED:
+            return self._fetch(address)
+        return flight.value
+
+    def _mload(self, addresses):
+        if not addresses:
+            return
+        (lead, follow) = self._board(addresses)
+        try:
+            ## Land before yielding anything; the caller may wait on
+            ## another flight in the meantime.
+            keys = dict((self._key(a), a) for a in lead)
+            loaded = [
+                (keys[k], self._land_one(lead[keys[k]], self._load(keys[k], d)))
+                for (k, d) in self._back.mget(keys)
+            ]
+        finally:
+            self._land(lead)
+        for item in loaded:
+            yield item
+        for (address, flight) in follow:
+            yield (address, self._wait(address, flight))
+
+    def _fetch(self, address):
+        return self._load(address, self._back.get(self._key(address)))
+
+    ## Projection decodes only some fields of stored records.  Values
+    ## that are already cached are used as they are; projected values
+    ## aren't cached.
+
+    def project(self, address, names):
+        return next(self.mproject([address], names))[1]
+
+    def mproject(self, addresses, names):
+        """Produce (address, (type, state)) pairs, where state maps
+        each of the names that is a field of the object to its value,
+        or (address, Undefined)."""
+
+        need = {}
+        for address in addresses:
+            try:
+                yield (address, _state(self._cache[address], names))
             except KeyError:
                 need[self._key(address)] = address
+
+        project = getattr(self._marshall, 'projects_binary', None)
         for (key, data) in self._back.mget(need):
             address = need[key]
-            yield (address, self._load(address, data))
+            if data is Undefined:
+                yield (address, Undefined)
+            elif project is None:
+                yield (address, _state(self._load(address, data), names))
+            else:
+                self._verify(address, data)
+                yield (address, project(data, names))
+
+    ## Serialized objects can be copied between static spaces as
+    ## they are, without loading them.
+
+    def mread(self, addresses):
+        """Produce (address, data) pairs, where data is the
+        serialized object or Undefined."""
+
+        keys = dict((self._key(a), a) for a in addresses)
+        return ((keys[k], d) for (k, d) in self._back.mget(keys))
+
+    def mwrite(self, pairs):
+        """Store serialized objects read from another static space.
+        Objects that are already stored are skipped."""
+
+        data = []
+        for (address, value) in pairs:
+            self._verify(address, value)
+            data.append((self._key(address), value))
+        try:
+            self._back.madd(data)
+        except NotStored:
+            self._touch(k for (k, _) in data)
+        return len(data)
+
+    def encode(self, value):
+        """Serialize value; return an (address, data) pair."""
+
+        return self._dump(None, value)
+
+    ## The garbage collector (see data.gc) finds objects by scanning
+    ## the locations of the backing store.
+
+    def location(self, address):
+        return self._back.location(self._key(address))
+
+    def locations(self, start=None):
+        return self._back.locations(start)
+
+    def identify(self, location):
+        """Return the address of the object stored at location, or
+        None if something else is stored there."""
+
+        data = self._back.read(location)
+        if data is Undefined:
+            return None
+        address = self._digest(data)
+        return address if self.location(address) == location else None
+
+    def touched(self, location):
+        """The time the object at location was last stored or
+        touched, or None if it isn't known."""
+
+        mtime = getattr(self._back, 'mtime', None)
+        return mtime and mtime(location)
+
+    def forget(self, pairs):
+        """Delete the objects at these (location, address) pairs."""
+
+        pairs = list(pairs)
+        for (_, address) in pairs:
+            self._cache.pop(address, None)
+        self._back.mforget(l for (l, _) in pairs)
 
     def add(self, address, value):
         self._store(address, value)
@@ -88,16 +256,19 @@ class static(object):
 
     def _load(self, address, value):
         if value is not Undefined:
-            if __debug__:
-                probe = self._digest(value)
-                if probe != address:
-                    raise BadObject(
-                        "Inconsistent static identity %r, expected %r." % (
-                            probe, address
-                    ))
+            self._verify(address, value)
             value = self._marshall.loads_binary(value)
         return self._cached(address, value)
 
+    def _verify(self, address, data):
+        if __debug__:
+            probe = self._digest(data)
+            if probe != address:
+                raise BadObject(
+                    "Inconsistent static identity %r, expected %r." % (
+                        probe, address
+                ))
+
     def _cached(self, address, value):
         if len(self._cache) > self._cache_size:
             self._cache.clear()
@@ -110,7 +281,8 @@ class static(object):
         except NotStored:
             ## The value was already stored, but it's identical so
             ## supress any errors.
-            pass
+            if address:
+                self._touch([self._key(address)])
         return (address, self._cached(address, value))
 
     def _mstore(self, pairs):
@@ -118,9 +290,18 @@ class static(object):
         try:
             self._back.madd((self._key(a), d) for (_, (a, d)) in data)
         except NotStored:
-            pass
+            self._touch(self._key(a) for (_, (a, _)) in data)
         return ((a, v) for (v, (a, _)) in data)
 
+    ## An object that's stored again is referred to again.  Touching
+    ## it tells a collection that noted it as unreachable to keep it
+    ## (see data.gc).
+
+    def _touch(self, keys):
+        touch = getattr(self._back, 'touch', None)
+        if touch is not None:
+            touch(keys)
+
     def _dump(self, address, value):
         data = self._marshall.dumps_binary(value)
         static = self._digest(data)
@@ -134,7 +315,18 @@ class static(object):
     def _digest(self, data):
         return sha1(data).hexdigest()
 
+_FAILED = object()
 
+class _Flight(object):
+    __slots__ = ('done', 'value')
 
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _FAILED
 
-
+def _state(value, names):
+    if value is Undefined:
+        return value
+    schema = getattr(type(value), '__schema__', None)
+    fields = set(f.name for f in getattr(schema, 'fields', ()))
+    return (type(value), dict((n, getattr(value, n)) for n in names if n in fields))
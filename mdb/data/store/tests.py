@@ -4,9 +4,10 @@
 """tests -- unit tests"""
 
 from __future__ import absolute_import
-import unittest
+import unittest, threading, time
 from md.prelude import *
 from . import *
+from .static import MGET_BATCH
 
 class TestBackingStore(object):
 
@@ -57,7 +58,23 @@ class TestBackingStore(object):
         self.assertEqual(self.back.get('a'), Undefined)
         self.assertRaises(NotFound, lambda: self.back.delete('c'))
 
-class TestFSDir(TestBackingStore, unittest.TestCase):
+class TestLocations(object):
+
+    def test_locations(self):
+        locations = dict(self.back.locations())
+        self.assertEqual(sorted(locations), sorted(self.back.location(k) for k in 'ab'))
+        self.assertEqual(self.back.read(self.back.location('a')), '1')
+        self.back.mforget([self.back.location('a')])
+        self.assertEqual(self.back.get('a'), Undefined)
+
+    def test_touch(self):
+        location = self.back.location('a')
+        before = self.back.mtime(location)
+        self.back.touch(['a', 'missing'])
+        self.assertTrue(self.back.mtime(location) >= before)
+        self.assertEqual(self.back.mtime(self.back.location('missing')), None)
+
+class TestFSDir(TestBackingStore, TestLocations, unittest.TestCase):
 
     def makeStore(self):
         from .. import os
@@ -69,7 +86,7 @@ class TestPrefixed(TestBackingStore, unittest.TestCase):
         from .. import yaml
         return back.prefixed(back.memory(), '#', yaml)
 
-class TestMemory(TestBackingStore, unittest.TestCase):
+class TestMemory(TestBackingStore, TestLocations, unittest.TestCase):
 
     def makeStore(self):
         return back.memory()
@@ -98,6 +115,55 @@ class TestStatic(unittest.TestCase):
         self.assertEqual(k1, k3)
         self.assertEqual(v1, v3)
 
+    def test_identify(self):
+        (key, _) = self.back.put(1)
+        self.back._back.set('state', 'other')
+        found = dict((self.back.identify(l), l) for (l, _) in self.back.locations())
+        self.assertEqual(found, { key: self.back.location(key), None: 'state' })
+        self.back.forget([(self.back.location(key), key)])
+        self.assertEqual(self.back.get(key), Undefined)
+
+    def test_coalesce(self):
+        (key, _) = self.back.put(1)
+        self.back._cache.clear()
+        (started, release) = (threading.Event(), threading.Event())
+        get = self.back._back.get
+
+        def slow(name):
+            started.set()
+            release.wait()
+            return get(name)
+
+        self.back._back.get = slow
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(self.back.get(key)))]
+        readers[0].start()
+        started.wait()
+        readers.extend(
+            threading.Thread(target=lambda: results.append(dict(self.back.mget([key]))[key]))
+            for _ in range(3)
+        )
+        for reader in readers[1:]:
+            reader.start()
+        while self.back.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(results, [1, 1, 1, 1])
+        self.assertEqual(self.back.coalesced, 3)
+
+    def test_mget_batches(self):
+        keys = [self.back.put(n)[0] for n in xrange(MGET_BATCH + 1)]
+        self.back._cache.clear()
+        (batches, mget) = ([], self.back._back.mget)
+        self.back._back.mget = lambda names: batches.append(len(names)) or mget(names)
+        found = self.back.mget(keys)
+        self.assertEqual(next(found), (keys[0], 0))
+        self.assertEqual(batches, [MGET_BATCH])
+        self.assertEqual(dict(found)[keys[-1]], MGET_BATCH)
+        self.assertEqual(batches, [MGET_BATCH, 1])
+
     def test_data(self):
         t1 = tree(a=1, z=2, m=3, b=4)
         (k1, _) = self.back.put(t1)
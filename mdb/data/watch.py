@@ -0,0 +1,170 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""watch -- announce head changes made by other processes
+
+A zipper announces its own transactions to the subscribers of the
+change feed (see subscribe()).  A Watcher notices when another
+process moves the HEAD of a repository or one of its branches and
+announces it too.  These events aren't local.  Moves made in this
+process, through any zipper over the same backing store, have been
+announced already and are skipped.
+
+    >>> back = store.back.memory()
+    >>> r = repository(back).create().open()
+    >>> w = Watcher(repository(back).open())
+    >>> w.poll()
+    0
+    >>> moved = []
+    >>> hook = subscribe(lambda e: e.local or moved.append(e))
+    >>> b = r.make('live').open()
+    >>> w.poll()
+    1
+    >>> [(e.name, e.old) for e in moved]
+    [('live', None)]
+    >>> del moved[:]
+    >>> k = lambda name: Key.make('T', name)
+    >>> b.transactionally(b.checkpoint, { k('a'): 1 }).items()
+    tree([(key('AlQCAmE'), 1)])
+    >>> old = b.head
+    >>> b.transactionally(b.checkpoint, { k('a'): 2 }).items()
+    tree([(key('AlQCAmE'), 2)])
+    >>> w.poll()
+    0
+
+Writing HEAD directly moves it the way another process would.
+
+    >>> b._state.set(b.HEAD, old)
+    >>> w.poll()
+    1
+    >>> (moved[0].name, moved[0].changed)
+    ('live', [key('AlQCAmE')])
+    >>> w.stop() and unsubscribe(hook) and None
+"""
+
+from __future__ import absolute_import
+import threading
+from md.prelude import *
+from . import store, os
+from .repo import *
+from .export import zippers
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+__all__ = ('Watcher', )
+
+WATCH_INTERVAL = 1.0
+
+class Watcher(threading.Thread):
+    """A daemon thread that polls the heads of a repository and its
+    branches every interval seconds and announces the ones that
+    moved.  Transactions made in this process are announced by the
+    zippers that made them, so they're skipped.  When pyinotify is available and the backing
+    store is a directory, the HEAD files are watched and a change is
+    polled right away."""
+
+    def __init__(self, zs, interval=WATCH_INTERVAL):
+        super(Watcher, self).__init__(name='mdb-watcher')
+        self.daemon = True
+        if isinstance(zs, branch):
+            zs = zs.repo
+        self._zs = zs
+        self._heads = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._notifier = None
+        self.interval = interval
+        self.announced = 0
+        self.error = None
+        subscribe(self._noted)
+
+    def __repr__(self):
+        return '<%s %r every %.1fs>' % (type(self).__name__, self._zs, self.interval)
+
+    def run(self):
+        self._notifier = _notifier(self._zs, self._wake.set)
+        try:
+            while not self._stopped:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                if self._stopped:
+                    break
+                try:
+                    self.poll()
+                except Exception as exc:
+                    ## Keep going; the next poll may succeed.
+                    self.error = exc
+        finally:
+            if self._notifier is not None:
+                self._notifier.stop()
+
+    def stop(self):
+        self._stopped = True
+        unsubscribe(self._noted)
+        self._wake.set()
+        return self
+
+    def poll(self):
+        """Announce each head that moved since the last poll and
+        return how many did.  The first poll only notes the heads."""
+
+        with self._lock:
+            zs = self._zs.open()
+            (first, heads, events) = (self._heads is None, {}, [])
+            for (prefix, source) in zippers(zs):
+                ## A head moved by a transaction through this handle is
+                ## announced by the handle.
+                with source._lock:
+                    (head, local) = (source.head, source._committed == source.head)
+                heads[prefix] = head
+                old = None if first else self._heads.get(prefix)
+                if not (first or local) and old != head:
+                    events.append((source, old, head))
+            self._heads = heads
+
+        for (source, old, new) in events:
+            announce(source, old, new, local=False)
+        self.announced += len(events)
+        return len(events)
+
+    def _noted(self, event):
+        ## A transaction made in this process has already been
+        ## announced; remember its head so it isn't announced again.
+        ## Any zipper over the same backing store counts, so the head
+        ## is matched by its store and state prefix.
+        if not event.local or self._heads is None:
+            return
+        (state, watched) = (event.zipper._state, self._zs._state)
+        if state._back is watched._back and state._prefix.startswith(watched._prefix):
+            with self._lock:
+                self._heads[state._prefix[len(watched._prefix):]] = event.new
+
+## The HEAD of each zipper is a file in an fsdir backing store.  It's
+## replaced by renaming a new file over it, so the directories that
+## hold them are watched for moves.  Objects are written to the same
+## directories; only events for the HEAD files wake the watcher.  New
+## branches are found by the next poll.
+
+def _notifier(zs, wake):
+    back = zs._state._back
+    if pyinotify is None or not isinstance(back, store.back.fsdir):
+        return None
+
+    heads = set(
+        back._location_path(back.location(source._state._key(source.HEAD)))
+        for (_, source) in zippers(zs)
+    )
+    names = set(os.basename(h) for h in heads)
+    manager = pyinotify.WatchManager()
+    notifier = pyinotify.ThreadedNotifier(
+        manager, lambda event: event.name in names and wake()
+    )
+    notifier.daemon = True
+    for path in set(os.dirname(h) for h in heads):
+        manager.add_watch(path, pyinotify.IN_MOVED_TO | pyinotify.IN_CLOSE_WRITE)
+    notifier.start()
+    return notifier
@@ -9,4 +9,7 @@ from .tree import *
 from .api import *
 from .auth import *
 from .load import *
+from .cache import *
+from .pending import *
+from .views import *
 
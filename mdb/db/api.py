@@ -7,12 +7,14 @@ from __future__ import absolute_import
 from md.prelude import *
 from md import fluid
 from .. import avro, data
+from ..query import parallel
 
 __all__ = (
     'RepoError', 'repository', 'repository_transaction', 'source', 'use',
     'branches', 'make_branch', 'open_branch', 'get_branch', 'save_branch',
-    'remove_branch',
-    'get', 'find', 'new', 'update', 'delete', 'delta'
+    'remove_branch', 'publish_branch', 'compact_branch', 'init_maintenance',
+    'init_watcher', 'get', 'project', 'find', 'new', 'update', 'delete',
+    'delta', 'bulk', 'snapshot', 'on_change'
 )
 
 RepoError = data.RepoError
@@ -26,6 +28,8 @@ repository = fluid.accessor(REPOSITORY)
 SOURCE = fluid.cell(None, type=fluid.acquired)
 source = fluid.accessor(SOURCE)
 
+parallel.inherit(REPOSITORY, SOURCE)
+
 def init_api(zs, created=False):
     """Set the global branch; this should be done near the beginning
     of a program.  See load.init()."""
@@ -41,6 +45,11 @@ def init_api(zs, created=False):
     return zs
 
 def use(name):
+    """Make a pooled handle on the named branch the current source.
+    It may be shared with other threads, so requests don't read from
+    it directly: query() pins a snapshot of it, and so does a delta.
+    Use snapshot() to see one version across several reads."""
+
     branch = open_branch(name)
     SOURCE.set(branch)
     return branch
@@ -58,6 +67,13 @@ def get(key, zs=None):
     else:
         return best(zs).mget(data.Key(k) for k in key)
 
+def project(keys, names, zs=None):
+    """Produce (key, (type, state)) pairs with only the named fields
+    of each item decoded, or return None if the source can't."""
+
+    mproject = getattr(best(zs), 'mproject', None)
+    return mproject and mproject((data.Key(k) for k in keys), names)
+
 def find(cls, zs=None):
     return best(zs).find(cls)
 
@@ -88,7 +104,7 @@ def make_branch(name, force=True, owner=None, **kw):
     return update(zs.configure(zs.branch(name).create(force=force), **kw))
 
 def open_branch(name):
-    return repository().branch(name).open()
+    return repository().handle(name)
 
 def get_branch(name):
     return repository().branch(name).config
@@ -99,6 +115,48 @@ def save_branch(config, *args, **kw):
 def remove_branch(config):
     return delete(config.key)
 
+def publish_branch(name=None):
+    """Publish a branch (the current source by default) to its
+    publish target.  Only references that changed are committed to
+    the target.  A data.PublishStats is returned."""
+
+    zs = open_branch(name) if name else source()
+    if not isinstance(zs, data.branch):
+        raise RepoError('Cannot publish %r.' % zs)
+    elif not zs.publish:
+        raise RepoError('Branch %r has no publish target.' % zs.name)
+
+    target = open_branch(zs.publish)
+    with data.message('Publish %s to %s.' % (zs.name, zs.publish)):
+        stats = data.publish(zs, target)
+    changed(target)
+    return stats
+
+def compact_branch(name=None, **kw):
+    """Fold the old checkpoints of a branch (the current source by
+    default) into one.  See data.compact()."""
+
+    zs = open_branch(name) if name else source()
+    if not isinstance(zs, data.branch):
+        raise RepoError('Cannot compact %r.' % zs)
+    return data.compact(zs, **kw)
+
+def init_maintenance(**kw):
+    """Start a data.Maintenance thread for the repository; it
+    compacts every branch and collects garbage periodically."""
+
+    task = data.Maintenance(repository(), **kw)
+    task.start()
+    return task
+
+def init_watcher(**kw):
+    """Start a data.Watcher thread for the repository; changes made
+    by other processes are passed to the on_change() hooks."""
+
+    task = data.Watcher(repository(), **kw)
+    task.start()
+    return task
+
 
 ### Changes
 
@@ -126,6 +184,26 @@ def delete(key):
 ## context, a method like checkpoint() can be used to write the
 ## changes to the source.
 
+## Procedures registered with on_change() are called with a zipper
+## after a delta or publish_branch() moves its head.
+
+CHANGE_HOOKS = []
+
+def on_change(proc):
+    CHANGE_HOOKS.append(proc)
+    return proc
+
+def changed(zs):
+    for hook in CHANGE_HOOKS:
+        hook(zs)
+
+@data.subscribe
+def _moved(event):
+    ## Transactions in this process call changed() themselves; the
+    ## ones a data.Watcher sees were made somewhere else.
+    if not event.local:
+        changed(event.zipper)
+
 @contextmanager
 def delta(message, zs=None):
     """Replace the _Branch with a _Delta in the calling context.
@@ -136,6 +214,31 @@ def delta(message, zs=None):
     with source(delta):
         yield delta
 
+@contextmanager
+def bulk(message, zs=None, batch=None, keep=None):
+    """Like delta(), but for large imports: changed values are written
+    to the static space in batches of batch as they're made, and only
+    their references are kept until the end.  Values that pass keep
+    (a predicate) are held until the end instead; use it for values
+    that will change again, like folders that are still being filled."""
+
+    delta = _Bulk(message, best(zs), batch or BULK_BATCH, keep)
+    with source(delta):
+        yield delta
+
+@contextmanager
+def snapshot(zs=None):
+    """Read from a snapshot of zs (or the current source) in this
+    context; see data.snapshot.  Queries and get() see the head it
+    was made at, even if another thread commits in the meantime."""
+
+    zs = zs or source()
+    if isinstance(zs, _Delta):
+        zs = zs._zs
+    view = zs.snapshot()
+    with source(view):
+        yield view
+
 @contextmanager
 def repository_transaction(message):
     with delta(message, repository()) as d:
@@ -154,7 +257,11 @@ class _Delta(object):
         self._message = message
         self._zs = zs
         self._data = {}
-        self._mark = zs.begin_transaction()
+        self._mark = zs.refresh()
+        ## The zipper may be a shared handle that other threads move;
+        ## read from the version the delta is made against.
+        self._view = zs.snapshot()
+        self._base = self._view.index()
 
     def new(self, cls, state):
         return self.changed(self._zs.new(cls, state))
@@ -167,34 +274,38 @@ class _Delta(object):
     def get(self, key):
         if key in self._data:
             return self._data[key]
-        return self._zs.get(key)
+        return self._view.get(key)
 
     def mget(self, keys):
         need = []
 
         for key in keys:
-            probe = self._data.get(key, Undefined)
-            if probe is not Undefined:
-                yield probe
+            ## A key deleted in this delta is Undefined, not missing.
+            if key in self._data:
+                yield self._data[key]
             else:
                 need.append(key)
 
         if need:
-            for obj in self._zs.mget(need):
+            for obj in self._view.mget(need):
                 yield obj
 
     def delete(self, key):
         self._data[key] = Undefined
 
     def checkpoint(self):
-        return self._end(self._zs.checkpoint)
+        return self._end(self._zs.checkpoint, merge=True)
 
     def commit(self):
         return self._end(self._zs.commit)
 
-    def _end(self, method):
+    def _end(self, method, merge=False):
         with data.message(self._message):
-            self._zs.end_transaction(self._mark, method(self._persist()))
+            data.retrying(
+                self._zs, method, self._persist(), self._mark, self._base,
+                merge=merge
+            )
+        changed(self._zs)
         return self
 
     def _persist(self):
@@ -203,3 +314,66 @@ class _Delta(object):
             if delta[key] is Undefined:
                 delta[key] = data.Deleted
         return delta
+
+BULK_BATCH = 500
+
+class _Bulk(_Delta):
+    """A delta that writes values as it goes.  When it ends, one
+    checkpoint or commit is made from the references."""
+
+    def __init__(self, message, zs, batch=BULK_BATCH, keep=None):
+        super(_Bulk, self).__init__(message, zs)
+        self._batch = batch
+        self._keep = keep
+        self._refs = {}
+        self._limit = batch
+        self.written = 0
+
+    def new(self, cls, state):
+        ## A new value is usually changed again right away (added to
+        ## a folder); don't write it before then.
+        obj = self._zs.new(cls, state)
+        self._data[obj.key] = obj
+        return obj
+
+    def changed(self, *objects):
+        for obj in objects:
+            self._data[obj.key] = obj
+            self._refs.pop(obj.key, None)
+        if len(self._data) >= self._limit:
+            self.flush()
+        return obj
+
+    def get(self, key):
+        if key in self._data or key not in self._refs:
+            return super(_Bulk, self).get(key)
+        return update(self._zs.deref(self._refs[key]), _key=key)
+
+    def mget(self, keys):
+        keys = list(keys)
+        written = set(k for k in keys if k in self._refs and k not in self._data)
+        for key in written:
+            yield self.get(key)
+        for obj in super(_Bulk, self).mget(k for k in keys if k not in written):
+            yield obj
+
+    def flush(self, everything=False):
+        """Write the values held so far, except the ones kept until
+        the end."""
+
+        keep = None if everything else self._keep
+        values = [
+            v for v in self._data.itervalues()
+            if v is not Undefined and not (keep and keep(v))
+        ]
+        for (ref, value) in self._zs.mput(values):
+            self._refs[value.key] = ref
+            del self._data[value.key]
+        self.written += len(values)
+        self._limit = len(self._data) + self._batch
+        return self
+
+    def _persist(self):
+        self.flush(everything=True)
+        self._refs.update(super(_Bulk, self)._persist())
+        return self._refs
@@ -0,0 +1,128 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""cache -- cache path query results
+
+A branch head is an immutable reference, so a query evaluated
+against the same context item at the same head always produces the
+same items.  When a cache is installed, tree.query() remembers the
+keys of the items a query produced, keyed on the expression, the
+context item's key, and the address of the head.  Once the branch
+moves, old entries simply stop being used and are evicted.
+
+    init_cache(100000)
+    query('//Page')    # evaluated
+    query('//Page')    # items are loaded from the cached keys
+"""
+
+from __future__ import absolute_import
+import threading, collections
+from md import fluid
+from .. import data
+from ..query import parallel
+from . import api
+
+__all__ = ('QueryCache', 'query_cache', 'init_cache')
+
+## The cache is accessible in the dynamic context.  It can be set
+## globally with init_cache().
+
+QUERY_CACHE = fluid.cell(None, type=fluid.acquired)
+query_cache = fluid.accessor(QUERY_CACHE)
+
+parallel.inherit(QUERY_CACHE)
+
+def init_cache(capacity=None):
+    """Install a global query cache that holds up to capacity keys.
+    Pass 0 to remove the cache."""
+
+    QUERY_CACHE.set(QueryCache(capacity) if capacity != 0 else None)
+    return query_cache()
+
+def cache_key(expr, base, offset=0, limit=None):
+    """Make a key for a query evaluated against base in the current
+    source, or None if the query's result can't be cached."""
+
+    zs = api.source()
+    if not (isinstance(zs, data.zipper) and zs.head):
+        ## A delta has uncommitted changes.
+        return None
+    key = getattr(base, 'key', None)
+    if not isinstance(key, data.Key):
+        return None
+    return (expr, key, zs.head.address, offset, limit)
+
+
+### Cache
+
+class QueryCache(object):
+    """A least-recently used mapping of query keys to the lists of
+    item keys they produced.  It's bounded by the total number of
+    item keys it holds; each entry costs one more than the length of
+    its list."""
+
+    CAPACITY = 100000
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or self.CAPACITY
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s %d/%d keys, %d hits, %d misses>' % (
+            type(self).__name__, self.size, self.capacity,
+            self.hits, self.misses
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the item keys cached for key or None."""
+
+        with self._lock:
+            keys = self._entries.pop(key, None)
+            if keys is None:
+                self.misses += 1
+                return None
+            self._entries[key] = keys
+            self.hits += 1
+            return keys
+
+    def store(self, key, items):
+        """Produce the items of a query result as they're evaluated.
+        If the result is read to the end and its items are all stored
+        values, their keys are cached."""
+
+        keys = []
+        for item in items:
+            if keys is not None:
+                if isinstance(item, data.Value) and len(keys) < self.capacity:
+                    keys.append(item.key)
+                else:
+                    keys = None
+            yield item
+        if keys is not None:
+            self.put(key, keys)
+
+    def put(self, key, keys):
+        cost = len(keys) + 1
+        if cost > self.capacity:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old) + 1
+            self._entries[key] = keys
+            self.size += cost
+            while self.size > self.capacity:
+                (_, old) = self._entries.popitem(last=False)
+                self.size -= len(old) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
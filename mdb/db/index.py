@@ -0,0 +1,244 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""index -- answer path query lookups without walking the tree
+
+The query planner turns descendant scans like //Page or
+//Page[@title = 'x'] into lookup-descendant() steps (see
+query/plan.py).  A Folder answers a lookup with this module:
+
+  + kind tests use the key-space of the source; keys encode the kind
+    of the item they're bound to.  Only the folder and name of items
+    of that kind are decoded to find the ones under the context item,
+    and only those are loaded.
+
+  + name tests and field equality use a field index if the branch
+    declares one.  Declare indexes in the branch configuration:
+
+        save_branch(get_branch('staging'), config={ 'index': 'name title' })
+
+Indexes are kept in memory for each branch.  When the head moves,
+an index is brought up to date using the keys that changed.  Items
+are found this way, then put into the same order as the descendant
+axis would produce them.
+"""
+
+from __future__ import absolute_import
+import weakref, threading
+from md.prelude import *
+from ..query import plan as _plan
+from .. import avro, data
+from . import api
+
+__all__ = ('lookup', 'strategy', 'indexed', 'field_keys', 'FieldIndex')
+
+
+### Lookup
+
+def lookup(top, test, field=None, value=None):
+    """Produce the descendants of top that pass test and have field
+    equal to value, or None if the current source can't answer the
+    lookup without a traversal."""
+
+    zs = api.source()
+    plan = strategy(zs, test, field, value)
+    if plan is None or zs.get(top.key) != top:
+        ## The lookup is answered from the source's keyspace, so top
+        ## must be the item the source has at this head.
+        return None
+
+    (method, arg) = plan
+    if method == 'kind':
+        keys = [k for k in (data.Key(k) for k in zs) if issubclass(k.type, arg)]
+    else:
+        keys = field_keys(zs, *arg)
+
+    keys = document_order(zs, top, keys)
+    found = dict(
+        (i.key, i) for i in zs.mget(keys)
+        if isinstance(i, data.Value) and matches(i, test, field, value)
+    )
+    return [found[k] for k in keys if k in found]
+
+def strategy(zs, test, field=None, value=None):
+    """Choose how to do a lookup in zs.  Return a ('field', (name,
+    value)) or ('kind', class) pair, or None to traverse."""
+
+    if not isinstance(zs, data.zipper):
+        ## Uncommitted changes in a delta aren't indexed.
+        return None
+
+    fields = indexed(zs)
+    if field is not None and field in fields:
+        return ('field', (field, value))
+    elif isinstance(test, basestring) and 'name' in fields:
+        return ('field', ('name', test))
+    elif isinstance(test, type):
+        return ('kind', test)
+    return None
+
+def matches(item, test, field, value):
+    if isinstance(test, basestring):
+        if item.name != test:
+            return False
+    elif isinstance(test, type):
+        if not isinstance(item, test):
+            return False
+    return field is None or getattr(item, field, Undefined) == value
+
+def document_order(zs, top, keys):
+    """Keep the keys of items that descend from top; sort them into
+    breadth-first document order.  That's the order of their depth,
+    then the positions of their ancestors in their folders.  Only the
+    folder and name of each item are decoded."""
+
+    keys = [k for k in keys if 'folder' in k.type.__fields__]
+    (folders, placed) = ({}, [])
+    for (key, state) in zs.mproject(keys, ('folder', 'name')):
+        if state is Undefined:
+            continue
+        place = position(zs, top, key, state[1], folders)
+        if place:
+            placed.append((len(place), place, key))
+    placed.sort(key=lambda p: p[:2])
+    return [key for (_, _, key) in placed]
+
+def position(zs, top, key, state, folders):
+    place = []
+    while key != top.key:
+        name = state.get('name')
+        folder = folder_positions(zs, state.get('folder'), folders)
+        if folder is None or folder[1].get(name, (None,))[0] != key:
+            return None
+        place.append(folder[1][name][1])
+        up = folder[0]
+        (key, state) = (up.key, { 'folder': up.folder, 'name': up.name })
+    place.reverse()
+    return place
+
+def folder_positions(zs, key, folders):
+    ## Load each folder once; map child names to (key, position).
+    if not key:
+        return None
+    probe = folders.get(key)
+    if probe is None:
+        folder = zs.get(key)
+        if not isinstance(folder, data.Value):
+            return None
+        probe = folders[key] = (folder, dict(
+            (name, (child, pos)) for (pos, (name, child))
+            in enumerate(folder.contents.iteritems())
+        ))
+    return probe
+
+
+### Field Indexes
+
+## An index is kept for each branch.  The commit graph of a branch is
+## shared by its pooled handles and their snapshots (see
+## repository.handle), so it identifies the branch here.  Only the
+## index being used is locked while it's brought to the head of the
+## zipper reading from it.
+
+INDEXES = weakref.WeakKeyDictionary()
+LOCK = threading.Lock()
+
+def indexed(zs):
+    """The set of fields a zipper declares indexes for."""
+
+    zs = getattr(zs, 'origin', zs)
+    if not isinstance(zs, data.branch):
+        return frozenset()
+    config = zs.config
+    spec = (config and config.config.get('index')) or ''
+    return frozenset(spec.replace(',', ' ').split())
+
+def field_keys(zs, field, value):
+    """The keys of items in zs that have field equal to value."""
+
+    fields = indexed(zs)
+    with LOCK:
+        index = INDEXES.get(zs._graph)
+        if index is None or index.fields != fields:
+            index = INDEXES[zs._graph] = FieldIndex(fields)
+    return index.get(zs, field, value)
+
+class FieldIndex(object):
+    """Map (field, value) pairs to the keys of items that have them
+    at some head."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.head = None
+        self._index = ddict(set)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s %s @ %r>' % (
+            type(self).__name__, ' '.join(sorted(self.fields)), self.head
+        )
+
+    def get(self, zs, field, value):
+        with self._lock:
+            self.refresh(zs)
+            return list(self._index.get((field, value), ()))
+
+    def refresh(self, zs):
+        if self.head is None:
+            self._build(zs)
+        elif self.head != zs.head:
+            self._update(zs)
+        self.head = zs.head
+        return self
+
+    ## Only the indexed fields of each item are decoded.
+
+    def _build(self, zs):
+        self._project(zs, [data.Key(k) for k in zs])
+
+    def _update(self, zs):
+        changed = []
+        for (op, key, _, _) in data.diff(zs, self.head, zs.head):
+            self._remove(key)
+            if op != 'removed':
+                changed.append(key)
+        self._project(zs, changed)
+
+    def _project(self, zs, keys):
+        names = tuple(self.fields)
+        for (key, state) in zs.mproject(keys, names):
+            if state is not Undefined:
+                self._add(key, state[1])
+
+    def _add(self, key, state):
+        entries = []
+        for field in self.fields:
+            value = state.get(field, Undefined)
+            if isinstance(value, (basestring, int, long, float)):
+                entries.append((field, value))
+                self._index[field, value].add(key)
+        if entries:
+            self._entries[key] = entries
+
+    def _remove(self, key):
+        for entry in self._entries.pop(key, ()):
+            keys = self._index[entry]
+            keys.discard(key)
+            if not keys:
+                del self._index[entry]
+
+
+### Explain
+
+def annotate(test, field=None, value=None):
+    """Describe a lookup-descendant() step for plan.explain()."""
+
+    if isinstance(test, _plan.KindName):
+        test = avro.get_type(test)
+    plan = strategy(api.source(), test, field, value)
+    if plan is None:
+        return 'traverse'
+    elif plan[0] == 'kind':
+        return 'kind %s' % avro.type_name(plan[1])
+    return 'index %s' % plan[1][0]
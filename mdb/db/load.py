@@ -4,12 +4,12 @@
 """load -- bootstrap a datastore"""
 
 from __future__ import absolute_import
-import os
+import os, glob, time, itertools as it, multiprocessing
 from md.prelude import *
 from .. import data
 from . import tree, api, auth as auth_
 
-__all__ = ('init', 'backing', 'loader')
+__all__ = ('init', 'backing', 'loader', 'load_bulk', 'ImportStats')
 
 
 ### Initialization
@@ -99,7 +99,7 @@ def load_yaml(path):
     "title" is given, the "name" is transformed into a title.
     """
 
-    import yaml, glob
+    import yaml
 
     with api.delta('Imported %r.' % path) as delta:
         root = _root(os.path.basename(path))
@@ -132,3 +132,96 @@ def _folder(top, names):
         top = probe
     return top
 
+
+### Bulk Import
+
+@loader.define('bulk')
+def load_bulk(path, processes=None, batch=None, progress=None):
+    """Load yaml files found in path like load_yaml(), but for large
+    imports.
+
+    Files are parsed in a pool of processes (one for each CPU by
+    default; pass processes=1 to parse in this one), with the LibYAML
+    loader if it's available.  They're parsed batch files at a time,
+    and the items made from them are written to the static space in
+    batches (see api.bulk()); only folders and references are kept in
+    memory.  One commit is made at the end.
+
+    If progress is given, it's called with an ImportStats after each
+    batch and once more when the import is done.
+    """
+
+    names = sorted(glob.glob('%s/*.yaml' % path))
+    batch = batch or api.BULK_BATCH
+    stats = ImportStats(len(names))
+    pool = multiprocessing.Pool(processes) if processes != 1 else None
+    try:
+        with api.bulk('Imported %r.' % path, batch=batch, keep=_is_folder) as delta:
+            root = _root(os.path.basename(path))
+            for chunk in _chunks(names, batch):
+                parsed = pool.map(_parse, chunk) if pool else map(_parse, chunk)
+                for (name, data) in parsed:
+                    _item(root, name, data)
+                stats.note(len(chunk), delta.written)
+                progress and progress(stats)
+            delta.commit()
+        stats.note(0, delta.written, done=True)
+        progress and progress(stats)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return root
+
+class ImportStats(object):
+    """Counters maintained by load_bulk()."""
+
+    __slots__ = ('files', 'parsed', 'written', 'started', 'elapsed', 'done')
+
+    def __init__(self, files):
+        self.files = files
+        self.parsed = self.written = 0
+        self.started = time.time()
+        self.elapsed = 0.0
+        self.done = False
+
+    def __repr__(self):
+        return '<%s %d/%d files, %d written, %.1fs, %.0f files/s%s>' % (
+            type(self).__name__,
+            self.parsed,
+            self.files,
+            self.written,
+            self.elapsed,
+            self.rate,
+            ' done' if self.done else ''
+        )
+
+    @property
+    def rate(self):
+        return self.parsed / self.elapsed if self.elapsed else 0.0
+
+    def note(self, parsed, written, done=False):
+        self.parsed += parsed
+        self.written = written
+        self.elapsed = time.time() - self.started
+        self.done = done
+
+def _parse(name):
+    ## Called in a worker process; the result is pickled back.
+    import yaml
+    with closing(open(name, 'r')) as port:
+        return (os.path.basename(name), yaml.load(port, _loader(yaml)))
+
+def _loader(yaml):
+    return getattr(yaml, 'CLoader', yaml.Loader)
+
+def _is_folder(value):
+    return isinstance(value, tree.Folder)
+
+def _chunks(seq, size):
+    seq = iter(seq)
+    while True:
+        chunk = list(it.islice(seq, size))
+        if not chunk:
+            break
+        yield chunk
@@ -2,26 +2,66 @@
 ## See the LICENSE file for license terms and warranty disclaimer.
 
 from __future__ import absolute_import
-from ..query import compiler as comp, parse
-from . import query_ast, query_ops
+from ..query import compiler as comp, parse, batch, codegen
+from ..query.parallel import init_parallel
+from . import query_ast, query_ops, index
 
-__all__ = ('compile', 'PathQuery')
+__all__ = (
+    'compile', 'explain', 'init_parallel',
+    'PathQuery', 'BatchQuery', 'GeneratedQuery'
+)
 
-def compile(expr):
+def compile(expr, set_at_a_time=False, generated=False):
     """Compile a path query.
 
     For example, this will compile a path query into and object that
     can be called against some context item:
 
        db.compile('//Page')(db.root())
+
+    The object also accepts an offset and a limit.  Evaluation stops
+    once offset + limit items are produced:
+
+       db.compile('//Page')(db.root(), 0, 10)
+
+    If set_at_a_time is True, each step is evaluated over the whole
+    node set before the next one runs (see query.batch).  If generated
+    is True, the query is compiled to a generator function when
+    possible (see query.codegen).
+
+    The expressions of a list ('//Page, //Folder') and the operands
+    of union, intersect and except are evaluated concurrently once
+    init_parallel() installs a pool (see query.parallel).
+    """
+
+    if set_at_a_time:
+        return BatchQuery(expr)
+    return (GeneratedQuery if generated else PathQuery)(expr)
+
+def explain(expr):
+    """Describe how a path query will be evaluated against the
+    current source.  Each lookup-descendant() step is marked with the
+    index it will use, or "traverse" when it has to walk the tree:
+
+        >>> print explain('//Page')
+        Path
+          sequence
+            steps
+              self(root)
+              lookup-descendant(kind('Page'))  [kind Page]
     """
 
-    return PathQuery(expr)
+    return comp.explain(read, expr, index.annotate)
 
 
 ### Compile Path Queries
 
-PathQuery = comp.Evaluator(
-    parse.PathParser(query_ast),
-    comp.builtin(comp.use(query_ops))
-)
+read = parse.PathParser(query_ast)
+
+BUILTIN = comp.builtin(comp.use(query_ops))
+
+PathQuery = comp.Evaluator(read, BUILTIN)
+
+BatchQuery = comp.Evaluator(read, BUILTIN, batch)
+
+GeneratedQuery = comp.Evaluator(read, BUILTIN, backend=codegen)
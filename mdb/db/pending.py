@@ -0,0 +1,220 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""pending -- start reads and commits without waiting for them
+
+A server with one event loop can't block it on the store while a
+query is evaluated.  When an executor is installed, aget(), amget(),
+aquery() and acommit() run on a pool of worker threads and return a
+Pending result right away.  Call then() with a procedure to be
+called with the result when it's ready (from the worker thread), or
+get() to wait for it.
+
+    init_async(8)
+    aquery('//Page').then(lambda p: reply(p.get()))
+
+Reads of the same keys or the same query at the same head give the
+same answer, so concurrent identical reads share one Pending; its
+value is a tuple so no caller can change it under the others.  A
+worker runs in the dynamic context of the thread that started it
+(see query.parallel).  Without an executor, each call is made right
+away and returns a Pending that's ready.
+"""
+
+from __future__ import absolute_import
+import sys, threading, contextlib
+from multiprocessing.pool import ThreadPool, TimeoutError
+from md.prelude import *
+from md import fluid
+from .. import data
+from ..query import parallel
+from . import api, tree
+
+__all__ = (
+    'Pending', 'Executor', 'executor', 'init_async',
+    'aget', 'amget', 'aquery', 'acommit'
+)
+
+## The executor is accessible in the dynamic context.  It can be set
+## globally with init_async().
+
+EXECUTOR = fluid.cell(None, type=fluid.acquired)
+executor = fluid.accessor(EXECUTOR)
+
+def init_async(workers=None):
+    """Install a global executor with this many workers (the number
+    of CPUs by default).  Pass 0 to make calls right away again."""
+
+    old = executor()
+    EXECUTOR.set(Executor(workers) if workers != 0 else None)
+    if old is not None:
+        old.close()
+    return executor()
+
+
+### Operations
+
+def aget(key, zs=None):
+    """Like get(), but return a Pending item."""
+
+    view = _view(api.best(zs))
+    return _submit(_key(view, 'get', key), lambda: api.get(key, view))
+
+def amget(keys, zs=None):
+    """Like get() of a sequence of keys, but return a Pending tuple
+    of items."""
+
+    view = _view(api.best(zs))
+    keys = tuple(data.Key(k) for k in keys)
+    return _submit(_key(view, 'mget', keys), lambda: tuple(api.get(keys, view)))
+
+def aquery(path, base=None, offset=0, limit=None):
+    """Like query(), but return a Pending tuple of results."""
+
+    view = _view(api.source())
+    base_key = None if base is None else getattr(base, 'key', Undefined)
+    key = base_key is not Undefined and _key(view, 'query', path, base_key, offset, limit)
+
+    def query():
+        with api.source(view):
+            return tuple(tree.query(path, base, offset, limit))
+
+    return _submit(key, query)
+
+def acommit(message, proc, *args, **kw):
+    """Call proc in a delta() and commit it; return a Pending result
+    of proc.  Commits aren't shared."""
+
+    def commit():
+        with api.delta(message) as delta:
+            result = proc(*args, **kw)
+            delta.commit()
+        return result
+
+    return _submit(None, commit)
+
+## A read is made against a snapshot taken when it's submitted, so
+## it sees the head its key was made from.
+
+def _view(zs):
+    return zs.snapshot() if isinstance(zs, data.zipper) else zs
+
+def _key(zs, *args):
+    ## A delta has uncommitted changes; its reads aren't shared.
+    if not (isinstance(zs, data.zipper) and zs.head):
+        return None
+    return (zs.head.address, ) + args
+
+def _submit(key, thunk):
+    pool = executor()
+    if pool is None:
+        pending = Pending()
+        pending._run(thunk)
+        return pending._finish()
+    return pool.submit(key, thunk)
+
+
+### Executor
+
+class Executor(object):
+    """A pool of worker threads and the reads it's making."""
+
+    def __init__(self, workers=None):
+        self.submitted = 0
+        self.coalesced = 0
+        self._pool = ThreadPool(workers)
+        self._flight = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s %d in flight, %d submitted, %d coalesced>' % (
+            type(self).__name__, len(self._flight), self.submitted, self.coalesced
+        )
+
+    def close(self):
+        self._pool.close()
+        return self
+
+    def submit(self, key, thunk):
+        """Call thunk on a worker; return a Pending result.  If key
+        isn't None and a call with the same key is in flight, its
+        Pending is returned instead."""
+
+        with self._lock:
+            pending = self._flight.get(key) if key else None
+            if pending is not None:
+                self.coalesced += 1
+                return pending
+            pending = Pending()
+            if key:
+                self._flight[key] = pending
+            self.submitted += 1
+
+        restore = parallel.captured()
+        self._pool.apply_async(self._run, (key, pending, restore, thunk))
+        return pending
+
+    def _run(self, key, pending, restore, thunk):
+        try:
+            with contextlib.nested(*[r() for r in restore]):
+                pending._run(thunk)
+        except Exception:
+            ## The context couldn't be entered or left.
+            pending._error = pending._error or sys.exc_info()
+        finally:
+            if key:
+                with self._lock:
+                    self._flight.pop(key, None)
+            pending._finish()
+
+class Pending(object):
+    """The result of a call that may not have finished yet."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._value = None
+        self._error = None
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, 'ready' if self.ready() else 'pending')
+
+    def ready(self):
+        return self._done.is_set()
+
+    def get(self, timeout=None):
+        """Wait for the result and return it, or raise the exception
+        the call raised.  TimeoutError is raised if it isn't ready in
+        timeout seconds."""
+
+        if not self._done.wait(timeout):
+            raise TimeoutError(timeout)
+        if self._error is not None:
+            (kind, exc, tb) = self._error
+            raise kind, exc, tb
+        return self._value
+
+    def then(self, proc):
+        """Call proc with this Pending when it's ready."""
+
+        with self._lock:
+            if not self.ready():
+                self._callbacks.append(proc)
+                return self
+        proc(self)
+        return self
+
+    def _run(self, thunk):
+        try:
+            self._value = thunk()
+        except Exception:
+            self._error = sys.exc_info()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            (callbacks, self._callbacks) = (self._callbacks, [])
+        for proc in callbacks:
+            proc(self)
+        return self
@@ -7,6 +7,7 @@ from __future__ import absolute_import
 import os, unittest, sasl
 from md.prelude import *
 from .. import avro
+from ..query import compiler, tree as query_tree
 from . import *
 
 def load_test_data():
@@ -62,6 +63,27 @@ class TestTree(unittest.TestCase):
         self.assertEqual(self._structure(resolve('/news')),
                          ('news', ['article-1', 'article-3']))
 
+    def test_snapshot(self):
+        zs = source()
+        with snapshot() as view:
+            with delta('Update Page', zs) as d:
+                resolve('/about').description = 'Changed description!'
+                d.checkpoint()
+            self.assertNotEqual(resolve('/about').description, 'Changed description!')
+            self.assertRaises(RepoError, lambda: view.checkpoint({}))
+        self.assertEqual(resolve('/about').description, 'Changed description!')
+
+    def test_bulk(self):
+        expect = self._structure(self.root)
+        init('test', 'memory:')
+        reports = []
+        load_bulk(os.path.join(os.path.dirname(__file__), 'test'),
+                  processes=1, batch=2, progress=reports.append)
+        self.assertEqual(self._structure(root()), expect)
+        self.assertEqual(resolve('/news/article-2').title, 'Article 2')
+        self.assertEqual((len(reports), reports[-1].done, reports[-1].written),
+                         (3, True, 6))
+
     def _structure(self, top):
         if not isinstance(top, Folder):
             return top.name
@@ -100,9 +122,186 @@ class TestQuery(unittest.TestCase):
     def test_ops(self):
         self._check('get(%r)' % str(self.root.key), (Site, 'test'))
 
+    def test_limit(self):
+        self.assertEqual([p.name for p in query('//Page', limit=2)],
+                         ['about', 'article-1'])
+        self.assertEqual([p.name for p in query('//Page', offset=1, limit=2)],
+                         ['article-1', 'article-2'])
+        self._check('/news/*[1]', (Page, 'article-2'))
+        self._check('/news/*[1]/following-sibling::*[0]', (Page, 'article-3'))
+        self._check('//Page[-1]')
+        self._check('/news/*[-1]')
+        self._check('//Page[-2]')
+        self._check('/*/*[-2]')
+
+    def test_frontier(self):
+        exprs = ('//.', '/news/article-1/following::*', '/news/article-3/preceding::*')
+        expect = [list(query(e)) for e in exprs]
+        saved = query_tree.FRONTIER
+        try:
+            for size in (1, 2):
+                query_tree.FRONTIER = size
+                self.assertEqual(expect, [list(query(e)) for e in exprs])
+        finally:
+            query_tree.FRONTIER = saved
+        self.assertEqual([i.name for i in resolve_keys(self.root.contents.itervalues())],
+                         ['about', 'news'])
+
+    def test_cache(self):
+        probe = init_cache(100)
+        try:
+            self.assertEqual(list(query('//Page')), list(query('//Page')))
+            self.assertEqual((1, 1), (probe.hits, probe.misses))
+
+            ## Attribute values aren't cached.
+            self.assertEqual(['About'], list(query('/about/@title')))
+            self.assertEqual(1, len(probe))
+
+            ## Nor are results that weren't read to the end.
+            self.assertEqual('article-1', next(query('/news/*')).name)
+            self.assertEqual(1, len(probe))
+
+            with delta('Add Page') as d:
+                add(self.root, make(Page, name='hello'))
+                d.checkpoint()
+            self.assertTrue('hello' in [p.name for p in query('//Page')])
+            self.assertEqual(1, probe.hits)
+
+            ## A list of expressions is a tuple of sequences.
+            self.assertEqual(2, len(query('/about, /news')))
+            self.assertEqual(1, len(probe))
+        finally:
+            init_cache(0)
+
+    def test_generated(self):
+        for expr in ('/', '*', '//.', '//Page', '/news/*[1]', '/about/@title',
+                     "//Page[@title = 'Article 2']", '/news/article-2/sibling::*',
+                     '/*/n-1/sibling::*[-2]', '//Page[-2]'):
+            self.assertEqual(list(compile(expr)(self.root)),
+                             list(compile(expr, generated=True)(self.root)))
+
+    def test_parallel(self):
+        self._check('/about | /news/* | /about', (Page, 'about'),
+                    (Page, 'article-1'), (Page, 'article-2'), (Page, 'article-3'))
+        self._check('//Page intersect /news/*[1]', (Page, 'article-2'))
+        self._check('/news/* except /news/*[1]', (Page, 'article-1'), (Page, 'article-3'))
+        self._check('/*[. intersect /news]', (Folder, 'news'))
+
+        exprs = ('//Page, /news, //Folder', '/news/*, /*, /news/*[1]')
+        expect = [map(list, compile(e)(self.root)) for e in exprs]
+        init_parallel(2)
+        try:
+            for batch in (False, True):
+                self.assertEqual(expect, [
+                    map(list, compile(e, batch)(self.root)) for e in exprs
+                ])
+            self._check('//Page | //Folder', (Page, 'about'), (Page, 'article-1'),
+                        (Page, 'article-2'), (Page, 'article-3'), (Folder, 'news'))
+        finally:
+            init_parallel(0)
+
+    def test_async(self):
+        self.assertEqual(aquery('//Page').get(), tuple(query('//Page')))
+        probe = init_async(2)
+        try:
+            results = [aquery('/news/*') for _ in range(4)]
+            self.assertEqual([tuple(query('/news/*'))] * 4, [p.get(1) for p in results])
+            self.assertEqual(4, probe.submitted + probe.coalesced)
+            self.assertEqual(self.root, aget(self.root.key).get(1))
+
+            pending = acommit('Add Page', lambda: add(self.root, make(Page, name='hello')))
+            self.assertEqual('hello', pending.get(1).name)
+            done = []
+            pending.then(done.append)
+            self.assertEqual([pending], done)
+            self.assertTrue('hello' in [p.name for p in query('//Page')])
+        finally:
+            init_async(0)
+
+    def test_project(self):
+        unplanned = compiler.Evaluator(path_query.read, path_query.BUILTIN, planner=None)
+        with delta('Add an empty folder'):
+            add(self.root, make(Folder, name='empty'))
+        self.root = root()
+        for expr in ('/news/*/@title', '/Page/@description', '/news/article-2/@name',
+                     '/*/@kind', '/news/Folder/@title', '/*/@name'):
+            self.assertEqual(list(compile(expr)(self.root)),
+                             list(unplanned(expr)(self.root)))
+        self.assertEqual(list(query('/news/*/@title')),
+                         ['Article 1', 'Article 2', 'Article 3'])
+        self.assertEqual(dict(query('/about/@*'))['title'], 'About')
+
+    def test_batch(self):
+        for expr in ('/', '*', '//.', '//Page', '/news/*', '/news/*[1]',
+                     '/news/article-2/sibling::*', '//Page[-2]', '/*/*[-2]'):
+            self.assertEqual(list(compile(expr)(self.root)),
+                             list(compile(expr, True)(self.root)))
+
+    def test_plan(self):
+        unplanned = compiler.Evaluator(path_query.read, path_query.BUILTIN, planner=None)
+        exprs = ('//Page', '//Folder/article-1', '//article-2', '//Page[1]',
+                 "//Page[@title = 'Article 3']", '/news//Page', 'descendant::Item')
+
+        def same():
+            for expr in exprs:
+                self.assertEqual(list(compile(expr)(self.root)),
+                                 list(unplanned(expr)(self.root)))
+
+        same()
+        with repository_transaction('Index "staging".'):
+            save_branch(get_branch('staging'), config={ 'index': 'name title' })
+        same()
+        with delta('Rename article-3') as d:
+            save(resolve('/news/article-3'), title='Article 3')
+            save(resolve('/about'), title='Article 3')
+            d.checkpoint()
+        same()
+
+        ## A lookup reads from the source the query runs against.
+        view = source().snapshot()
+        with delta('Add article-4'):
+            add(resolve('/news'), make(Page, name='article-4'))
+        with source(view):
+            same()
+            self.assertFalse('article-4' in [p.name for p in compile('//Page')(root())])
+
+        self.assertTrue(explain("//Page[@title = 'x']").endswith('[index title]'))
+        self.assertTrue(explain('//Page[1]').endswith('predicate(1)'))
+
     def _check(self, path, *result):
         self.assertEqual(tuple((type(r), r.name) for r in query(path)), result)
 
+class TestViews(unittest.TestCase):
+
+    def setUp(self):
+        self.root = load_test_data()
+        self.view = register_view('pages', '//Page')
+        self.changes = []
+        self.view.subscribe(lambda v, old, new: self.changes.append(len(new)))
+
+    def tearDown(self):
+        unregister_view('pages')
+
+    def test_register(self):
+        self.assertEqual(self.view, get_view('pages'))
+        self.assertEqual([p.name for p in self.view],
+                         ['about', 'article-1', 'article-2', 'article-3'])
+
+    def test_refresh(self):
+        with delta('Add Page') as d:
+            add(resolve('/news'), make(Page, name='article-4'))
+            d.checkpoint()
+        ## Reading the view brings it up to date if the worker hasn't.
+        self.assertEqual('article-4', list(self.view)[-1].name)
+        self.assertEqual([5], self.changes)
+
+        ## An item outside of the content tree isn't read by the view.
+        with delta('Add Item') as d:
+            make(Item, name='a')
+            d.checkpoint()
+        self.assertEqual(source().head, self.view.current().head)
+        self.assertEqual([5], self.changes)
+
 class TestAuth(unittest.TestCase):
 
     def setUp(self):
@@ -231,6 +430,21 @@ class TestBranch(unittest.TestCase):
 
         self.assertRaises(RepoError, lambda: use('foo'))
 
+    def test_handle(self):
+        live = open_branch('live')
+        self.assertTrue(live is open_branch('live'))
+        self.assertTrue(live._objects is self.zs._objects)
+
+    def test_publish(self):
+        with delta('Add "a".') as d:
+            make(Item, name='a')
+            d.checkpoint()
+
+        self.assertEqual(1, publish_branch().changed)
+        self.assertEqual(['a'], list(i.name for i in open_branch('live').find(Item)))
+        self.assertEqual(0, publish_branch().changed)
+        self.assertRaises(RepoError, lambda: publish_branch('live'))
+
     def test_user(self):
 
         ## Check that creating a user creates a branch as well.
@@ -4,17 +4,17 @@
 """tree -- a content tree"""
 
 from __future__ import absolute_import
-import re
+import re, itertools as it
 from md import abc
 from md.prelude import *
 from ..query import tree
 from .. import avro, data
-from . import api, path_query
+from . import api, path_query, index, cache
 
 __all__ = (
     'Key', 'Item', 'Folder', 'Site', 'Subdomain', 'Page',
     'get_type', 'type_name', 'text', 'html',
-    'root', 'query', 'path', 'resolve',
+    'root', 'query', 'path', 'resolve', 'resolve_keys', 'project_keys',
     'make', 'add', 'save', 'remove'
 )
 
@@ -72,29 +72,48 @@ class Folder(content('Folder')):
     def __contains__(self, name):
         return name in self.contents
 
-    ## FIXME: api.get() doesn't return multiple keys in request-order.
-    ## Look into doing something about this.  For now, workaround by
-    ## calling api.get() on individual keys.
+    ## Children are resolved in batches (see resolve_keys()).
 
     def __iter__(self):
-        return (api.get(k) for k in self.contents.itervalues())
+        return resolve_keys(self.contents.itervalues())
 
     def __leaf__(self):
         return False
 
     def before(self, item):
-        return (api.get(k) for k in self.contents.itervalues(item.name))
+        return resolve_keys(self.contents.itervalues(item.name))
 
     def after(self, item):
         seq = self.contents.itervalues(item.name, None)
         # The sequence begins with item; skip it.
         next(seq, None)
-        return (api.get(k) for k in seq)
+        return resolve_keys(seq)
 
     def child(self, name, default=None):
         key = self.contents.get(name)
         return api.get(key) if key else default
 
+    def __lookup__(self, test, field, value):
+        return index.lookup(self, test, field, value)
+
+    def __project__(self, test, name):
+        ## Decode only one field of each child (see project_keys()).
+        if isinstance(test, basestring):
+            keys = [self.contents[test]] if test in self.contents else []
+        elif isinstance(test, type):
+            keys = [k for k in self.contents.itervalues() if issubclass(k.type, test)]
+        else:
+            ## A wildcard step drops children that are false (see
+            ## query.tree.filtered()); that needs the whole child.
+            return None
+        return project_keys(keys, name)
+
+    @staticmethod
+    def __expand__(folders):
+        ## Resolve the children of a whole BFS frontier together.
+        items = resolve_keys(k for f in folders for k in f.contents.itervalues())
+        return [list(it.islice(items, len(f))) for f in folders]
+
     def add(self, item):
         if item.name in self:
             raise ValueError('Child already exists: %r.' % item.name)
@@ -149,8 +168,49 @@ ROOT = data.Key.make(Site, 'root')
 def root():
     return api.get(ROOT)
 
-def query(path, base=None):
-    return path_query.compile(path)(root() if base is None else base)
+def query(path, base=None, offset=0, limit=None):
+    """Evaluate a path query against base (the root by default).
+    Results are produced lazily; use offset and limit to page through
+    them without evaluating the whole query.
+
+    If a query cache is installed (see cache.py), results are cached
+    for the current head of the source.
+
+    A query reads from a snapshot of the source, so a commit made
+    while its results are consumed isn't seen halfway through."""
+
+    view = api.source()
+    if isinstance(view, data.zipper):
+        view = view.snapshot()
+    with api.source(view):
+        base = root() if base is None else base
+        probe = cache.query_cache()
+        key = probe is not None and cache.cache_key(path, base, offset, limit)
+        if key:
+            keys = probe.get(key)
+            if keys is not None:
+                return resolve_keys(keys)
+
+        ## An expression list produces a tuple of sequences; only a
+        ## sequence of items is cached.
+        result = path_query.compile(path)(base, offset, limit)
+    if isinstance(result, tuple):
+        return tuple(
+            r if isinstance(r, list) else pinned(view, r) for r in result
+        )
+    elif not key:
+        return pinned(view, result)
+    return probe.store(key, pinned(view, result))
+
+def pinned(view, seq):
+    """Produce the items of a lazy sequence, reading from view while
+    each one is made."""
+
+    seq = iter(seq)
+    while True:
+        with api.source(view):
+            item = next(seq)
+        yield item
 
 def path(item):
     up = (i.name for i in tree.orself(item, tree.ascend) if i.folder)
@@ -175,6 +235,43 @@ def resolve(expr, base=None):
 def walk(item):
     return tree.orself(item, tree.descend)
 
+def resolve_keys(keys, batch=None):
+    """Produce the items for a sequence of keys in key-order.  Keys
+    are resolved with one api.get() for each batch; a batch is
+    tree.FRONTIER keys by default."""
+
+    keys = iter(keys)
+    batch = batch or tree.FRONTIER
+    while True:
+        chunk = list(it.islice(keys, batch))
+        if not chunk:
+            break
+        ## api.get() doesn't produce items in request-order.
+        found = dict(
+            (i.key, i) for i in api.get(chunk)
+            if isinstance(i, data.Value)
+        )
+        for key in chunk:
+            yield found.get(key, Undefined)
+
+def project_keys(keys, name):
+    """Produce the name attribute of the items for a sequence of keys
+    in key-order, decoding only that field.  Return None if the
+    source can't project it."""
+
+    keys = list(keys)
+    if not all(name in k.type.__fields__ for k in keys):
+        ## It's a property, not a stored field.
+        return None
+    found = api.project(keys, (name, ))
+    if found is None:
+        return None
+    found = dict(
+        (k, s[1][name]) for (k, s) in found
+        if s is not Undefined and name in s[1]
+    )
+    return (found[k] for k in keys if k in found)
+
 
 ### Manipulation
 
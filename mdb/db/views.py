@@ -0,0 +1,231 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""views -- materialized path queries
+
+A view is a path query registered on a branch.  Its result is kept
+in memory only; views aren't stored in the repository, so each
+process registers its own.  When a delta or publish moves the
+branch's head, a worker thread brings the views up to date, or the
+next read of a view does if it comes first; the writer doesn't wait
+for them.  Subscribers are called, in whichever thread refreshed the
+view, when the result changes.
+
+    menu = register_view('menu', '/*')
+    menu.subscribe(lambda view, old, new: push(new))
+
+While a view is evaluated, the keys it reads are recorded.  When the
+head moves, the keys that changed since the view's head are compared
+with that read set; only views that read a changed key are
+evaluated again.
+"""
+
+from __future__ import absolute_import
+import threading, logging
+from md.prelude import *
+from .. import data
+from . import api, tree
+
+__all__ = (
+    'View', 'register_view', 'unregister_view', 'get_view', 'views',
+    'refresh_views', 'update_views'
+)
+
+
+### Registry
+
+## Views are registered by branch name.  Repository-level views are
+## registered under None.
+
+VIEWS = ddict(dict)
+LOCK = threading.RLock()
+
+def register_view(name, expr, base=None, zs=None):
+    """Register and evaluate a view of the current source (or zs).
+    The query is evaluated against the item with the key base (the
+    root by default)."""
+
+    zs = _zipper(zs)
+    view = View(name, expr, base or tree.ROOT, _branch(zs))
+    with LOCK:
+        view.evaluate(zs)
+        VIEWS[_branch(zs)][name] = view
+    return view
+
+def unregister_view(name, zs=None):
+    branch = _branch(_zipper(zs))
+    with LOCK:
+        view = VIEWS[branch].pop(name, None)
+        if not VIEWS[branch]:
+            with STALE_LOCK:
+                STALE.pop(branch, None)
+        return view
+
+def get_view(name, zs=None):
+    return VIEWS[_branch(_zipper(zs))].get(name)
+
+def views(zs=None):
+    return VIEWS[_branch(_zipper(zs))].values()
+
+## A head that moved is noted in STALE with a snapshot at the new
+## head.  Noting it is all a writer does.  The refresh is done later,
+## under LOCK, by the worker or by a reader.
+
+STALE = {}
+STALE_LOCK = threading.Lock()
+WAKE = threading.Event()
+WORKER = []
+
+@api.on_change
+def refresh_views(zs):
+    """Note that the head of zs moved; the views registered on it are
+    brought up to date by a worker thread (see update_views())."""
+
+    zs = _zipper(zs)
+    name = _branch(zs)
+    if not VIEWS.get(name):
+        return
+    with STALE_LOCK:
+        STALE[name] = zs.snapshot()
+        if not WORKER:
+            WORKER.append(_start_worker())
+    WAKE.set()
+
+def update_views(name):
+    """Bring the views registered on the named branch up to date
+    with the last head noted for it, if it's moved since."""
+
+    with LOCK:
+        with STALE_LOCK:
+            zs = STALE.pop(name, None)
+        if zs is None:
+            return
+        diffs = {}
+        for view in VIEWS.get(name, {}).values():
+            if view.head == zs.head:
+                continue
+            changed = diffs.get(view.head)
+            if changed is None:
+                changed = diffs[view.head] = frozenset(
+                    data.Key(k) for (_, k, _, _)
+                    in data.diff(zs, view.head, zs.head)
+                )
+            if view.affected(changed):
+                view.refresh(zs)
+            else:
+                view.head = zs.head
+
+def _start_worker():
+    worker = threading.Thread(target=_work, name='mdb-views')
+    worker.daemon = True
+    worker.start()
+    return worker
+
+def _work():
+    while True:
+        WAKE.wait()
+        WAKE.clear()
+        for name in list(STALE):
+            try:
+                update_views(name)
+            except Exception:
+                logging.getLogger(__name__).exception('Refreshing views on %r failed.', name)
+
+def _zipper(zs):
+    zs = zs or api.source()
+    return zs._zs if isinstance(zs, api._Delta) else zs
+
+def _branch(zs):
+    return zs.name if isinstance(zs, data.branch) else None
+
+
+### Views
+
+class View(object):
+    """A path query with a result kept in memory."""
+
+    def __init__(self, name, expr, base, branch=None):
+        self.name = name
+        self.expr = expr
+        self.base = base
+        self.branch = branch
+        self.head = None
+        self.result = []
+        self.subscribers = []
+        self._reads = frozenset()
+        self._kinds = ()
+
+    def __repr__(self):
+        return '<%s %s %r>' % (type(self).__name__, self.name, self.expr)
+
+    def __iter__(self):
+        return iter(self.current().result)
+
+    def __len__(self):
+        return len(self.current().result)
+
+    def current(self):
+        """Bring the view up to date if its branch has moved."""
+
+        update_views(self.branch)
+        return self
+
+    def subscribe(self, proc):
+        """Call proc(view, old, new) when the result changes."""
+
+        self.subscribers.append(proc)
+        return proc
+
+    def unsubscribe(self, proc):
+        self.subscribers.remove(proc)
+
+    def affected(self, changed):
+        """Could a change to these keys change the result?"""
+
+        return any(
+            key in self._reads
+            or (self._kinds and issubclass(key.type, self._kinds))
+            for key in changed
+        )
+
+    def evaluate(self, zs):
+        zs = zs.snapshot()
+        reads = Reads(zs)
+        with api.source(reads):
+            base = api.get(self.base)
+            self.result = list(tree.query(self.expr, base)) if base else []
+        self.head = zs.head
+        self._reads = frozenset(reads.keys)
+        self._kinds = tuple(reads.kinds)
+        return self
+
+    def refresh(self, zs):
+        old = self.result
+        self.evaluate(zs)
+        if self.result != old:
+            for proc in list(self.subscribers):
+                proc(self, old, self.result)
+        return self
+
+class Reads(object):
+    """A source that records the keys read through it.  It isn't a
+    zipper, so lookups traverse the tree (see index.py) and every key
+    that contributes to a result is read."""
+
+    def __init__(self, zs):
+        self._zs = zs
+        self.keys = set()
+        self.kinds = set()
+
+    def get(self, key):
+        self.keys.add(key)
+        return self._zs.get(key)
+
+    def mget(self, keys):
+        keys = list(keys)
+        self.keys.update(keys)
+        return self._zs.mget(keys)
+
+    def find(self, cls):
+        self.kinds.add(cls)
+        return self._zs.find(cls)
@@ -0,0 +1,10 @@
+# _lextab_1cf61efbcb4c.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'CMP', 'DCOLON', 'DDOT', 'DECIMAL', 'DIV', 'DSLASH', 'ELSE', 'FOR', 'IF', 'IN', 'INTEGER', 'INTERSECT', 'MINUS', 'NAME', 'OR', 'PLUS', 'QUANTITY', 'RETURN', 'SATISFIES', 'STAR', 'STRING', 'THEN', 'TO', 'UNION'))
+_lexreflags   = 64
+_lexliterals  = '[](),/.@:?$'
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [(u'(?P<t_INTEGER>\\d+)|(?P<t_DECIMAL>(?:\\d+\\.\\d*|\\.\\d+)(?:[eE][\\+\\-]?\\d+)?)|(?P<t_NAME>[a-zA-Z][\\w\\-]*)|(?P<t_STRING>(?:"(?:[^"]|"")*"|\'(?:[^\']|\'\')*\'))|(?P<t_CMP>!?=|<[=<]?|>[=>]?)|(?P<t_DDOT>\\.\\.)|(?P<t_UNION>\\|)|(?P<t_STAR>\\*)|(?P<t_DSLASH>//)|(?P<t_MINUS>\\-)|(?P<t_DCOLON>::)|(?P<t_PLUS>\\+)', [None, (u't_INTEGER', 'INTEGER'), (u't_DECIMAL', 'DECIMAL'), (u't_NAME', 'NAME'), (u't_STRING', 'STRING'), (None, 'CMP'), (None, 'DDOT'), (None, 'UNION'), (None, 'STAR'), (None, 'DSLASH'), (None, 'MINUS'), (None, 'DCOLON'), (None, 'PLUS')])]}
+_lexstateignore = {'INITIAL': ' \t\n\r'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
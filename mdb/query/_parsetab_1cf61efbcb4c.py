@@ -0,0 +1,120 @@
+
+# _parsetab_1cf61efbcb4c.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = "leftPLUSMINUSleftSTARDIVleftUNIONleftINTERSECTrightUNARYAND CMP DCOLON DDOT DECIMAL DIV DSLASH ELSE FOR IF IN INTEGER INTERSECT MINUS NAME OR PLUS QUANTITY RETURN SATISFIES STAR STRING THEN TO UNIONPath : ExprExpr : ExprListExprList : ExprSingleExprList : ExprList ',' ExprSingleExprSingle : ForExpr\n                      | QuantifiedExpr\n                      | IfExpr\n                      | OrExprForExpr : FOR VarInExpr RETURN ExprSingleVarInExpr : VarRef IN ExprSingleVarInExpr : VarInExpr ',' VarRef IN ExprSingleQuantifiedExpr : QUANTITY VarInExpr SATISFIES ExprSingleIfExpr : IF '(' Expr ')' THEN ExprSingle ELSE ExprSingleOrExpr : AndExprOrExpr : OrExpr OR AndExprAndExpr : CmpExprAndExpr : AndExpr AND CmpExprCmpExpr : BinOpExprCmpExpr : BinOpExpr CMP BinOpExprBinOpExpr : ValueExpr\n                     | UnaryExprBinOpExpr : BinOpExpr PLUS BinOpExpr\n                     | BinOpExpr MINUS BinOpExpr\n                     | BinOpExpr STAR BinOpExpr\n                     | BinOpExpr DIV BinOpExpr\n                     | BinOpExpr UNION BinOpExpr\n                     | BinOpExpr INTERSECT BinOpExprUnaryExpr : PLUS ValueExpr %prec UNARY\n                     | MINUS ValueExpr %prec UNARYValueExpr : PathExprPathExpr : '/'PathExpr : '/' RelativePathExprPathExpr : DSLASH RelativePathExprPathExpr : RelativePathExprRelativePathExpr : StepExpr\n                            | PredicateRelativePathExpr : RelativePathExpr '/' StepExprRelativePathExpr : RelativePathExpr DSLASH StepExprRelativePathExpr : RelativePathExpr PredicateStepExpr : FilterExpr\n                    | AxisStepAxisStep : QName DCOLON NodeReduceAxisStep : '@' NodeReduceAxisStep : DDOTAxisStep : NodeTestNodeReduce : ReduceAxis\n                      | NodeTestNodeTest : NameTest\n                    | WildcardNameTest : QNameWildcard : STARWildcard : STAR ':' NAME\n                    | NAME ':' STARFilterExpr : PrimaryExprPredicate : '[' Expr ']'PrimaryExpr : Literal\n                       | VarRef\n                       | ParenExpr\n                       | ContextItem\n                       | FunctionCallLiteral : INTEGER\n                   | DECIMALLiteral : STRINGVarRef : '$' AnyNameParenExpr : '(' Expr ')'ParenExpr : '(' ')'ContextItem : '.'FunctionCall : QName '(' Arguments ')'Arguments : Arguments ',' ExprSingleArguments : ExprSingleArguments : ReduceAxis : QName '(' Arguments ')'AnyName : QName\n                   | KeywordNameQName : NAMEQName : NAME ':' NAMEKeywordName : RETURN\n                       | FOR\n                       | IN\n                       | QUANTITY\n                       | SATISFIES\n                       | IF\n                       | ELSE\n                       | OR\n                       | AND\n                       | CMP\n                       | TO\n                       | DIV\n                       | UNION\n                       | INTERSECT"
+    
+_lr_action_items = {'DSLASH':([0,1,2,3,5,8,9,10,12,14,15,17,18,20,21,23,28,29,32,34,37,38,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,71,73,76,77,78,79,81,83,84,85,86,87,88,89,90,92,93,95,97,99,100,102,103,104,105,106,107,116,119,120,123,131,132,133,134,135,139,],[4,-45,-49,-48,-58,-56,-44,-51,4,-36,-57,-59,4,-40,-67,4,80,-63,-62,-41,-61,4,-75,-50,-60,-54,-35,80,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-66,80,-47,-43,-46,-50,-39,4,4,4,4,4,4,4,4,4,4,4,4,-52,4,4,-65,4,4,-38,-37,-55,-53,-76,-42,-68,4,4,-72,4,4,]),'STAR':([0,1,2,3,4,5,8,9,10,12,13,14,15,17,18,19,20,21,23,25,27,28,29,32,33,34,35,37,38,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,80,81,82,83,84,85,86,87,88,89,90,92,93,94,95,96,97,99,100,102,103,104,105,106,107,108,109,110,111,112,113,114,116,119,120,123,131,132,133,134,135,139,],[10,-45,-49,-48,10,-58,-56,-44,-51,10,-30,-36,-57,-59,10,10,-40,-67,10,-20,10,-34,-63,-62,-21,-41,83,-61,10,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,10,-39,10,10,10,10,10,10,10,10,10,10,10,119,10,10,10,-52,10,10,-65,10,10,-38,-37,-24,-26,83,-27,-25,83,83,-55,-53,-76,-42,-68,10,10,-72,10,10,]),'THEN':([130,],[135,]),'DDOT':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,]),'RETURN':([1,2,3,5,6,7,8,9,10,11,13,14,15,17,19,20,21,22,25,28,29,30,32,33,34,35,36,37,41,42,43,44,45,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,70,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,115,116,119,120,123,124,125,127,128,131,134,137,140,],[-45,-49,-48,-58,-6,52,-56,-44,-51,-7,-30,-36,-57,-59,-31,-40,-67,-5,-20,-34,-63,-16,-62,-21,-41,-18,-8,-61,-75,-50,-60,-54,-14,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,102,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-53,-76,-42,-17,-10,-9,-12,-68,-72,-11,-13,]),'DIV':([1,2,3,5,7,8,9,10,13,14,15,17,19,20,21,25,28,29,32,33,34,35,37,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,116,119,120,123,131,134,],[-45,-49,-48,-58,66,-56,-44,-51,-30,-36,-57,-59,-31,-40,-67,-20,-34,-63,-62,-21,-41,87,-61,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,87,-27,-25,87,87,-55,-53,-76,-42,-68,-72,]),'DCOLON':([41,42,120,],[-75,96,-76,]),'MINUS':([0,1,2,3,5,8,9,10,13,14,15,17,18,19,20,21,25,28,29,32,33,34,35,37,38,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,83,84,85,86,87,88,89,90,92,93,95,97,99,100,102,103,104,105,106,107,108,109,110,111,112,113,114,116,119,120,123,131,132,133,134,135,139,],[12,-45,-49,-48,-58,-56,-44,-51,-30,-36,-57,-59,12,-31,-40,-67,-20,-34,-63,-62,-21,-41,88,-61,12,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,12,12,12,12,12,12,12,12,12,12,12,12,-52,12,12,-65,12,12,-38,-37,-24,-26,-22,-27,-25,-23,88,-55,-53,-76,-42,-68,12,12,-72,12,12,]),'CMP':([1,2,3,5,7,8,9,10,13,14,15,17,19,20,21,25,28,29,32,33,34,35,37,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,116,119,120,123,131,134,],[-45,-49,-48,-58,55,-56,-44,-51,-30,-36,-57,-59,-31,-40,-67,-20,-34,-63,-62,-21,-41,89,-61,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-55,-53,-76,-42,-68,-72,]),'$':([0,4,12,16,18,19,23,26,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,101,102,104,105,132,133,135,139,],[7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,]),')':([1,2,3,5,6,8,9,10,11,13,14,15,17,18,19,20,21,22,25,28,29,30,32,33,34,35,36,37,39,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,72,73,74,76,77,78,79,81,95,99,103,105,106,107,108,109,110,111,112,113,114,115,116,117,118,119,120,121,122,123,124,127,128,129,131,134,136,140,],[-45,-49,-48,-58,-6,-56,-44,-51,-7,-30,-36,-57,-59,71,-31,-40,-67,-5,-20,-34,-63,-16,-62,-21,-41,-18,-8,-61,-2,-75,-50,-60,-54,-14,-3,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,103,-32,-28,-47,-43,-46,-50,-39,-71,-52,-65,-71,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-4,130,-53,-76,131,-70,-42,-17,-9,-12,134,-68,-72,-69,-13,]),'(':([0,4,12,18,19,23,38,40,41,42,79,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,120,132,133,135,139,],[18,18,18,18,18,18,18,93,-75,95,105,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,-76,18,18,18,18,]),',':([1,2,3,5,6,8,9,10,11,13,14,15,17,19,20,21,22,25,28,29,30,32,33,34,35,36,37,39,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,70,71,73,74,75,76,77,78,79,81,95,99,103,105,106,107,108,109,110,111,112,113,114,115,116,117,119,120,121,122,123,124,125,127,128,129,131,134,136,137,140,],[-45,-49,-48,-58,-6,-56,-44,-51,-7,-30,-36,-57,-59,-31,-40,-67,-5,-20,-34,-63,-16,-62,-21,-41,-18,-8,-61,92,-75,-50,-60,-54,-14,-3,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,101,-66,-32,-28,101,-47,-43,-46,-50,-39,-71,-52,-65,-71,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-4,-53,-76,132,-70,-42,-17,-10,-9,-12,132,-68,-72,-69,-11,-13,]),'/':([0,1,2,3,5,8,9,10,12,14,15,17,18,20,21,23,28,29,32,34,37,38,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,71,73,76,77,78,79,81,83,84,85,86,87,88,89,90,92,93,95,97,99,100,102,103,104,105,106,107,116,119,120,123,131,132,133,134,135,139,],[19,-45,-49,-48,-58,-56,-44,-51,19,-36,-57,-59,19,-40,-67,19,82,-63,-62,-41,-61,19,-75,-50,-60,-54,-35,82,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-66,82,-47,-43,-46,-50,-39,19,19,19,19,19,19,19,19,19,19,19,19,-52,19,19,-65,19,19,-38,-37,-55,-53,-76,-42,-68,19,19,-72,19,19,]),'.':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,]),'TO':([7,],[60,]),'PLUS':([0,1,2,3,5,8,9,10,13,14,15,17,18,19,20,21,25,28,29,32,33,34,35,37,38,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,83,84,85,86,87,88,89,90,92,93,95,97,99,100,102,103,104,105,106,107,108,109,110,111,112,113,114,116,119,120,123,131,132,133,134,135,139,],[23,-45,-49,-48,-58,-56,-44,-51,-30,-36,-57,-59,23,-31,-40,-67,-20,-34,-63,-62,-21,-41,85,-61,23,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,23,23,23,23,23,23,23,23,23,23,23,23,-52,23,23,-65,23,23,-38,-37,-24,-26,-22,-27,-25,-23,85,-55,-53,-76,-42,-68,23,23,-72,23,23,]),'INTEGER':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,]),':':([10,41,53,],[67,94,98,]),'QUANTITY':([0,7,18,38,92,93,95,100,102,104,105,132,133,135,139,],[26,50,26,26,26,26,26,26,26,26,26,26,26,26,26,]),'@':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,]),'STRING':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,]),'FOR':([0,7,18,38,92,93,95,100,102,104,105,132,133,135,139,],[16,54,16,16,16,16,16,16,16,16,16,16,16,16,16,]),'UNION':([1,2,3,5,7,8,9,10,13,14,15,17,19,20,21,25,28,29,32,33,34,35,37,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,116,119,120,123,131,134,],[-45,-49,-48,-58,56,-56,-44,-51,-30,-36,-57,-59,-31,-40,-67,-20,-34,-63,-62,-21,-41,84,-61,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,84,-26,84,-27,84,84,84,-55,-53,-76,-42,-68,-72,]),'DECIMAL':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,]),'ELSE':([1,2,3,5,6,7,8,9,10,11,13,14,15,17,19,20,21,22,25,28,29,30,32,33,34,35,36,37,41,42,43,44,45,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,115,116,119,120,123,124,127,128,131,134,138,140,],[-45,-49,-48,-58,-6,59,-56,-44,-51,-7,-30,-36,-57,-59,-31,-40,-67,-5,-20,-34,-63,-16,-62,-21,-41,-18,-8,-61,-75,-50,-60,-54,-14,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-53,-76,-42,-17,-9,-12,-68,-72,139,-13,]),'INTERSECT':([1,2,3,5,7,8,9,10,13,14,15,17,19,20,21,25,28,29,32,33,34,35,37,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,116,119,120,123,131,134,],[-45,-49,-48,-58,51,-56,-44,-51,-30,-36,-57,-59,-31,-40,-67,-20,-34,-63,-62,-21,-41,86,-61,-75,-50,-60,-54,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,86,86,86,-27,86,86,86,-55,-53,-76,-42,-68,-72,]),'IN':([7,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,69,120,126,],[63,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,100,-76,133,]),'[':([0,1,2,3,4,5,8,9,10,12,14,15,17,18,19,20,21,23,28,29,32,34,37,38,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,71,73,76,77,78,79,81,83,84,85,86,87,88,89,90,92,93,95,97,99,100,102,103,104,105,106,107,116,119,120,123,131,132,133,134,135,139,],[38,-45,-49,-48,38,-58,-56,-44,-51,38,-36,-57,-59,38,38,-40,-67,38,38,-63,-62,-41,-61,38,-75,-50,-60,-54,-35,38,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-66,38,-47,-43,-46,-50,-39,38,38,38,38,38,38,38,38,38,38,38,38,-52,38,38,-65,38,38,-38,-37,-55,-53,-76,-42,-68,38,38,-72,38,38,]),']':([1,2,3,5,6,8,9,10,11,13,14,15,17,19,20,21,22,25,28,29,30,32,33,34,35,36,37,39,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,91,99,103,106,107,108,109,110,111,112,113,114,115,116,117,119,120,123,124,127,128,131,134,140,],[-45,-49,-48,-58,-6,-56,-44,-51,-7,-30,-36,-57,-59,-31,-40,-67,-5,-20,-34,-63,-16,-62,-21,-41,-18,-8,-61,-2,-75,-50,-60,-54,-14,-3,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,116,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-4,-53,-76,-42,-17,-9,-12,-68,-72,-13,]),'IF':([0,7,18,38,92,93,95,100,102,104,105,132,133,135,139,],[40,62,40,40,40,40,40,40,40,40,40,40,40,40,40,]),'AND':([1,2,3,5,7,8,9,10,13,14,15,17,19,20,21,25,28,29,30,32,33,34,35,37,41,42,43,44,45,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,115,116,119,120,123,124,131,134,],[-45,-49,-48,-58,49,-56,-44,-51,-30,-36,-57,-59,-31,-40,-67,-20,-34,-63,-16,-62,-21,-41,-18,-61,-75,-50,-60,-54,97,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,97,-55,-53,-76,-42,-17,-68,-72,]),'NAME':([0,4,7,12,18,19,23,27,38,67,80,82,83,84,85,86,87,88,89,90,92,93,94,95,96,97,98,100,102,104,105,132,133,135,139,],[41,41,53,41,41,41,41,41,41,99,41,41,41,41,41,41,41,41,41,41,41,41,120,41,41,41,120,41,41,41,41,41,41,41,41,]),'SATISFIES':([1,2,3,5,6,7,8,9,10,11,13,14,15,17,19,20,21,22,25,28,29,30,32,33,34,35,36,37,41,42,43,44,45,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,75,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,115,116,119,120,123,124,125,127,128,131,134,137,140,],[-45,-49,-48,-58,-6,64,-56,-44,-51,-7,-30,-36,-57,-59,-31,-40,-67,-5,-20,-34,-63,-16,-62,-21,-41,-18,-8,-61,-75,-50,-60,-54,-14,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,104,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-53,-76,-42,-17,-10,-9,-12,-68,-72,-11,-13,]),'$end':([1,2,3,5,6,8,9,10,11,13,14,15,17,19,20,21,22,24,25,28,29,30,31,32,33,34,35,36,37,39,41,42,43,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,115,116,117,119,120,123,124,127,128,131,134,140,],[-45,-49,-48,-58,-6,-56,-44,-51,-7,-30,-36,-57,-59,-31,-40,-67,-5,0,-20,-34,-63,-16,-1,-62,-21,-41,-18,-8,-61,-2,-75,-50,-60,-54,-14,-3,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-4,-53,-76,-42,-17,-9,-12,-68,-72,-13,]),'OR':([1,2,3,5,7,8,9,10,13,14,15,17,19,20,21,25,28,29,30,32,33,34,35,36,37,41,42,43,44,45,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,68,71,73,74,76,77,78,79,81,99,103,106,107,108,109,110,111,112,113,114,115,116,119,120,123,124,131,134,],[-45,-49,-48,-58,65,-56,-44,-51,-30,-36,-57,-59,-31,-40,-67,-20,-34,-63,-16,-62,-21,-41,-18,90,-61,-75,-50,-60,-54,-14,-35,-33,-85,-80,-90,-77,-75,-78,-86,-89,-64,-73,-83,-87,-74,-82,-79,-81,-84,-88,-29,-66,-32,-28,-47,-43,-46,-50,-39,-52,-65,-38,-37,-24,-26,-22,-27,-25,-23,-19,-15,-55,-53,-76,-42,-17,-68,-72,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'NodeTest':([0,4,12,18,19,23,27,38,80,82,83,84,85,86,87,88,89,90,92,93,95,96,97,100,102,104,105,132,133,135,139,],[1,1,1,1,1,1,76,1,1,1,1,1,1,1,1,1,1,1,1,1,1,76,1,1,1,1,1,1,1,1,1,]),'AxisStep':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,]),'NodeReduce':([27,96,],[77,123,]),'NameTest':([0,4,12,18,19,23,27,38,80,82,83,84,85,86,87,88,89,90,92,93,95,96,97,100,102,104,105,132,133,135,139,],[3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,]),'ParenExpr':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,]),'QuantifiedExpr':([0,18,38,92,93,95,100,102,104,105,132,133,135,139,],[6,6,6,6,6,6,6,6,6,6,6,6,6,6,]),'Literal':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,]),'KeywordName':([7,],[61,]),'Arguments':([95,105,],[121,129,]),'IfExpr':([0,18,38,92,93,95,100,102,104,105,132,133,135,139,],[11,11,11,11,11,11,11,11,11,11,11,11,11,11,]),'Predicate':([0,4,12,18,19,23,28,38,48,73,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[14,14,14,14,14,14,81,14,81,81,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,]),'VarRef':([0,4,12,16,18,19,23,26,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,101,102,104,105,132,133,135,139,],[15,15,15,69,15,15,15,69,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,126,15,15,15,15,15,15,15,]),'ContextItem':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,]),'ExprList':([0,18,38,93,],[39,39,39,39,]),'OrExpr':([0,18,38,92,93,95,100,102,104,105,132,133,135,139,],[36,36,36,36,36,36,36,36,36,36,36,36,36,36,]),'ForExpr':([0,18,38,92,93,95,100,102,104,105,132,133,135,139,],[22,22,22,22,22,22,22,22,22,22,22,22,22,22,]),'Path':([0,],[24,]),'ExprSingle':([0,18,38,92,93,95,100,102,104,105,132,133,135,139,],[46,46,46,117,46,122,125,127,128,122,136,137,138,140,]),'RelativePathExpr':([0,4,12,18,19,23,38,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[28,48,28,28,73,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,28,]),'CmpExpr':([0,18,38,90,92,93,95,97,100,102,104,105,132,133,135,139,],[30,30,30,30,30,30,30,124,30,30,30,30,30,30,30,30,]),'Expr':([0,18,38,93,],[31,72,91,118,]),'ReduceAxis':([27,96,],[78,78,]),'UnaryExpr':([0,18,38,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,33,]),'VarInExpr':([16,26,],[70,75,]),'BinOpExpr':([0,18,38,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[35,35,35,108,109,110,111,112,113,114,35,35,35,35,35,35,35,35,35,35,35,35,35,]),'PathExpr':([0,12,18,23,38,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,]),'Wildcard':([0,4,12,18,19,23,27,38,80,82,83,84,85,86,87,88,89,90,92,93,95,96,97,100,102,104,105,132,133,135,139,],[2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,]),'FilterExpr':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,]),'ValueExpr':([0,12,18,23,38,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[25,68,25,74,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,]),'AnyName':([7,],[57,]),'QName':([0,4,7,12,18,19,23,27,38,80,82,83,84,85,86,87,88,89,90,92,93,95,96,97,100,102,104,105,132,133,135,139,],[42,42,58,42,42,42,42,79,42,42,42,42,42,42,42,42,42,42,42,42,42,42,79,42,42,42,42,42,42,42,42,42,]),'FunctionCall':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,43,]),'PrimaryExpr':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,]),'AndExpr':([0,18,38,90,92,93,95,100,102,104,105,132,133,135,139,],[45,45,45,115,45,45,45,45,45,45,45,45,45,45,45,]),'StepExpr':([0,4,12,18,19,23,38,80,82,83,84,85,86,87,88,89,90,92,93,95,97,100,102,104,105,132,133,135,139,],[47,47,47,47,47,47,47,106,107,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> Path","S'",1,None,None,None),
+  ('Path -> Expr','Path',1,'p_Path','parse.py',41),
+  ('Expr -> ExprList','Expr',1,'p_Expr','parse.py',45),
+  ('ExprList -> ExprSingle','ExprList',1,'p_ExprList','parse.py',49),
+  ('ExprList -> ExprList , ExprSingle','ExprList',3,'p_ExprList_many','parse.py',53),
+  ('ExprSingle -> ForExpr','ExprSingle',1,'p_ExprSingle','parse.py',57),
+  ('ExprSingle -> QuantifiedExpr','ExprSingle',1,'p_ExprSingle','parse.py',58),
+  ('ExprSingle -> IfExpr','ExprSingle',1,'p_ExprSingle','parse.py',59),
+  ('ExprSingle -> OrExpr','ExprSingle',1,'p_ExprSingle','parse.py',60),
+  ('ForExpr -> FOR VarInExpr RETURN ExprSingle','ForExpr',4,'p_ForExpr','parse.py',64),
+  ('VarInExpr -> VarRef IN ExprSingle','VarInExpr',3,'p_VarInExpr','parse.py',68),
+  ('VarInExpr -> VarInExpr , VarRef IN ExprSingle','VarInExpr',5,'p_VarInExpr_many','parse.py',72),
+  ('QuantifiedExpr -> QUANTITY VarInExpr SATISFIES ExprSingle','QuantifiedExpr',4,'p_QuantifiedExpr','parse.py',76),
+  ('IfExpr -> IF ( Expr ) THEN ExprSingle ELSE ExprSingle','IfExpr',8,'p_IfExpr','parse.py',80),
+  ('OrExpr -> AndExpr','OrExpr',1,'p_OrExpr','parse.py',84),
+  ('OrExpr -> OrExpr OR AndExpr','OrExpr',3,'p_OrExpr_many','parse.py',88),
+  ('AndExpr -> CmpExpr','AndExpr',1,'p_AndExpr','parse.py',92),
+  ('AndExpr -> AndExpr AND CmpExpr','AndExpr',3,'p_AndExpr_many','parse.py',96),
+  ('CmpExpr -> BinOpExpr','CmpExpr',1,'p_CmpExpr','parse.py',100),
+  ('CmpExpr -> BinOpExpr CMP BinOpExpr','CmpExpr',3,'p_CmpExpr_many','parse.py',104),
+  ('BinOpExpr -> ValueExpr','BinOpExpr',1,'p_BinOpExpr','parse.py',116),
+  ('BinOpExpr -> UnaryExpr','BinOpExpr',1,'p_BinOpExpr','parse.py',117),
+  ('BinOpExpr -> BinOpExpr PLUS BinOpExpr','BinOpExpr',3,'p_BinOpExpr_op','parse.py',121),
+  ('BinOpExpr -> BinOpExpr MINUS BinOpExpr','BinOpExpr',3,'p_BinOpExpr_op','parse.py',122),
+  ('BinOpExpr -> BinOpExpr STAR BinOpExpr','BinOpExpr',3,'p_BinOpExpr_op','parse.py',123),
+  ('BinOpExpr -> BinOpExpr DIV BinOpExpr','BinOpExpr',3,'p_BinOpExpr_op','parse.py',124),
+  ('BinOpExpr -> BinOpExpr UNION BinOpExpr','BinOpExpr',3,'p_BinOpExpr_op','parse.py',125),
+  ('BinOpExpr -> BinOpExpr INTERSECT BinOpExpr','BinOpExpr',3,'p_BinOpExpr_op','parse.py',126),
+  ('UnaryExpr -> PLUS ValueExpr','UnaryExpr',2,'p_UnaryExpr','parse.py',130),
+  ('UnaryExpr -> MINUS ValueExpr','UnaryExpr',2,'p_UnaryExpr','parse.py',131),
+  ('ValueExpr -> PathExpr','ValueExpr',1,'p_ValueExpr','parse.py',135),
+  ('PathExpr -> /','PathExpr',1,'p_PathExpr_root','parse.py',143),
+  ('PathExpr -> / RelativePathExpr','PathExpr',2,'p_PathExpr_abs','parse.py',147),
+  ('PathExpr -> DSLASH RelativePathExpr','PathExpr',2,'p_PathExpr_abs_dslash','parse.py',151),
+  ('PathExpr -> RelativePathExpr','PathExpr',1,'p_PathExpr_rel','parse.py',155),
+  ('RelativePathExpr -> StepExpr','RelativePathExpr',1,'p_RelativePathExpr','parse.py',159),
+  ('RelativePathExpr -> Predicate','RelativePathExpr',1,'p_RelativePathExpr','parse.py',160),
+  ('RelativePathExpr -> RelativePathExpr / StepExpr','RelativePathExpr',3,'p_RelativePathExpr_slash','parse.py',164),
+  ('RelativePathExpr -> RelativePathExpr DSLASH StepExpr','RelativePathExpr',3,'p_RelativePathExpr_dslash','parse.py',168),
+  ('RelativePathExpr -> RelativePathExpr Predicate','RelativePathExpr',2,'p_RelativePathExpr_pred','parse.py',172),
+  ('StepExpr -> FilterExpr','StepExpr',1,'p_StepExpr','parse.py',176),
+  ('StepExpr -> AxisStep','StepExpr',1,'p_StepExpr','parse.py',177),
+  ('AxisStep -> QName DCOLON NodeReduce','AxisStep',3,'p_AxisStep','parse.py',181),
+  ('AxisStep -> @ NodeReduce','AxisStep',2,'p_AxisStep_attr','parse.py',193),
+  ('AxisStep -> DDOT','AxisStep',1,'p_AxisStep_parent','parse.py',197),
+  ('AxisStep -> NodeTest','AxisStep',1,'p_AxisStep_child','parse.py',201),
+  ('NodeReduce -> ReduceAxis','NodeReduce',1,'p_NodeReduce','parse.py',205),
+  ('NodeReduce -> NodeTest','NodeReduce',1,'p_NodeReduce','parse.py',206),
+  ('NodeTest -> NameTest','NodeTest',1,'p_NodeTest','parse.py',210),
+  ('NodeTest -> Wildcard','NodeTest',1,'p_NodeTest','parse.py',211),
+  ('NameTest -> QName','NameTest',1,'p_NameTest','parse.py',215),
+  ('Wildcard -> STAR','Wildcard',1,'p_Wildcard','parse.py',219),
+  ('Wildcard -> STAR : NAME','Wildcard',3,'p_Wildcard_ns','parse.py',223),
+  ('Wildcard -> NAME : STAR','Wildcard',3,'p_Wildcard_ns','parse.py',224),
+  ('FilterExpr -> PrimaryExpr','FilterExpr',1,'p_FilterExpr','parse.py',228),
+  ('Predicate -> [ Expr ]','Predicate',3,'p_Predicate','parse.py',232),
+  ('PrimaryExpr -> Literal','PrimaryExpr',1,'p_PrimaryExpr','parse.py',236),
+  ('PrimaryExpr -> VarRef','PrimaryExpr',1,'p_PrimaryExpr','parse.py',237),
+  ('PrimaryExpr -> ParenExpr','PrimaryExpr',1,'p_PrimaryExpr','parse.py',238),
+  ('PrimaryExpr -> ContextItem','PrimaryExpr',1,'p_PrimaryExpr','parse.py',239),
+  ('PrimaryExpr -> FunctionCall','PrimaryExpr',1,'p_PrimaryExpr','parse.py',240),
+  ('Literal -> INTEGER','Literal',1,'p_Literal_num','parse.py',244),
+  ('Literal -> DECIMAL','Literal',1,'p_Literal_num','parse.py',245),
+  ('Literal -> STRING','Literal',1,'p_Literal_string','parse.py',249),
+  ('VarRef -> $ AnyName','VarRef',2,'p_VarRef','parse.py',253),
+  ('ParenExpr -> ( Expr )','ParenExpr',3,'p_ParenExpr','parse.py',257),
+  ('ParenExpr -> ( )','ParenExpr',2,'p_ParenExpr_null','parse.py',261),
+  ('ContextItem -> .','ContextItem',1,'p_ContextItem','parse.py',265),
+  ('FunctionCall -> QName ( Arguments )','FunctionCall',4,'p_FunctionCall','parse.py',269),
+  ('Arguments -> Arguments , ExprSingle','Arguments',3,'p_Arguments','parse.py',273),
+  ('Arguments -> ExprSingle','Arguments',1,'p_Arguments_one','parse.py',277),
+  ('Arguments -> <empty>','Arguments',0,'p_Arguments_none','parse.py',281),
+  ('ReduceAxis -> QName ( Arguments )','ReduceAxis',4,'p_ReduceAxis','parse.py',285),
+  ('AnyName -> QName','AnyName',1,'p_AnyName','parse.py',289),
+  ('AnyName -> KeywordName','AnyName',1,'p_AnyName','parse.py',290),
+  ('QName -> NAME','QName',1,'p_QName','parse.py',294),
+  ('QName -> NAME : NAME','QName',3,'p_QName_ns','parse.py',298),
+  ('KeywordName -> RETURN','KeywordName',1,'p_KeywordName','parse.py',302),
+  ('KeywordName -> FOR','KeywordName',1,'p_KeywordName','parse.py',303),
+  ('KeywordName -> IN','KeywordName',1,'p_KeywordName','parse.py',304),
+  ('KeywordName -> QUANTITY','KeywordName',1,'p_KeywordName','parse.py',305),
+  ('KeywordName -> SATISFIES','KeywordName',1,'p_KeywordName','parse.py',306),
+  ('KeywordName -> IF','KeywordName',1,'p_KeywordName','parse.py',307),
+  ('KeywordName -> ELSE','KeywordName',1,'p_KeywordName','parse.py',308),
+  ('KeywordName -> OR','KeywordName',1,'p_KeywordName','parse.py',309),
+  ('KeywordName -> AND','KeywordName',1,'p_KeywordName','parse.py',310),
+  ('KeywordName -> CMP','KeywordName',1,'p_KeywordName','parse.py',311),
+  ('KeywordName -> TO','KeywordName',1,'p_KeywordName','parse.py',312),
+  ('KeywordName -> DIV','KeywordName',1,'p_KeywordName','parse.py',313),
+  ('KeywordName -> UNION','KeywordName',1,'p_KeywordName','parse.py',314),
+  ('KeywordName -> INTERSECT','KeywordName',1,'p_KeywordName','parse.py',315),
+]
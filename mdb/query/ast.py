@@ -114,11 +114,15 @@ BINOP = {
     '*': ast.Mult,
     'mod': ast.Mod,
     'div': ast.Div,
+    '|': 'union',
+    'union': 'union',
+    'intersect': 'intersect',
+    'except': 'difference'
 }
 
 def BinOp(op, left, right):
     op = BINOP[op]
-    if isinstance(op, ast.Name):
+    if isinstance(op, basestring):
         return Op(op, left, right)
     return ast.BinOp(left, op(), right)
 
@@ -0,0 +1,297 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""batch -- set-at-a-time path query evaluation
+
+The default evaluator (see tree.py) expands one focused item at a
+time, binding FOCUS and INDEX in the dynamic context for each of them.
+This module exports the same bindings, but each step transforms a
+whole node set before the next step runs.  Axis steps don't need a
+context at all; predicates and filters get the focused item and its
+index from a plain thread-local instead of fluid cells.
+
+    evaluate = compiler.Evaluator(parse.PathParser(ast), builtin(), batch)
+"""
+
+from __future__ import absolute_import
+import threading, contextlib, itertools as it
+from . import tree, parallel
+
+__all__ = (
+    'collection', 'focus', 'index',
+    'Path', 'Sequence', 'sequence', 'steps', 'filter', 'predicate',
+    'self', 'parent', 'child', 'attribute', 'ancestor', 'ancestor_or_self',
+    'descendant', 'descendant_or_self', 'following_sibling', 'following',
+    'preceding_sibling', 'preceding', 'sibling', 'lookup_descendant',
+    'child_attribute'
+)
+
+
+### Context
+
+## Node sets passed between steps are lists of groups.  A group is a
+## list of (index, item) pairs produced by expanding one item; the
+## index is the item's position in its group, like INDEX in the
+## default evaluator.
+
+class Context(threading.local):
+    focus = None
+    index = None
+
+CONTEXT = Context()
+
+collection = tree.collection
+
+def focus():
+    return CONTEXT.focus
+
+def index():
+    return CONTEXT.index
+
+class focused(object):
+    """Save the context on entry and restore it on exit.  Steps set
+    the context directly for each item in between."""
+
+    __slots__ = ('saved', )
+
+    def __enter__(self):
+        self.saved = (CONTEXT.focus, CONTEXT.index)
+        return CONTEXT
+
+    def __exit__(self, *args):
+        (CONTEXT.focus, CONTEXT.index) = self.saved
+
+## Workers evaluating an expression list or the operands of a set
+## operation start with the context of the calling thread.
+
+@parallel.capture
+def _capture():
+    saved = (CONTEXT.focus, CONTEXT.index)
+    return lambda: _inherited(saved)
+
+@contextlib.contextmanager
+def _inherited(saved):
+    with focused():
+        (CONTEXT.focus, CONTEXT.index) = saved
+        yield
+
+
+### Top Level
+
+def Path(exprs):
+    if isinstance(exprs, Sequence):
+        def xpath(items, offset=0, limit=None):
+            items = sequence(items)
+            with collection(items):
+                return tree.window(exprs.run(items), offset, limit)
+    else:
+        def xpath(items, offset=0, limit=None):
+            items = tree.shared(items)
+            with collection(items):
+                return tuple(parallel.evaluate(
+                    (lambda e=e: tree.window(e.run(items), offset, limit))
+                    for e in exprs
+                ))
+    return xpath
+
+def sequence(obj):
+    """Lift any value into a Sequence that can be used as input to a
+    compiled path query."""
+
+    if isinstance(obj, Sequence):
+        return obj
+    return Sequence(obj)
+
+class Sequence(tree.Sequence):
+    """A Sequence that can be run against a whole input sequence.
+    Unless it wraps a Pipeline, it's expanded for each input item."""
+
+    __slots__ = ()
+
+    def run(self, items):
+        if isinstance(self.expr, Pipeline):
+            return self.expr.run(items)
+        return tree.unique(self._each(items))
+
+    def _each(self, items):
+        with focused() as context:
+            for (context.index, context.focus) in enumerate(items):
+                for item in self.expr():
+                    yield item
+
+class Pipeline(Sequence):
+    """A path expression: a list of steps.  Each step transforms a
+    list of groups."""
+
+    __slots__ = ('steps', )
+
+    def __init__(self, steps):
+        self.steps = positioned(steps)
+        self.expr = self
+
+    def __repr__(self):
+        return '<%s %r>' % (type(self).__name__, self.steps)
+
+    def __iter__(self):
+        return self.run([focus()])
+
+    def run(self, items):
+        groups = [list(enumerate(items))]
+        for step in self.steps:
+            groups = step(groups)
+        return tree.unique(i for g in groups for (_, i) in g)
+
+def steps(*steps):
+    """Combine steps into a Pipeline."""
+
+    return Pipeline(steps)
+
+def positioned(steps):
+    ## An axis followed by a positional predicate doesn't need to
+    ## expand items past that position.  A negative position selects
+    ## nothing, so no items are expanded at all.
+    steps = list(steps)
+    for idx in xrange(len(steps) - 1):
+        (step, next) = steps[idx:idx + 2]
+        if type(step) is Axis and type(next) is Position:
+            steps[idx] = Axis(step.expand, max(next.expr + 1, 0))
+    return steps
+
+
+### Steps
+
+def unique_items(groups):
+    seen = set()
+    for group in groups:
+        for (_, item) in group:
+            if item not in seen:
+                seen.add(item)
+                yield item
+
+def unique_pairs(groups):
+    seen = set()
+    for group in groups:
+        for pair in group:
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
+
+class Axis(object):
+    """Expand each unique item in the node set into a new group.  If
+    there's a limit, groups are cut off at that size."""
+
+    __slots__ = ('expand', 'limit')
+
+    def __init__(self, expand, limit=None):
+        self.expand = expand
+        self.limit = limit
+
+    def __call__(self, groups):
+        (expand, limit) = (self.expand, self.limit)
+        return [
+            list(enumerate(it.islice(expand(i), limit)))
+            for i in unique_items(groups)
+        ]
+
+class Filter(object):
+    """Call a thunk for each focused item; each result becomes a new
+    group."""
+
+    __slots__ = ('expr', )
+
+    def __init__(self, expr):
+        self.expr = expr
+
+    def __call__(self, groups):
+        result = []
+        with focused() as context:
+            for (context.index, context.focus) in unique_pairs(groups):
+                result.append(list(enumerate(sequence(self.expr()))))
+        return result
+
+class Predicate(object):
+    """Keep the items in each group that satisfy a test."""
+
+    __slots__ = ('expr', )
+
+    def __init__(self, expr):
+        self.expr = expr
+
+    def __call__(self, groups):
+        test = self.expr
+        with focused() as context:
+            return [
+                [p for p in group if context_test(context, p, test)]
+                for group in groups
+            ]
+
+class Position(Predicate):
+    """Keep the item at a position in each group."""
+
+    __slots__ = ()
+
+    def __call__(self, groups):
+        pos = self.expr
+        return [[p for p in group if p[0] == pos] for group in groups]
+
+def context_test(context, (index, item), test):
+    context.index = index
+    context.focus = item
+    return test()
+
+def filter(expr):
+    """Lift a Python thunk to a step."""
+
+    return Filter(expr)
+
+def predicate(pred):
+    """Lift a nullary Python predicate procedure or an integer
+    (representing an index) to a step."""
+
+    if isinstance(pred, int):
+        return Position(pred)
+    return Predicate(pred)
+
+
+### Axis
+
+def axis(name):
+    expand = tree.AXES[name]
+
+    def make(test):
+        return Axis(tree.standard(expand, test))
+
+    make.__name__ = name
+    return make
+
+self = axis('self')
+parent = axis('parent')
+ancestor = axis('ancestor')
+ancestor_or_self = axis('ancestor_or_self')
+descendant = axis('descendant')
+descendant_or_self = axis('descendant_or_self')
+following_sibling = axis('following_sibling')
+following = axis('following')
+preceding_sibling = axis('preceding_sibling')
+preceding = axis('preceding')
+sibling = axis('sibling')
+
+_children = axis('_children')
+_attributes = axis('_attributes')
+
+def child(test):
+    if isinstance(test, basestring):
+        return Axis(tree._child(test))
+    return _children(test)
+
+def attribute(test):
+    assert not test or isinstance(test, basestring)
+    if isinstance(test, basestring):
+        return Axis(tree._attr(test))
+    return _attributes(test)
+
+def lookup_descendant(test, field=None, value=None):
+    return Axis(lambda item: tree.lookup(item, test, field, value))
+
+def child_attribute(test, name):
+    return Axis(lambda item: tree.project(item, test, name))
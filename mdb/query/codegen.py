@@ -0,0 +1,313 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""codegen -- compile path queries to generator functions
+
+The default evaluator (see tree.py) links a Step object for each step
+of a path; every item passes through expand(), unique() and focused()
+at each level.  This backend turns a path into the source of a single
+generator function instead: one nested loop for each step, with the
+common axes and tests written out inline, and one set of seen items
+for the whole result.  For example, //Page[@title = 'x'] without the
+planner becomes roughly:
+
+    def run(items):
+        seen = set()
+        for (i0, x0) in enumerate(items):
+            for (i1, x1) in enumerate(c0(x0)):             # self(root)
+                for x2 in orself(x1, descend):
+                    if not leaf(x2):
+                        i3 = -1
+                        for x3 in x2:
+                            if not isinstance(x3, c1): continue
+                            i3 += 1
+                            if getattr(x3, 'title', UNDEFINED) == 'x':
+                                ...yield x3 once
+
+Predicates and filters that aren't simple are compiled by the default
+evaluator and called with the focus and index bound, so their
+meaning doesn't change.  Queries this backend can't compile (an
+expression list, a path that isn't a sequence of steps) return None;
+the compiler evaluates them as usual.
+"""
+
+from __future__ import absolute_import
+import ast as _ast, itertools as it
+from md import fluid
+from . import tree, plan
+
+__all__ = ('generate', 'Generated')
+
+
+### Compile
+
+def generate(node, BUILTIN):
+    """Compile a parsed query (an ast.Expression) to a callable like
+    the one tree.Path() makes, or return None."""
+
+    steps = path_steps(node)
+    if steps is None:
+        return None
+    try:
+        return Generated(Writer(BUILTIN).write(steps))
+    except Unsupported:
+        return None
+
+def path_steps(node):
+    body = getattr(node, 'body', node)
+    if plan.called(body) != 'Path' or len(body.args) != 1:
+        return None
+    expr = plan.unwrap(body.args[0])
+    if plan.called(expr) == 'steps':
+        return expr.args
+    return [expr] if plan.called(expr) else None
+
+class Unsupported(Exception):
+    """A step the writer can't compile."""
+
+class Generated(object):
+    """A compiled query.  Call it with a context item (or sequence of
+    items) and an optional offset and limit."""
+
+    __slots__ = ('source', 'run')
+
+    def __init__(self, (source, run)):
+        self.source = source
+        self.run = run
+
+    def __repr__(self):
+        return '<%s>' % type(self).__name__
+
+    def __call__(self, items, offset=0, limit=None):
+        items = tree.sequence(items)
+        with tree.collection(items):
+            return tree.window(self.run(items), offset, limit)
+
+
+### Writer
+
+## Each step is written as a block nested in the block of the step
+## before it.  The focused item and its index at depth n are x<n> and
+## i<n>.  Constants (tests, compiled predicates, axis procedures) are
+## bound to c<n> in the function's globals.
+
+INDENT = '    '
+
+class Writer(object):
+
+    def __init__(self, BUILTIN):
+        self.BUILTIN = BUILTIN
+        self.lines = []
+        self.constants = 0
+        self.env = dict(
+            leaf=tree.leaf, descend=tree.descend, orself=tree.orself,
+            let=fluid.let, FOCUS=tree.FOCUS, INDEX=tree.INDEX,
+            UNDEFINED=fluid.UNDEFINED, sequence=tree.sequence,
+            islice=it.islice
+        )
+
+    def write(self, steps):
+        self.emit(0, 'def run(items):')
+        self.emit(1, 'seen = set()')
+        self.emit(1, 'for (i0, x0) in enumerate(items):')
+        (depth, level) = (0, 2)
+        for (idx, step) in enumerate(steps):
+            following = steps[idx + 1] if idx + 1 < len(steps) else None
+            (depth, level) = self.step(step, depth, level, following)
+
+        self.emit(level, 'if isinstance(x%d, (list, set)):' % depth)
+        self.emit(level + 1, 'x%d = tuple(x%d)' % (depth, depth))
+        self.emit(level, 'if x%d not in seen:' % depth)
+        self.emit(level + 1, 'seen.add(x%d)' % depth)
+        self.emit(level + 1, 'yield x%d' % depth)
+
+        source = '\n'.join(self.lines)
+        exec compile(source, '<path query>', 'exec') in self.env
+        return (source, self.env['run'])
+
+    def step(self, node, depth, level, following):
+        name = plan.called(node)
+        method = getattr(self, 'step_%s' % (name or '').replace('-', '_'), None)
+        if method is None or not self.is_standard(name):
+            raise Unsupported(name)
+        return method(node, depth, level, position(following))
+
+    def is_standard(self, name):
+        ## Only inline a step if its binding is the default one.
+        pyname = name.replace('-', '_')
+        return self.BUILTIN.get(name) is getattr(tree, pyname, None)
+
+    ## Axes
+
+    def step_child(self, node, depth, level, stop):
+        test = self.static(node.args[0])
+        (x, nx, ni) = ('x%d' % depth, 'x%d' % (depth + 1), 'i%d' % (depth + 1))
+        if isinstance(test, basestring):
+            self.emit(level, 'if not leaf(%s):' % x)
+            self.emit(level + 1, '%s = %s.child(%s)' % (nx, x, self.const(test)))
+            self.emit(level + 1, 'if %s:' % nx)
+            self.emit(level + 2, '%s = 0' % ni)
+            return (depth + 1, level + 2)
+
+        elif not inline(test):
+            return self.axis('_children', test, depth, level, stop)
+
+        self.emit(level, 'if not leaf(%s):' % x)
+        self.loop(level + 1, depth, x, test, stop)
+        return (depth + 1, level + 2)
+
+    def step_descendant(self, node, depth, level, stop):
+        test = self.static(node.args[0])
+        if not inline(test):
+            return self.axis('descendant', test, depth, level, stop)
+        self.loop(level, depth, 'descend(x%d)' % depth, test, stop)
+        return (depth + 1, level + 1)
+
+    def step_descendant_or_self(self, node, depth, level, stop):
+        test = self.static(node.args[0])
+        if not inline(test):
+            return self.axis('descendant_or_self', test, depth, level, stop)
+        self.loop(level, depth, 'orself(x%d, descend)' % depth, test, stop)
+        return (depth + 1, level + 1)
+
+    def step_attribute(self, node, depth, level, stop):
+        name = self.static(node.args[0])
+        if not isinstance(name, basestring):
+            return self.axis('_attributes', name, depth, level, stop)
+        (x, nx) = ('x%d' % depth, 'x%d' % (depth + 1))
+        self.emit(level, '%s = getattr(%s, %s, UNDEFINED)' % (nx, x, self.const(name)))
+        self.emit(level, 'if %s is not UNDEFINED:' % nx)
+        self.emit(level + 1, 'i%d = 0' % (depth + 1))
+        return (depth + 1, level + 1)
+
+    def step_lookup_descendant(self, node, depth, level, stop):
+        args = [self.static(a) for a in node.args]
+        expand = lambda item: tree.lookup(item, *args)
+        return self.generic(expand, depth, level, stop)
+
+    def step_child_attribute(self, node, depth, level, stop):
+        args = [self.static(a) for a in node.args]
+        expand = lambda item: tree.project(item, *args)
+        return self.generic(expand, depth, level, stop)
+
+    def axis(self, name, test, depth, level, stop=None):
+        return self.generic(tree.standard(tree.AXES[name], test), depth, level, stop)
+
+    def generic(self, expand, depth, level, stop):
+        source = '%s(x%d)' % (self.const(expand), depth)
+        if stop is not None:
+            source = limited(source, stop)
+        self.emit(level, 'for (i%d, x%d) in enumerate(%s):' % (depth + 1, depth + 1, source))
+        return (depth + 1, level + 1)
+
+    ## Steps
+
+    def step_predicate(self, node, depth, level, stop):
+        arg = node.args[0]
+        (x, i) = ('x%d' % depth, 'i%d' % depth)
+        if isinstance(arg, _ast.Num):
+            self.emit(level, 'if %s == %d:' % (i, arg.n))
+            return (depth, level + 1)
+
+        field = plan.field_test(node)
+        if field:
+            self.emit(level, 'if getattr(%s, %s, UNDEFINED) == %s:' % (
+                x, self.const(field[0]), self.const(field[1])
+            ))
+            return (depth, level + 1)
+
+        test = self.const(self.evaluate(arg))
+        self.emit(level, 'with let((INDEX, %s), (FOCUS, %s)):' % (i, x))
+        self.emit(level + 1, 'ok%d = bool(%s())' % (depth, test))
+        self.emit(level, 'if ok%d:' % depth)
+        return (depth, level + 1)
+
+    def step_filter(self, node, depth, level, stop):
+        thunk = self.const(self.evaluate(node.args[0]))
+        (x, i) = ('x%d' % depth, 'i%d' % depth)
+        self.emit(level, 'with let((INDEX, %s), (FOCUS, %s)):' % (i, x))
+        self.emit(level + 1, 's%d = list(sequence(%s()))' % (depth, thunk))
+        return self.generic_seq('s%d' % depth, depth, level, stop)
+
+    def generic_seq(self, source, depth, level, stop):
+        if stop is not None:
+            source = limited(source, stop)
+        self.emit(level, 'for (i%d, x%d) in enumerate(%s):' % (depth + 1, depth + 1, source))
+        return (depth + 1, level + 1)
+
+    def __getattr__(self, name):
+        ## Any other axis is called through tree.AXES.
+        if name.startswith('step_'):
+            axis = name[5:]
+            if axis in tree.AXES:
+                return lambda node, depth, level, stop: self.axis(
+                    axis, self.static(node.args[0]), depth, level, stop
+                )
+        raise AttributeError(name)
+
+    ## Aux
+
+    def loop(self, level, depth, source, test, stop):
+        ## Loop over source, keeping the items that pass test and
+        ## numbering them.  If the next step only wants one position,
+        ## stop after it.
+        (nx, ni) = ('x%d' % (depth + 1), 'i%d' % (depth + 1))
+        if stop is not None and stop < 0:
+            source = '()'
+        self.emit(level, '%s = -1' % ni)
+        self.emit(level, 'for %s in %s:' % (nx, source))
+        cond = self.test(nx, test)
+        if cond:
+            self.emit(level + 1, 'if not (%s): continue' % cond)
+        if stop is not None:
+            self.emit(level + 1, 'if %s == %d: break' % (ni, stop))
+        self.emit(level + 1, '%s += 1' % ni)
+
+    def test(self, x, test):
+        if not test:
+            return x
+        elif isinstance(test, basestring):
+            return '%s.name == %s' % (x, self.const(test))
+        return 'isinstance(%s, %s)' % (x, self.const(test))
+
+    def static(self, node):
+        """Evaluate a step argument at compile time.  Arguments that
+        depend on the context (lambdas) aren't supported."""
+
+        if any(isinstance(n, _ast.Lambda) for n in _ast.walk(node)):
+            raise Unsupported(node)
+        return self.evaluate(node)
+
+    def evaluate(self, node):
+        code = compile(
+            _ast.fix_missing_locations(_ast.Expression(node)),
+            '<path query>', 'eval'
+        )
+        return eval(code, { '__builtins__': self.BUILTIN }, {})
+
+    def const(self, value):
+        if isinstance(value, (basestring, int, long, float)):
+            return repr(value)
+        name = 'c%d' % self.constants
+        self.constants += 1
+        self.env[name] = value
+        return name
+
+    def emit(self, level, line):
+        self.lines.append('%s%s' % (INDENT * level, line))
+
+def limited(source, stop):
+    ## Only the items up to position stop are needed.  No item has a
+    ## negative position, so there's nothing to loop over.
+    if stop < 0:
+        return '()'
+    return 'islice(%s, %d)' % (source, stop + 1)
+
+def inline(test):
+    ## Tests (see tree.standard()) that are written out inline.
+    return not test or isinstance(test, (basestring, type))
+
+def position(step):
+    if plan.called(step) == 'predicate' and isinstance(step.args[0], _ast.Num):
+        return step.args[0].n
+    return None
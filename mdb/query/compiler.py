@@ -5,14 +5,15 @@
 
 from __future__ import absolute_import
 import sys, __builtin__, ast as _ast
-from . import parse, ops, tree, ast
+from . import parse, ops, tree, ast, batch, plan, codegen
 
-__all__ = ('read', 'evaluate')
+__all__ = ('read', 'evaluate', 'batch_evaluate', 'generate_evaluate', 'explain')
 
 
 ### Compiler
 
-def Evaluator(parse, BUILTIN):
+def Evaluator(parse, BUILTIN, strategy=None, planner=plan.optimize,
+              backend=None):
     """Create a path query evaluator using a parser and a set of
     builtin bindings.
 
@@ -22,14 +23,44 @@ def Evaluator(parse, BUILTIN):
 
         evaluate = Evaluator(parse.PathParser(ast), builtin())
         evaluate('/some/path/expression')(some_node())
+
+    The strategy is a module that replaces the step and axis bindings
+    of the tree module.  Use batch for set-at-a-time evaluation:
+
+        evaluate = Evaluator(parse.PathParser(ast), builtin(), batch)
+
+    Parsed queries are rewritten by the planner before they're
+    compiled (see plan.py).  Pass planner=None to compile them as
+    they're parsed.
+
+    A backend compiles a planned query itself; use codegen to make
+    generator functions.  If the backend returns None for a query,
+    it's evaluated normally.
     """
 
+    if strategy is not None:
+        BUILTIN = dict(BUILTIN)
+        BUILTIN.update(environment(use(strategy)))
+
     def evaluate(code):
         if isinstance(code, basestring):
-            code = compile_ast(parse(code))
+            code = parse(code)
+            if planner:
+                code = planner(code)
+            if backend:
+                generated = backend.generate(code, BUILTIN)
+                if generated:
+                    return generated
+            code = compile_ast(code)
         return eval(code, { '__builtins__': BUILTIN }, {})
     return evaluate
 
+def explain(parse, expr, annotate=None):
+    """Describe the plan chosen for a path expression.  See
+    plan.explain() for annotate."""
+
+    return '\n'.join(plan.explain(plan.optimize(parse(expr)), annotate))
+
 def compile_ast(node, filename='<string>', mode='eval'):
     ## print _ast.dump(ast.fix_missing_locations(node))
     return compile(_ast.fix_missing_locations(node), filename, mode)
@@ -88,3 +119,7 @@ gensym = Gensym('g')
 read = parse.PathParser(ast)
 
 evaluate = Evaluator(read, builtin())
+
+batch_evaluate = Evaluator(read, builtin(), batch)
+
+generate_evaluate = Evaluator(read, builtin(), backend=codegen)
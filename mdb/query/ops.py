@@ -8,7 +8,8 @@
 ## entirely into the global path evaluation context.
 
 from __future__ import absolute_import
-from . import tree as _tree
+import itertools as _it
+from . import tree as _tree, parallel as _parallel
 
 some = any
 every = all
@@ -29,3 +30,33 @@ def unique(seq):
         if item not in seen:
             seen.add(item)
             yield item
+
+## Set operations keep the order of the left operand (followed by the
+## right one for a union) and drop duplicates.  The operands are
+## evaluated concurrently if a pool is installed (see parallel.py).
+
+def union(left, right):
+    return _operation(_union, left, right)
+
+def intersect(left, right):
+    return _operation(_intersect, left, right)
+
+def difference(left, right):
+    return _operation(_difference, left, right)
+
+def _operation(proc, left, right):
+    ## The result is evaluated each time it's iterated, so it can be
+    ## used in a predicate.
+    operands = [(lambda s=s: _tree.sequence(s)) for s in (left, right)]
+    return _tree.Sequence(lambda: proc(*_parallel.evaluate(operands)))
+
+def _union(left, right):
+    return _tree.unique(_it.chain(left, right))
+
+def _intersect(left, right):
+    right = set(_tree.hashable(right))
+    return (i for i in _tree.unique(left) if i in right)
+
+def _difference(left, right):
+    right = set(_tree.hashable(right))
+    return (i for i in _tree.unique(left) if i not in right)
@@ -0,0 +1,89 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""parallel -- evaluate independent query expressions concurrently
+
+The expressions of a list (a, b) and the operands of a union,
+intersect or except don't depend on each other.  When a pool is
+installed, each one is evaluated to a list on a worker thread; the
+results are combined in their original order, so the output doesn't
+change.  Most of the time is spent waiting on the store, so threads
+are enough.
+
+    init_parallel(8)
+    query('//Page, //Folder')
+
+A worker runs in the dynamic context of the thread that started the
+evaluation.  Modules register the parts of the context they use with
+inherit() (fluid cells) or capture() (anything else).
+"""
+
+from __future__ import absolute_import
+import contextlib
+from multiprocessing.pool import ThreadPool
+from md import fluid
+
+__all__ = (
+    'init_parallel', 'pool', 'evaluate', 'inherit', 'capture', 'captured'
+)
+
+POOL = fluid.cell(None, type=fluid.acquired)
+pool = fluid.accessor(POOL)
+
+def init_parallel(workers=None):
+    """Install a global pool with this many workers (the number of
+    CPUs by default).  Pass 0 to evaluate serially again."""
+
+    old = pool()
+    POOL.set(ThreadPool(workers) if workers != 0 else None)
+    if old is not None:
+        old.close()
+    return pool()
+
+def evaluate(thunks):
+    """Call each thunk and return a list of the sequences they
+    produce, in order.  If a pool is installed, the sequences are
+    produced concurrently and read into lists; otherwise they're
+    returned as they are."""
+
+    thunks = list(thunks)
+    workers = pool()
+    if workers is None or len(thunks) < 2:
+        return [t() for t in thunks]
+    restore = captured()
+    return workers.map(lambda t: _run(restore, t), thunks)
+
+def _run(restore, thunk):
+    ## Expressions nested in this one are evaluated serially; a
+    ## worker waiting on its own pool could deadlock.
+    with contextlib.nested(pool(None), *[r() for r in restore]):
+        return list(thunk())
+
+
+### Context
+
+## Each capture procedure is called in the calling thread and returns
+## a procedure that makes a context manager; the worker enters it to
+## reinstate that part of the context.
+
+CAPTURE = []
+
+def capture(proc):
+    CAPTURE.append(proc)
+    return proc
+
+def captured():
+    return [proc() for proc in CAPTURE]
+
+def inherit(*cells):
+    """Bind these fluid cells in workers to their values in the
+    calling thread."""
+
+    access = [(c, fluid.accessor(c)) for c in cells]
+
+    @capture
+    def bind():
+        values = [(c, get()) for (c, get) in access]
+        return lambda: fluid.let(*values)
+
+    return cells
@@ -4,10 +4,10 @@
 """parse -- parse path queries"""
 
 from __future__ import absolute_import
-import os, sys, functools, importlib
+import os, sys, functools, importlib, inspect, hashlib, threading, glob
 from ply import lex, yacc
 
-__all__ = ('PathParser', 'path')
+__all__ = ('PathParser', 'path', 'write_tables')
 
 
 ### Parser
@@ -329,7 +329,15 @@ def extend(seq, *items):
     seq.extend(items)
     return seq
 
+## PLY tables are generated into this package the first time a
+## parser is made.  The tables that match the current grammar are
+## checked in so workers don't generate them at startup.  Table
+## modules are versioned by a hash of the Lexer() and Parser()
+## source: when the grammar changes, the old tables are ignored.
+## Run write_tables() to replace them.
+
 def _table(name, optimize):
+    name = '%s_%s' % (name, grammar_version())
     if not optimize:
         return name
     try:
@@ -337,6 +345,34 @@ def _table(name, optimize):
     except ImportError:
         return name
 
+def grammar_version():
+    global GRAMMAR
+    if GRAMMAR is None:
+        try:
+            source = inspect.getsource(Lexer) + inspect.getsource(Parser)
+            GRAMMAR = hashlib.sha1(source).hexdigest()[:12]
+        except IOError:
+            ## The source isn't available; the tables can't be
+            ## checked.  Generate them.
+            GRAMMAR = 'unversioned'
+    return GRAMMAR
+
+GRAMMAR = None
+
+def write_tables():
+    """Remove stale table modules and write new ones for the current
+    grammar.  Return the names of the new modules."""
+
+    here = os.path.dirname(__file__)
+    for path in glob.glob(os.path.join(here, '_*tab_*.py*')):
+        os.remove(path)
+    package = __name__.rpartition('.')[0]
+    for name in ('_lextab', '_parsetab'):
+        sys.modules.pop('%s.%s' % (package, _table(name, False)), None)
+    (tokens, lexer) = Lexer(optimize=True)
+    Parser(tokens, AST, optimize=True)
+    return sorted(_table(n, False) for n in ('_lextab', '_parsetab'))
+
 
 ### Lexer
 
@@ -494,11 +530,35 @@ def parse(parser, lexer, data, debug=False):
         ))
 
 def PathParser(ast=AST, **kwargs):
-    """Create a path parser using the given AST."""
+    """Create a path parser using the given AST.  The lexer and
+    parser are made the first time it's called."""
+
+    return LazyParser(ast, **kwargs)
 
-    optimize = not kwargs.get('debug', False)
-    (tokens, lexer) = Lexer(optimize=optimize)
-    parser = Parser(tokens, ast, optimize=optimize)
-    return functools.partial(parse, parser, lexer, **kwargs)
+class LazyParser(object):
+
+    def __init__(self, ast, **kwargs):
+        self.ast = ast
+        self.kwargs = kwargs
+        self._parse = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.ast.__name__)
+
+    def __call__(self, data):
+        if self._parse is None:
+            self._make()
+        return self._parse(data)
+
+    def _make(self):
+        with self._lock:
+            if self._parse is None:
+                optimize = not self.kwargs.get('debug', False)
+                (tokens, lexer) = Lexer(optimize=optimize)
+                parser = Parser(tokens, self.ast, optimize=optimize)
+                self._parse = functools.partial(
+                    parse, parser, lexer, **self.kwargs
+                )
 
 path = PathParser() # default parser
@@ -0,0 +1,241 @@
+## Copyright (c) 2010, Coptix, Inc.  All rights reserved.
+## See the LICENSE file for license terms and warranty disclaimer.
+
+"""plan -- rewrite parsed path queries before they're compiled
+
+A parsed query is a Python AST that calls step constructors.  The
+planner looks for step sequences that would walk the whole subtree
+under the context item and replaces them with a lookup-descendant()
+step.  For example:
+
+    //Page                  descendant-or-self(None), child(kind('Page'))
+    //Page[@title = 'x']    ... predicate(lambda: @title = 'x')
+
+become:
+
+    lookup-descendant(kind('Page'))
+    lookup-descendant(kind('Page'), 'title', 'x')
+
+A lookup step produces the same items in the same order as the steps
+it replaces.  How it finds them is up to the context item (see
+tree.lookup()); nodes backed by indexes can avoid the traversal.
+
+A path that ends with an attribute of children is replaced by a
+child-attribute() step, so the children's other fields don't have
+to be loaded (see tree.project()):
+
+    /news/*/@title          child(None), attribute('title')
+                            child-attribute(None, 'title')
+"""
+
+from __future__ import absolute_import
+import ast
+
+__all__ = ('optimize', 'explain', 'Planner')
+
+
+### Planner
+
+def optimize(node):
+    """Rewrite a parsed query (an ast.Expression) in place."""
+
+    return Planner().visit(node)
+
+class Planner(ast.NodeTransformer):
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if called(node) == 'steps':
+            node.args = project(rewrite(node.args))
+        return node
+
+def rewrite(steps):
+    result = []
+    idx = 0
+    while idx < len(steps):
+        (lookup, used) = match_lookup(steps, idx)
+        if lookup is None:
+            result.append(steps[idx])
+            idx += 1
+        else:
+            result.append(lookup)
+            idx += used
+    return result
+
+def match_lookup(steps, idx):
+    """Match a descendant scan starting at steps[idx].  Return a
+    (lookup, number-of-steps-replaced) pair or (None, 0)."""
+
+    step = steps[idx]
+    if called(step) == 'descendant' and is_test(step.args[0]):
+        (test, used) = (step.args[0], 1)
+    elif (called(step) == 'descendant-or-self' and is_any(step.args[0])
+          and idx + 1 < len(steps)
+          and called(steps[idx + 1]) == 'child'
+          and is_test(steps[idx + 1].args[0])):
+        (test, used) = (steps[idx + 1].args[0], 2)
+    else:
+        return (None, 0)
+
+    args = [test]
+    field = idx + used < len(steps) and field_test(steps[idx + used])
+    if field:
+        args.extend(ast.Str(v) if isinstance(v, basestring) else ast.Num(v)
+                    for v in field)
+        used += 1
+
+    ## Positional predicates count items per parent; a lookup
+    ## produces a single group, so the positions would change.
+    if idx + used < len(steps) and positional(steps[idx + used]):
+        return (None, 0)
+
+    return (op('lookup-descendant', *args), used)
+
+def project(steps):
+    """Replace a trailing child(test), attribute(name) pair with a
+    child-attribute(test, name) step."""
+
+    if len(steps) < 2:
+        return steps
+    (child, attr) = steps[-2:]
+    if (called(child) == 'child'
+        and (is_any(child.args[0]) or is_test(child.args[0]))
+        and called(attr) == 'attribute'
+        and isinstance(attr.args[0], ast.Str)):
+        return steps[:-2] + [op('child-attribute', child.args[0], attr.args[0])]
+    return steps
+
+def field_test(step):
+    """Match predicate(@field = literal); return (field, literal)."""
+
+    if called(step) != 'predicate' or not isinstance(step.args[0], ast.Lambda):
+        return None
+
+    body = unwrap(step.args[0].body)
+    if not (isinstance(body, ast.Compare) and len(body.ops) == 1
+            and isinstance(body.ops[0], ast.Eq)):
+        return None
+
+    (left, right) = (unwrap(body.left), unwrap(body.comparators[0]))
+    if called(right) == 'attribute':
+        (left, right) = (right, left)
+    if called(left) != 'attribute' or not isinstance(left.args[0], ast.Str):
+        return None
+
+    value = literal(right)
+    return None if value is None else (left.args[0].s, value)
+
+def positional(step):
+    if called(step) != 'predicate':
+        return False
+    arg = step.args[0]
+    return isinstance(arg, ast.Num) or any(
+        isinstance(n, ast.Name) and n.id == 'index'
+        for n in ast.walk(arg)
+    )
+
+
+### Explain
+
+def explain(node, annotate=None):
+    """Produce a list of lines that describe the plan of a parsed,
+    optimized query.  The optional annotate procedure is called with
+    each lookup step's (test, field, value) and may return a note
+    about how the lookup will be done."""
+
+    lines = []
+    describe(getattr(node, 'body', node), 0, lines, annotate)
+    return lines
+
+def describe(node, depth, lines, annotate):
+    name = called(node)
+    if name in ('Path', 'sequence', 'steps') and node.args:
+        lines.append('%s%s' % ('  ' * depth, name))
+        for arg in node.args:
+            describe(arg, depth + 1, lines, annotate)
+        return
+
+    line = '%s%s' % ('  ' * depth, unparse(node))
+    if name == 'lookup-descendant' and annotate:
+        note = annotate(*[literal(a, a) for a in node.args])
+        if note:
+            line = '%s  [%s]' % (line, note)
+    lines.append(line)
+
+def unparse(node):
+    if isinstance(node, ast.Call):
+        return '%s(%s)' % (
+            unparse(node.func), ', '.join(unparse(a) for a in node.args)
+        )
+    elif isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Str):
+        return repr(str(node.s))
+    elif isinstance(node, ast.Num):
+        return repr(node.n)
+    elif isinstance(node, ast.Lambda):
+        return unparse(node.body)
+    elif isinstance(node, ast.Compare):
+        return ' '.join(
+            [unparse(node.left)]
+            + ['%s %s' % (CMP.get(type(o), '?'), unparse(c))
+               for (o, c) in zip(node.ops, node.comparators)]
+        )
+    elif isinstance(node, ast.Tuple):
+        return '(%s)' % ', '.join(unparse(e) for e in node.elts)
+    return '<%s>' % type(node).__name__
+
+CMP = {
+    ast.Eq: '=', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+    ast.Gt: '>', ast.GtE: '>=', ast.In: 'in', ast.NotIn: 'not-in',
+    ast.Is: 'is', ast.IsNot: 'is-not'
+}
+
+
+### Aux
+
+def called(node):
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+def op(name, *args):
+    return ast.Call(ast.Name(name, ast.Load()), list(args), [], None, None)
+
+def is_any(node):
+    return isinstance(node, ast.Name) and node.id == 'None'
+
+def is_test(node):
+    ## A name test or a kind test; wildcards don't benefit from a
+    ## lookup.
+    return isinstance(node, ast.Str) or (
+        called(node) == 'kind' and isinstance(node.args[0], ast.Str)
+    )
+
+def unwrap(node):
+    ## Single-item sequences and steps are transparent in a
+    ## comparison.
+    while called(node) in ('sequence', 'steps') and len(node.args) == 1:
+        node = node.args[0]
+    return node
+
+def literal(node, default=None):
+    node = unwrap(node)
+    if called(node) == 'filter' and isinstance(node.args[0], ast.Lambda):
+        node = unwrap(node.args[0].body)
+    if isinstance(node, ast.Str):
+        return node.s
+    elif isinstance(node, ast.Num):
+        return node.n
+    elif called(node) == 'kind' and isinstance(node.args[0], ast.Str):
+        return KindName(node.args[0].s)
+    return default
+
+class KindName(str):
+    """The name of a kind test, as passed to an explain()
+    annotation."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'kind(%s)' % str.__repr__(self)
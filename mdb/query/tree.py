@@ -6,13 +6,15 @@
 from __future__ import absolute_import
 import collections as coll, functools as fn, itertools as it
 from md import abc, fluid
+from . import parallel
 
 __all__ = (
     'Node', 'InnerNode', 'leaf', 'collection', 'focus', 'index',
     'Path', 'Sequence', 'sequence', 'steps', 'filter', 'predicate',
     'self', 'parent', 'child', 'attribute', 'ancestor', 'ancestor_or_self',
     'descendant', 'descendant_or_self', 'following_sibling', 'following',
-    'preceding_sibling', 'preceding', 'sibling'
+    'preceding_sibling', 'preceding', 'sibling', 'lookup_descendant',
+    'lookup', 'child_attribute', 'project'
 )
 
 
@@ -67,27 +69,59 @@ focus = fluid.accessor(FOCUS)
 INDEX = fluid.cell()
 index = fluid.accessor(INDEX)
 
+parallel.inherit(COLLECTION, FOCUS, INDEX)
+
 
 ### Top Level
 
+## Results are produced lazily.  A compiled query accepts an offset
+## and limit; evaluation stops once enough items are produced.  The
+## expressions of a list are evaluated concurrently if a pool is
+## installed (see parallel.py).
+
 def Path(exprs):
     if isinstance(exprs, Sequence):
-        def xpath(items):
+        def xpath(items, offset=0, limit=None):
             items = sequence(items)
             with collection(items):
-                return expand(exprs, items)
+                return window(expand(exprs, items), offset, limit)
     else:
-        def xpath(items):
-            items = sequence(items)
+        def xpath(items, offset=0, limit=None):
+            items = shared(items)
             with collection(items):
-                return tuple(expand(e, items) for e in exprs)
+                return tuple(parallel.evaluate(
+                    (lambda e=e: window(expand(e, items), offset, limit))
+                    for e in exprs
+                ))
     return xpath
 
+def shared(items):
+    ## Workers can't consume a Memo at the same time; read it first.
+    items = sequence(items)
+    if parallel.pool() is not None:
+        return Sequence(list(items))
+    return items
+
+def window(seq, offset=0, limit=None):
+    if not offset and limit is None:
+        return seq
+    return it.islice(seq, offset, None if limit is None else offset + limit)
+
 def expand(expr, items):
     return unique(iter(items) if expr is None else focused(expr, items))
 
 def focused(expr, items):
-    for (index, focus) in enumerate(items):
+    ## A positional predicate only needs one item from each group;
+    ## don't expand the rest of it.
+    start = 0
+    if isinstance(expr, Position):
+        start = expr.name
+        if start < 0:
+            ## No item has a negative position.
+            return
+        items = it.islice(items, start, start + 1)
+
+    for (index, focus) in enumerate(items, start):
         with fluid.let((INDEX, index), (FOCUS, focus)):
             for item in expr():
                 yield item
@@ -111,8 +145,8 @@ class Sequence(object):
 
     def __init__(self, items):
         if isinstance(items, coll.Iterator):
-            items = list(items)
-        if isinstance(items, (list, tuple)):
+            items = Memo(items)
+        if isinstance(items, (list, tuple, Memo)):
             self.expr = lambda: items
         elif callable(items):
             self.expr = items
@@ -141,6 +175,30 @@ class Sequence(object):
     def __nonzero__(self):
         return bool(next(iter(self), False))
 
+class Memo(object):
+    """Remember the items an iterator produces as they're consumed,
+    so it can be iterated more than once without being read into a
+    list up front."""
+
+    __slots__ = ('source', 'seen')
+
+    def __init__(self, source):
+        self.source = source
+        self.seen = []
+
+    def __iter__(self):
+        seen = self.seen
+        idx = 0
+        while True:
+            if idx == len(seen):
+                for item in self.source:
+                    seen.append(item)
+                    break
+                else:
+                    return
+            yield seen[idx]
+            idx += 1
+
 def steps(*steps):
     """Reduce a sequence of steps to a single expression that can be
     used to expand an input sequence."""
@@ -189,7 +247,7 @@ def predicate(pred):
     (representing an index) to a Step."""
 
     if isinstance(pred, int):
-        return fn.partial(Predicate, lambda: index() == pred)
+        return fn.partial(Position, pred)
     return fn.partial(Predicate, pred)
 
 class Predicate(Step):
@@ -208,11 +266,33 @@ class Predicate(Step):
             else:
                 yield focus()
 
+class Position(Predicate):
+    """A Position is a predicate that tests the index of the focused
+    item.  When it follows another step, only the item at that index
+    is expanded (see focused())."""
+
+    __slots__ = ()
+
+    def __init__(self, index, next, make=None):
+        super(Position, self).__init__(index, next)
+        self.expr = self.test
+
+    def test(self):
+        return index() == self.name
+
+
 
 ### Axis
 
+## Each axis is defined by a procedure that expands a single item.
+## The expansion procedures are kept in AXES so other evaluators can
+## use them.
+
+AXES = {}
+
 def axis(SeqType):
     def decorator(expand):
+        AXES[expand.__name__] = expand
         make = fn.partial(standard, expand)
 
         @fn.wraps(expand)
@@ -286,10 +366,17 @@ def __attr(name, item):
 
 @axis(Step)
 def _attributes(item):
-    for key in item.properties().iterkeys():
-        yield (key, getattr(item, key))
-    for key in item.dynamic_properties():
-        yield (key, getattr(item, key))
+    for name in attribute_names(item):
+        yield (name, getattr(item, name))
+
+def attribute_names(item):
+    """The names of an item's attributes: the fields of its schema
+    if it has one, otherwise its public instance attributes."""
+
+    schema = getattr(item, '__schema__', None)
+    if schema is not None:
+        return [f.name for f in schema.fields]
+    return sorted(n for n in getattr(item, '__dict__', ()) if not n.startswith('_'))
 
 @axis(Step)
 def ancestor(item):
@@ -327,6 +414,60 @@ def preceding(item):
 def sibling(item):
     return (x for x in item.parent if x != item)
 
+## The query planner (see plan.py) replaces descendant scans with a
+## lookup-descendant() step.  Nodes can answer a lookup without
+## walking the tree by implementing __lookup__(test, field, value);
+## it should return None when it can't.
+
+def lookup_descendant(test, field=None, value=None):
+    return fn.partial(Step, (test, field, value), make=_lookup)
+
+def _lookup((test, field, value)):
+    return lambda item: lookup(item, test, field, value)
+
+def lookup(item, test, field=None, value=None):
+    """Produce the descendants of item that pass test and have
+    field equal to value, in the same order as the descendant axis."""
+
+    hook = getattr(item, '__lookup__', None)
+    found = hook(test, field, value) if hook else None
+    if found is None:
+        found = traverse(item, test, field, value)
+    return found
+
+def traverse(item, test, field=None, value=None):
+    found = standard(descend, test)(item)
+    if field is None:
+        return found
+    return (i for i in found if getattr(i, field, fluid.UNDEFINED) == value)
+
+## A path that ends with an attribute of children (/news/*/@title)
+## is replaced by a child-attribute() step.  Nodes can produce the
+## attribute without loading their children completely by
+## implementing __project__(test, name); it should return None when
+## it can't.
+
+def child_attribute(test, name):
+    return fn.partial(Step, (test, name), make=_project)
+
+def _project((test, name)):
+    return lambda item: project(item, test, name)
+
+def project(item, test, name):
+    """Produce the name attribute of each child of item that passes
+    test, like child::test/@name."""
+
+    if leaf(item):
+        return ()
+    hook = getattr(item, '__project__', None)
+    found = hook(test, name) if hook else None
+    if found is None:
+        found = (
+            v for c in standard(AXES['_children'], test)(item)
+            for v in __attr(name, c)
+        )
+    return found
+
 
 ### Aux
 
@@ -341,15 +482,41 @@ def ascend(item):
         yield probe
         probe = probe.parent
 
-def descend(item):
+## Descendants are visited breadth-first.  Rather than expanding one
+## node at a time, up to FRONTIER nodes from the front of the queue
+## are expanded together.  Nodes can implement a class-level
+## __expand__(nodes) hook that returns a list of children for each
+## node; a content tree uses it to load all the children at once.
+
+FRONTIER = 64
+
+def descend(item, batch=None):
     if leaf(item):
         return
-    queue = coll.deque(item)
+    batch = batch or FRONTIER
+    queue = coll.deque([item])
     while queue:
-        item = queue.popleft()
-        yield item
-        if not leaf(item):
-            queue.extend(item)
+        nodes = [queue.popleft() for _ in xrange(min(batch, len(queue)))]
+        for children in expand_all(nodes):
+            for item in children:
+                yield item
+                if not leaf(item):
+                    queue.append(item)
+
+def expand_all(nodes):
+    """Produce a sequence of children for each node."""
+
+    for (hook, group) in it.groupby(nodes, expander):
+        group = list(group)
+        if hook:
+            for children in hook(group):
+                yield children
+        else:
+            for node in group:
+                yield node
+
+def expander(node):
+    return getattr(type(node), '__expand__', None)
 
 def before(item):
     parent = item.parent